@@ -1,44 +1,55 @@
 from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk, ToolMessageChunk, ToolMessage
 from langchain.agents import create_agent
 from langgraph.graph.state import CompiledStateGraph
-from langchain.chat_models import init_chat_model
-from typing import AsyncGenerator, Optional, Literal
+from typing import AsyncGenerator, Iterable, Optional
 from app.core.config import settings
 from app.core.logger_config import logger
 from app.agents.profiles import AgentProfile
-from app.agents.persistence import setup_persistence
-from app.agents.middlewares import LoggingMiddleware, TrimMessagesMiddleware
+from app.agents.runtime import AgentRuntime, get_agent_runtime
+from app.agents.persistence import CheckpointerType
+from app.agents.streaming import StreamingReply
+from app.agents import metrics
+from app.agents.middlewares import LoggingMiddleware, TrimMessagesMiddleware, RollingSummaryMiddleware
 from app.gradio.schemas import MultimodalMessage
 from app.utils import download_file, try_parse
 import gradio as gr
+import asyncio
 import json
+import time
 
 class AIAgent:
-    def __init__(self, agent: Optional[CompiledStateGraph] = None, checkpointer_type: Literal["MongoDBSaver", "MemorySaver"] = "MemorySaver"):
+    def __init__(self, agent: Optional[CompiledStateGraph] = None, checkpointer_type: CheckpointerType = "MemorySaver",
+                 sql_tables: bool = False):
         self.agent = agent
         self.checkpointer_type = checkpointer_type
+        # Uploaded tabular files are registered as SQL tables only for agents that can query them
+        self.sql_tables = sql_tables
     
     @classmethod
-    async def create(cls, profile: AgentProfile) -> "AIAgent":
-        llm = init_chat_model(f"{settings.llm_provider}:{settings.llm_model}", temperature=settings.llm_temperature)
-        tools = profile.tools
+    async def create(cls, profile: AgentProfile, runtime: Optional[AgentRuntime] = None) -> "AIAgent":
+        """Build an agent for `profile` using the shared LLM and checkpointer of `runtime`"""
+        runtime = runtime or get_agent_runtime()
+        llm = runtime.get_llm()
+        tools = profile.load_tools()
         prompt = profile.prompt
-        middlewares = [TrimMessagesMiddleware(), LoggingMiddleware()] + profile.middlewares
-        checkpointer_type, checkpointer = await setup_persistence()
+        trim_middleware = TrimMessagesMiddleware()
+        middlewares = [trim_middleware]
+        if settings.summarize_evicted_messages:
+            # After the trimmer, so its after_agent hook sees the history before pruning
+            middlewares.append(RollingSummaryMiddleware(llm, trim_middleware))
+        middlewares += [LoggingMiddleware()] + profile.middlewares
+        checkpointer_type, checkpointer = await runtime.get_persistence()
         agent = create_agent(llm, tools, checkpointer=checkpointer, system_prompt=prompt, middleware=middlewares)
         logger.info(f"{profile.name} AI Agent initialized.")
-        return cls(agent, checkpointer_type)
+        return cls(agent, checkpointer_type, sql_tables=any(getattr(tool, "name", None) == "sql_file_analysis" for tool in tools))
     
     async def load_prev_messages(self, thread_id: str) -> list:
         """Load agent messages in gradio format"""
         config = {"configurable": {"thread_id": thread_id}}
-        logger.info(f"New session started, thread_id: {thread_id}")
+        logger.info("New session started, thread_id: %s", thread_id)
         hist = []
         try:
-            if self.checkpointer_type == "MongoDBSaver":
-                state = await self.agent.aget_state(config)
-            else:
-                state = self.agent.get_state(config)   
+            state = await self.agent.aget_state(config)
             last_tool_message: gr.ChatMessage = None
             msgs = state.values.get('messages', [])
             for msg in msgs:
@@ -75,59 +86,112 @@ class AIAgent:
                 yield MultimodalMessage().model_dump(), hist
             else:
                 hist.append(gr.ChatMessage(role="user", content=query))
-                logger.info(f"User Message: {query}")
+                logger.info("User Message: %s", query)
                 if files:
                     for file in files:
                         hist.append(gr.ChatMessage(role="user", content=gr.File(file)))
-                        file_path = download_file(file)
+                        file_path = download_file(file, thread_id)
                         if file_path:
                             query += f"\nThe file is attached and available at filepath: {file_path}"
+                            if self.sql_tables:
+                                from app.agents.tools import get_dataset_manager
+                                table = get_dataset_manager().register_file(thread_id, file_path)
+                                if table:
+                                    query += f" (SQL table: {table})"
                 yield MultimodalMessage().model_dump(),  hist
-                buffer = ""
+                reply: Optional[StreamingReply] = None
+                replies: list[StreamingReply] = []
                 config = {"configurable": {"thread_id": thread_id}}
-                async for chunk, _ in self.agent.astream({"messages": [HumanMessage(content=query)]}, config=config, stream_mode="messages"):
+                first_token = True
+                metrics.start_turn(thread_id)
+                async for chunk, chunk_metadata in self.agent.astream({"messages": [HumanMessage(content=query)]}, config=config, stream_mode="messages"):
                     if isinstance(chunk, AIMessageChunk):
+                        if chunk_metadata.get("langgraph_node") != "model":
+                            # LLM calls made by middlewares (e.g. summaries) are not part of the reply
+                            continue
+                        if first_token and (chunk.text or chunk.tool_call_chunks):
+                            metrics.mark_first_token(thread_id)
+                            first_token = False
                         if chunk.tool_calls:
+                            if reply is not None:
+                                # Text streamed before a tool call stays above it
+                                reply.flush()
+                                reply = None
                             for tool_call in chunk.tool_calls:
                                 tool_name = tool_call.get('name', 'Unknown Tool')
                                 tool_args = tool_call.get('args', 'no args')
                                 if isinstance(tool_args, dict) and "runtime" in tool_args:
                                     tool_args = {k: v for k, v in tool_args.items() if k != "runtime"}
-                                logger.info(f"Invoking tool: {tool_name} with arguments: {tool_args}")
+                                logger.info("Invoking tool: %s with arguments: %s", tool_name, tool_args)
                                 
                                 # Format the tool call and arguments
                                 hist.append(gr.ChatMessage(role="assistant",
                                                         content=f"Input: {json.dumps(tool_args, indent=2)}",
                                                         metadata={"title": f"🛠️ Invoking {tool_name}...", "status": "pending"}))
                                 yield MultimodalMessage().model_dump(), hist
-                        else:
-                            buffer += chunk.content
-                            msg = gr.ChatMessage(role="assistant", content=buffer)
-                            yield MultimodalMessage().model_dump(), hist + [msg]
+                        elif chunk.text:
+                            if reply is None:
+                                reply = StreamingReply()
+                                replies.append(reply)
+                                hist.append(reply.message)
+                            if reply.append(chunk.text):
+                                yield MultimodalMessage().model_dump(), hist
                     elif isinstance(chunk, ToolMessage):
                         output_content = chunk.content
                         last_tool_msg: gr.ChatMessage = hist[-1]
                         last_tool_msg.content += f"\nOutput: {output_content}"
                         last_tool_msg.metadata["status"] = "done"
                         yield MultimodalMessage().model_dump(), hist
-                hist.append(gr.ChatMessage(role="assistant", content=buffer))
-                logger.info(f"AI response from assistant: {buffer[:50]}...")
+                if reply is not None:
+                    reply.flush()
+                logger.info("AI response from assistant: %.50s...", "".join(r.text for r in replies))
                 yield MultimodalMessage().model_dump(), hist
         except Exception as e:
             logger.error(f"Error in chat function: {e}")
             yield MultimodalMessage().model_dump(), hist + [gr.ChatMessage(role="assistant", content="Internal error. Try again later ")]
             return
+        finally:
+            # After the run, so the checkpoint saved once the last node ends is counted
+            metrics.finish_turn(thread_id)
     
     async def answer(self, question: str, thread_id: str) -> str:
         """Answer a question directly using the agent"""
         if not question.strip():
             return "You can't send an empty message"
         try:
-            logger.info(f"Agent received question (first 50 chars): {question[:50]}...")
+            logger.info("Agent received question (first 50 chars): %.50s...", question)
             config = {"configurable": {"user_id": "user-xxx", "thread_id": thread_id}}
-            llm_output: AIMessage = await self.agent.ainvoke({"messages": [HumanMessage(content=question)]}, config=config)['messages'][-1]
-            logger.info(f"Agent answers: {llm_output.content}")
+            metrics.start_turn(thread_id)
+            llm_output: AIMessage = (await self.agent.ainvoke({"messages": [HumanMessage(content=question)]}, config=config))['messages'][-1]
+            logger.info("Agent answers: %s", llm_output.content)
             return llm_output
         except Exception as e:
             logger.error(f"Error in chat function: {e}")
-            return "Internal error. Try again later "
\ No newline at end of file
+            return "Internal error. Try again later "
+        finally:
+            metrics.finish_turn(thread_id)
+
+class AgentPool:
+    """
+    One agent per profile, all sharing `runtime`. `build_all` creates the agents concurrently;
+    `get` creates an agent on first use, so a tab that never gets a message never builds one.
+    """
+    def __init__(self, profiles: Iterable[AgentProfile], runtime: Optional[AgentRuntime] = None):
+        self.profiles = {profile.id: profile for profile in profiles}
+        self.runtime = runtime
+        self.agents: dict[str, AIAgent] = {}
+        self._locks = {profile_id: asyncio.Lock() for profile_id in self.profiles}
+
+    async def get(self, profile_id: str) -> AIAgent:
+        """The agent of `profile_id`, built on first call; concurrent first calls share one build."""
+        if profile_id not in self.agents:
+            async with self._locks[profile_id]:
+                if profile_id not in self.agents:
+                    start = time.perf_counter()
+                    self.agents[profile_id] = await AIAgent.create(self.profiles[profile_id], self.runtime)
+                    logger.info("%s agent built in %.2fs", self.profiles[profile_id].name, time.perf_counter() - start)
+        return self.agents[profile_id]
+
+    async def build_all(self) -> None:
+        """Build every agent not built yet, concurrently."""
+        await asyncio.gather(*(self.get(profile_id) for profile_id in self.profiles))
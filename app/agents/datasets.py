@@ -0,0 +1,349 @@
+from app.core.config import settings
+from app.core.logger_config import logger
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Literal, Optional
+import pandas as pd
+import threading
+import hashlib
+import duckdb
+import glob
+import time
+import csv
+import io
+import os
+import re
+
+COUNT_BATCH_ROWS = 100_000
+
+TEMP_OBJECT_SQL = re.compile(r"^\s*create\s+(or\s+replace\s+)?temp(orary)?\s+(table|view)\b", re.IGNORECASE)
+
+def checked_statement(query: str) -> str:
+    """The single SELECT or CREATE TEMP TABLE/VIEW statement of `query`; raises ValueError for anything else."""
+    statements = duckdb.extract_statements(query)
+    if len(statements) != 1:
+        raise ValueError("Only a single SQL statement is supported.")
+    statement = statements[0]
+    if statement.type == duckdb.StatementType.SELECT or (
+        statement.type == duckdb.StatementType.CREATE and TEMP_OBJECT_SQL.match(statement.query)
+    ):
+        return statement.query.strip().rstrip(";")
+    raise ValueError("Only SELECT queries and CREATE TEMP TABLE/VIEW are supported.")
+
+def _quote(path: str) -> str:
+    """SQL string literal for a path (COPY ... TO and views do not take parameters)."""
+    return "'" + path.replace("'", "''") + "'"
+
+def _quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+@dataclass
+class QueryResult:
+    """The first rows of a query result, its total size and where the full result was spilled, if it was."""
+    columns: list[str]
+    rows: list[tuple[Any, ...]]
+    total_rows: int
+    spill_path: Optional[str] = None
+
+    def render(self, max_chars: int, fmt: Literal["markdown", "csv"] = "markdown") -> str:
+        """Compact table of the fetched rows, cut at `max_chars`, with a marker when anything was left out."""
+        if fmt == "csv":
+            def line(row) -> str:
+                buffer = io.StringIO()
+                csv.writer(buffer, lineterminator="").writerow(row)
+                return buffer.getvalue()
+            header = [line(self.columns)]
+            body = [line(row) for row in self.rows]
+        else:
+            cell = lambda value: "" if value is None else str(value).replace("|", "\\|").replace("\n", " ")
+            header = ["| " + " | ".join(map(cell, self.columns)) + " |", "|" + "---|" * len(self.columns)]
+            body = ["| " + " | ".join(map(cell, row)) + " |" for row in self.rows]
+
+        lines, size = list(header), sum(len(line) + 1 for line in header)
+        for line in body:
+            if size + len(line) + 1 > max_chars:
+                break
+            lines.append(line)
+            size += len(line) + 1
+        shown = len(lines) - len(header)
+        text = "\n".join(lines)
+        if shown < self.total_rows:
+            text += f"\n\n(truncated: showing {shown} of {self.total_rows} total rows)"
+        if self.spill_path:
+            text += f"\nFull result saved to {self.spill_path}, query it with sql_file_analysis for follow-up questions."
+        return text
+
+@dataclass
+class DuckDBSession:
+    """A conversation's DuckDB connection: one view per uploaded file plus any temp tables it created."""
+    conn: duckdb.DuckDBPyConnection
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    views: dict[str, str] = field(default_factory=dict)  # view name -> Parquet path
+    last_used: float = field(default_factory=time.monotonic)
+    memory_bytes: int = 0
+    closed: bool = False
+
+def view_name(filepath: str) -> str:
+    """Table name of an uploaded file: `orders.csv` -> `orders`."""
+    name = re.sub(r"\W+", "_", os.path.splitext(os.path.basename(filepath))[0]).strip("_").lower() or "data"
+    return f"t_{name}" if name[0].isdigit() else name
+
+class DatasetManager:
+    """
+    Columnar cache of uploaded CSV/Excel files for SQL analysis.
+    Each file version (path, size, mtime) is ingested once into a Parquet file under
+    `dataset_cache_dir`, with DuckDB's native CSV reader; queries then scan the Parquet
+    file in parallel instead of re-parsing the upload into pandas every time.
+    Parquet files (such as spilled query results) are queried in place.
+
+    Each conversation (`thread_id`) keeps a DuckDB session where every file uploaded in the
+    thread is a view named after the file, and temp tables survive between queries. Sessions
+    are evicted when idle (`sql_session_idle_seconds`) or over `sql_max_sessions` and the
+    `sql_sessions_memory_mb` budget, least recently used first.
+    """
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = cache_dir or settings.dataset_cache_dir
+        self.result_dir = os.path.join(self.cache_dir, "results")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._lock = threading.Lock()  # Guards file locks, sessions and thread files
+        self._file_locks: dict[str, threading.Lock] = {}
+        self.sessions: OrderedDict[str, DuckDBSession] = OrderedDict()
+        self.thread_files: dict[str, dict[str, str]] = {}  # thread_id -> view name -> uploaded file
+
+    def _file_lock(self, path_key: str) -> threading.Lock:
+        with self._lock:
+            return self._file_locks.setdefault(path_key, threading.Lock())
+
+    @staticmethod
+    def _keys(filepath: str) -> tuple[str, str]:
+        """(path key, version key): a new version is detected by size and modification time."""
+        path = os.path.abspath(filepath)
+        stat = os.stat(path)
+        path_key = hashlib.sha256(path.encode("utf-8")).hexdigest()[:16]
+        version_key = hashlib.sha256(f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}".encode("utf-8")).hexdigest()[:16]
+        return path_key, version_key
+
+    @staticmethod
+    def _ingest(filepath: str, parquet_path: str) -> None:
+        ext = os.path.splitext(filepath)[1].lower()
+        if ext not in (".csv", ".xlsx"):
+            raise ValueError(f"Unsupported file type: {ext}")
+        tmp_path = f"{parquet_path}.{threading.get_ident()}.tmp"
+        try:
+            with duckdb.connect() as conn:
+                if ext == ".csv":
+                    conn.execute(f"COPY (SELECT * FROM read_csv_auto(?)) TO {_quote(tmp_path)} (FORMAT PARQUET)", [filepath])
+                else:
+                    # Parsed once with pandas; every later query reads the Parquet copy
+                    conn.register("sheet", pd.read_excel(filepath))
+                    conn.execute(f"COPY sheet TO {_quote(tmp_path)} (FORMAT PARQUET)")
+            os.replace(tmp_path, parquet_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def dataset_path(self, filepath: str) -> str:
+        """Parquet copy of the current version of a file, ingesting it on first use."""
+        if os.path.splitext(filepath)[1].lower() == ".parquet":
+            return filepath
+        path_key, version_key = self._keys(filepath)
+        parquet_path = os.path.join(self.cache_dir, f"{path_key}-{version_key}.parquet")
+        with self._file_lock(path_key):
+            if not os.path.exists(parquet_path):
+                self._ingest(filepath, parquet_path)
+                logger.info(f"Dataset {filepath} ingested into {parquet_path}")
+                for stale in glob.glob(os.path.join(self.cache_dir, f"{path_key}-*.parquet")):
+                    if stale != parquet_path:
+                        os.remove(stale)
+        return parquet_path
+
+    def _spill_path(self, query: str) -> str:
+        """Result file for a query, keeping only the `sql_max_spilled_results` most recent ones."""
+        os.makedirs(self.result_dir, exist_ok=True)
+        spilled = sorted(glob.glob(os.path.join(self.result_dir, "*.parquet")), key=os.path.getmtime)
+        for stale in spilled[:max(0, len(spilled) - settings.sql_max_spilled_results + 1)]:
+            os.remove(stale)
+        key = hashlib.sha256(f"{time.time_ns()}\0{query}".encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.result_dir, f"result-{key}.parquet")
+
+    def register_file(self, thread_id: str, filepath: str) -> Optional[str]:
+        """Expose an uploaded file to the thread's SQL session, returns its view name (None if not tabular)."""
+        if os.path.splitext(filepath)[1].lower() not in (".csv", ".xlsx", ".parquet"):
+            return None
+        with self._lock:
+            files = self.thread_files.setdefault(thread_id, {})
+            name = next((view for view, path in files.items() if path == filepath), None)
+            if name is None:
+                name, i = view_name(filepath), 2
+                while name in files or name == "df":
+                    name, i = f"{view_name(filepath)}_{i}", i + 1
+                files[name] = filepath
+        return name
+
+    @staticmethod
+    def _new_connection() -> duckdb.DuckDBPyConnection:
+        conn = duckdb.connect()
+        conn.execute(f"SET memory_limit = '{settings.sql_session_memory_mb}MB'")
+        return conn
+
+    def _session(self, thread_id: str) -> DuckDBSession:
+        with self._lock:
+            session = self.sessions.get(thread_id)
+            if session is None:
+                session = self.sessions[thread_id] = DuckDBSession(self._new_connection())
+            self.sessions.move_to_end(thread_id)
+            return session
+
+    def _sync_views(self, session: DuckDBSession, thread_id: str, filepath: str) -> None:
+        """Point the session views (`df` and one per uploaded file) at the current Parquet copies."""
+        with self._lock:
+            views = {name: path for name, path in self.thread_files.get(thread_id, {}).items() if os.path.exists(path)}
+        views["df"] = filepath
+        for name, path in views.items():
+            parquet_path = self.dataset_path(path)
+            if session.views.get(name) != parquet_path:
+                session.conn.execute(f'CREATE OR REPLACE VIEW "{name}" AS SELECT * FROM read_parquet({_quote(parquet_path)})')
+                session.views[name] = parquet_path
+
+    def _evict_sessions(self) -> None:
+        """Close idle sessions, then the least recently used ones while over count or memory budget."""
+        now = time.monotonic()
+        budget = settings.sql_sessions_memory_mb * 1024 * 1024
+        with self._lock:
+            evicted = [
+                thread_id for thread_id, session in self.sessions.items()
+                if now - session.last_used > settings.sql_session_idle_seconds and not session.lock.locked()
+            ]
+            for thread_id, session in self.sessions.items():
+                live = [s for t, s in self.sessions.items() if t not in evicted]
+                if len(live) <= 1 or (len(live) <= settings.sql_max_sessions and sum(s.memory_bytes for s in live) <= budget):
+                    break
+                if thread_id not in evicted and not session.lock.locked():
+                    evicted.append(thread_id)
+            sessions = [self.sessions.pop(thread_id) for thread_id in evicted]
+        for session in sessions:
+            # A query holding a reference to the session waits, then opens a new one
+            with session.lock:
+                session.conn.close()
+                session.closed = True
+        if sessions:
+            logger.info(f"Evicted {len(sessions)} SQL sessions ({len(self.sessions)} live).")
+
+    def query(self, filepath: str, query: str, thread_id: Optional[str] = None,
+              max_rows: Optional[int] = None, spill: Optional[bool] = None) -> QueryResult:
+        """
+        Run a SQL query against the file, exposed as the `df` table, in the thread's session
+        (a throwaway one without `thread_id`). Only `max_rows` rows are returned; larger results
+        are counted and, if `spill`, written to a Parquet file.
+        `query` must be a single SELECT or CREATE TEMP TABLE/VIEW statement (see `checked_statement`).
+        """
+        max_rows = settings.sql_max_result_rows if max_rows is None else max_rows
+        spill = settings.sql_spill_results if spill is None else spill
+        query = checked_statement(query)
+        if thread_id is None:
+            with self._new_connection() as conn:
+                conn.execute(f"CREATE VIEW df AS SELECT * FROM read_parquet({_quote(self.dataset_path(filepath))})")
+                return self._run(conn, query, max_rows, spill)
+
+        self.register_file(thread_id, filepath)
+        while True:
+            session = self._session(thread_id)
+            with session.lock:
+                if session.closed:
+                    continue
+                try:
+                    self._sync_views(session, thread_id, filepath)
+                    result = self._run(session.conn, query, max_rows, spill)
+                finally:
+                    session.last_used = time.monotonic()
+                    session.memory_bytes = session.conn.execute(
+                        "SELECT COALESCE(SUM(memory_usage_bytes), 0) FROM duckdb_memory()"
+                    ).fetchone()[0]
+            self._evict_sessions()
+            return result
+
+    def _run(self, conn: duckdb.DuckDBPyConnection, query: str, max_rows: int, spill: bool) -> QueryResult:
+        """The query is executed once: the preview, total count and spilled file always describe the same rows."""
+        if spill and duckdb.extract_statements(query)[0].type == duckdb.StatementType.SELECT:
+            return self._run_spilled(conn, query, max_rows)
+        cursor = conn.execute(query)
+        columns = [column[0] for column in cursor.description]
+        rows = cursor.fetchmany(max_rows + 1)
+        total_rows = len(rows)
+        if total_rows > max_rows:
+            # The rest is counted on the same cursor instead of running the query again
+            while batch := cursor.fetchmany(COUNT_BATCH_ROWS):
+                total_rows += len(batch)
+        return QueryResult(columns, rows[:max_rows], total_rows)
+
+    def _run_spilled(self, conn: duckdb.DuckDBPyConnection, query: str, max_rows: int) -> QueryResult:
+        """
+        Stream a SELECT result straight to Parquet, then read the preview back from the file.
+        The file is kept (and rotated) only when the result is over `max_rows`.
+        """
+        os.makedirs(self.result_dir, exist_ok=True)
+        tmp_path = os.path.join(self.result_dir, f".{threading.get_ident()}-{time.time_ns()}.tmp")
+        try:
+            # Parquet renames duplicate columns: the names are taken from the query plan. The newline
+            # ends a trailing -- comment before the closing parenthesis.
+            columns = [row[0] for row in conn.execute(f"DESCRIBE {query}").fetchall()]
+            total_rows = conn.execute(f"COPY ({query}\n) TO {_quote(tmp_path)} (FORMAT PARQUET)").fetchone()[0]
+            rows = conn.execute(f"SELECT * FROM read_parquet({_quote(tmp_path)}) LIMIT {max_rows}").fetchall()
+            if total_rows <= max_rows:
+                return QueryResult(columns, rows, total_rows)
+            spill_path = self._spill_path(query)
+            os.replace(tmp_path, spill_path)
+            return QueryResult(columns, rows, total_rows, spill_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def profile(self, filepath: str, sample_rows: Optional[int] = None, sample_size: int = 5, max_chars: Optional[int] = None) -> str:
+        """
+        Size-capped profile of a CSV/Excel/Parquet file: column types, null counts, approximate
+        distinct counts and quantiles from DuckDB SUMMARIZE, plus head and tail samples.
+        Files over `sample_rows` rows are summarized on a random sample of about that many rows;
+        their null counts, min and max are still computed over the whole file.
+        """
+        sample_rows = settings.profile_sample_rows if sample_rows is None else sample_rows
+        max_chars = max_chars or settings.profile_max_chars
+        parquet_path = self.dataset_path(filepath)
+        with self._new_connection() as conn:
+            conn.execute(f"CREATE VIEW df AS SELECT * FROM read_parquet({_quote(parquet_path)})")
+            total_rows = conn.execute("SELECT COUNT(*) FROM df").fetchone()[0]
+            columns = [column[0] for column in conn.execute("SELECT * FROM df LIMIT 0").description]
+            n_columns = len(columns)
+            sampled = total_rows > sample_rows
+            # Bernoulli sampling picks single rows: system sampling picks whole 2048-row vectors, which can
+            # leave a small file with an empty sample, and was no faster on Parquet
+            source = f"(SELECT * FROM df USING SAMPLE {100 * sample_rows / total_rows:.4f}% (bernoulli))" if sampled else "df"
+            stats = self._run(conn, f"""
+                SELECT column_name, column_type,
+                       ROUND(null_percentage * count / 100)::BIGINT AS nulls,
+                       approx_unique,
+                       LEFT(min, 40) AS min, LEFT(max, 40) AS max,
+                       ROUND(TRY_CAST(avg AS DOUBLE), 4) AS avg,
+                       COALESCE(ROUND(TRY_CAST(q25 AS DOUBLE), 4)::VARCHAR, q25) AS q25,
+                       COALESCE(ROUND(TRY_CAST(q50 AS DOUBLE), 4)::VARCHAR, q50) AS q50,
+                       COALESCE(ROUND(TRY_CAST(q75 AS DOUBLE), 4)::VARCHAR, q75) AS q75
+                FROM (SUMMARIZE {source})
+            """, n_columns, spill=False)
+            if sampled:
+                # Null counts, min and max are exact in one scan; only distinct counts, mean and quantiles are estimated
+                exact = conn.execute("SELECT " + ", ".join(
+                    f"COUNT(*) - COUNT({name}), LEFT(MIN({name})::VARCHAR, 40), LEFT(MAX({name})::VARCHAR, 40)"
+                    for name in map(_quote_identifier, columns)) + " FROM df").fetchone()
+                stats.rows = [(row[0], row[1], *exact[3 * i:3 * i + 1], row[3], *exact[3 * i + 1:3 * i + 3], *row[6:])
+                              for i, row in enumerate(stats.rows)]
+            head = self._run(conn, f"SELECT * FROM df LIMIT {sample_size}", sample_size, spill=False)
+            tail = self._run(conn, f"SELECT * FROM df OFFSET {max(0, total_rows - sample_size)}", sample_size, spill=False)
+
+        header = f"{os.path.splitext(filepath)[1].lstrip('.').upper()} file with {total_rows} rows and {n_columns} columns."
+        if sampled:
+            header += f" approx_unique, avg and quantiles are estimated from a random sample of about {sample_rows} rows."
+        return "\n\n".join([
+            header,
+            "Columns:\n" + stats.render(max_chars * 3 // 5),
+            "Head:\n" + head.render(max_chars // 5),
+            "Tail:\n" + tail.render(max_chars // 5),
+        ])
@@ -0,0 +1,128 @@
+from langchain_core.embeddings import Embeddings
+from app.core.config import settings
+from app.core.logger_config import logger
+from typing import Optional
+import numpy as np
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+class SQLiteEmbeddingStore:
+    """On-disk LRU store of float32 vectors keyed by content hash."""
+    def __init__(self, path: str, max_entries: int):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB, accessed_at REAL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_accessed ON embeddings (accessed_at)")
+        self._conn.commit()
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        found = {}
+        with self._lock:
+            # Stay under SQLite's bound parameter limit
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                found.update({key: np.frombuffer(vector, dtype=np.float32).tolist() for key, vector in rows})
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE embeddings SET accessed_at = ? WHERE key = ?", [(now, key) for key in found])
+                self._conn.commit()
+        return found
+
+    def set_many(self, items: dict[str, list[float]]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, accessed_at) VALUES (?, ?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in items.items()],
+            )
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+class CachedEmbeddings(Embeddings):
+    """
+    Content-addressed cache in front of an embeddings model.
+    Chunks are keyed by the hash of their normalized text, so boilerplate repeated across
+    pages (nav bars, footers, cookie banners) is embedded once. Only novel chunks reach the
+    underlying model, in batches of `batch_size`.
+    """
+    def __init__(self, embeddings: Embeddings, store: Optional[SQLiteEmbeddingStore] = None, batch_size: Optional[int] = None):
+        self.embeddings = embeddings
+        self.store = store or SQLiteEmbeddingStore(settings.embedding_cache_path, settings.embedding_cache_max_entries)
+        self.batch_size = batch_size or settings.embedding_batch_size
+        # Vectors of different models (and of queries vs documents) are not interchangeable
+        self.namespace = getattr(embeddings, "model", None) or type(embeddings).__name__
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "embed_calls": 0, "embed_seconds": 0.0}
+
+    def _key(self, kind: str, text: str) -> str:
+        normalized = re.sub(r"\s+", " ", text).strip()
+        return hashlib.sha256(f"{self.namespace}\0{kind}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def _count(self, **increments):
+        with self._stats_lock:
+            for name, value in increments.items():
+                self._stats[name] += value
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [self._key("document", text) for text in texts]
+        vectors = self.store.get_many(list(set(keys)))
+
+        # One request per novel chunk, even if it appears several times in this call
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+        self._count(hits=len(texts) - len(missing), misses=len(missing))
+
+        missing_keys = list(missing)
+        for i in range(0, len(missing_keys), self.batch_size):
+            batch_keys = missing_keys[i:i + self.batch_size]
+            start = time.perf_counter()
+            batch_vectors = self.embeddings.embed_documents([missing[key] for key in batch_keys])
+            self._count(embed_calls=1, embed_seconds=time.perf_counter() - start)
+            new_vectors = dict(zip(batch_keys, batch_vectors))
+            self.store.set_many(new_vectors)
+            vectors.update(new_vectors)
+
+        if missing:
+            logger.info(f"Embedded {len(missing)} new chunks, {len(texts) - len(missing)} served from cache")
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> list[float]:
+        key = self._key("query", text)
+        cached = self.store.get_many([key])
+        if key in cached:
+            self._count(hits=1)
+            return cached[key]
+        self._count(misses=1)
+        start = time.perf_counter()
+        vector = self.embeddings.embed_query(text)
+        self._count(embed_calls=1, embed_seconds=time.perf_counter() - start)
+        self.store.set_many({key: vector})
+        return vector
+
+    def stats(self) -> dict[str, float]:
+        """Cache hit ratio and embedding latency, for monitoring."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["avg_embed_ms"] = round(stats["embed_seconds"] / stats["embed_calls"] * 1000, 2) if stats["embed_calls"] else 0.0
+        stats["embed_seconds"] = round(stats["embed_seconds"], 3)
+        return stats
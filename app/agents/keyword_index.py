@@ -0,0 +1,57 @@
+from langchain_core.documents import Document
+from collections import Counter
+import math
+import re
+
+# Kept deliberately small: version numbers, names and prices must stay searchable
+STOPWORDS = frozenset(
+    "a an and are as at be by for from how in is it of on or that the this to was what when where which who why with".split()
+)
+_TOKEN = re.compile(r"\w+(?:[.,]\w+)*")
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased word tokens without stopwords; "3.11", "v2.0" and "1,299" stay single tokens."""
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+class BM25Index:
+    """In-memory inverted index over the chunks of one page, scored with Okapi BM25."""
+    def __init__(self, docs: list[Document], k1: float = 1.5, b: float = 0.75):
+        self.docs = docs
+        self.k1 = k1
+        self.b = b
+        self.postings: dict[str, list[tuple[int, int]]] = {}  # term -> [(doc position, term frequency)]
+        self.doc_lengths: list[int] = []
+        for position, doc in enumerate(docs):
+            terms = tokenize(doc.page_content)
+            self.doc_lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                self.postings.setdefault(term, []).append((position, tf))
+        self.avg_length = sum(self.doc_lengths) / len(docs) if docs else 0.0
+
+    def __contains__(self, term: str) -> bool:
+        return term in self.postings
+
+    def idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.docs) - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, k: int) -> list[tuple[Document, float]]:
+        """Top `k` chunks sharing at least one term with the query, with their BM25 score."""
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self.idf(term)
+            for position, tf in self.postings.get(term, ()):
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[position] / (self.avg_length or 1))
+                scores[position] = scores.get(position, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self.docs[position], score) for position, score in ranked]
+
+def reciprocal_rank_fusion(rankings: list[list[Document]], rrf_k: int = 60) -> list[tuple[Document, float]]:
+    """Fuse ranked chunk lists by summing 1 / (rrf_k + rank); chunks are matched by their `chunk_index`."""
+    fused: dict[int, tuple[Document, float]] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = doc.metadata.get("chunk_index", id(doc))
+            _, score = fused.get(key, (doc, 0.0))
+            fused[key] = (doc, score + 1 / (rrf_k + rank))
+    return sorted(fused.values(), key=lambda item: item[1], reverse=True)
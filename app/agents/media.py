@@ -0,0 +1,182 @@
+from google.genai import types
+from app.core.config import settings
+from app.core.logger_config import logger
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+import mimetypes
+import asyncio
+import hashlib
+import time
+import os
+import threading
+
+CHUNK_SIZE = 1024 * 1024
+
+# (offset, magic bytes, MIME type), checked before the file extension
+_SIGNATURES = [
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"GIF87a", "image/gif"),
+    (0, b"GIF89a", "image/gif"),
+    (0, b"%PDF-", "application/pdf"),
+    (0, b"ID3", "audio/mp3"),
+    (0, b"fLaC", "audio/flac"),
+    (0, b"OggS", "audio/ogg"),
+    (0, b"\x1aE\xdf\xa3", "video/webm"),
+]
+_RIFF_TYPES = {b"WEBP": "image/webp", b"WAVE": "audio/wav", b"AVI ": "video/x-msvideo"}
+_FTYP_TYPES = {b"qt  ": "video/quicktime", b"M4A ": "audio/aac", b"heic": "image/heic", b"heix": "image/heic"}
+# UTF-32 before UTF-16: the UTF-32LE BOM starts with the UTF-16LE one
+_TEXT_BOMS = (b"\xef\xbb\xbf", b"\xff\xfe\x00\x00", b"\x00\x00\xfe\xff", b"\xff\xfe", b"\xfe\xff")
+
+SUPPORTED_MIME_PREFIXES = ("image/", "audio/", "video/", "application/pdf", "text/")
+
+def sniff_mime_type(filepath: str) -> str:
+    """MIME type from the file's magic bytes, falling back to its extension."""
+    with open(filepath, "rb") as f:
+        head = f.read(16)
+    if head.startswith(_TEXT_BOMS):
+        # A byte order mark means text; FF FE would otherwise pass for an MPEG frame sync
+        mime_type, _ = mimetypes.guess_type(filepath)
+        return mime_type if mime_type and mime_type.startswith("text/") else "text/plain"
+    for offset, magic, mime_type in _SIGNATURES:
+        if head[offset:offset + len(magic)] == magic:
+            return mime_type
+    if head[:4] == b"RIFF" and head[8:12] in _RIFF_TYPES:
+        return _RIFF_TYPES[head[8:12]]
+    if head[4:8] == b"ftyp":
+        return _FTYP_TYPES.get(head[8:12], "video/mp4")
+    if len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0 and head[1] & 0x18 != 0x08 and head[1] & 0x06:
+        return "audio/mp3"  # MPEG audio frame without an ID3 tag (version bits not reserved, layer set)
+    mime_type, _ = mimetypes.guess_type(filepath)
+    if mime_type is None:
+        raise ValueError(f"Could not detect the type of {os.path.basename(filepath)}")
+    return mime_type
+
+@dataclass
+class UploadedFile:
+    uri: str
+    mime_type: str
+    expires_at: float
+
+class GeminiFileCache:
+    """
+    Media parts for Gemini prompts. Files up to `media_inline_max_mb` are sent inline; larger ones
+    are uploaded once through the Files API (resumable, in chunks, never read whole into memory)
+    and their URI is cached by content hash until shortly before it expires, so follow-up prompts
+    about the same file reuse it. Concurrent prompts about one file share a single upload, which
+    is only cancelled when every prompt waiting on it is. At most `media_cache_max_files` URIs and
+    content hashes are kept, least recently used first out; expired URIs are dropped.
+    """
+    def __init__(self, client: Any):
+        self.client = client
+        self.files: OrderedDict[str, UploadedFile] = OrderedDict()
+        self._uploads: dict[str, asyncio.Task] = {}
+        self._waiters: dict[str, int] = {}
+        self._hashes: OrderedDict[tuple[str, int, int], str] = OrderedDict()  # (path, size, mtime) -> content hash
+        self._hashes_lock = threading.Lock()  # Hashes are computed in worker threads
+        self.stats = {"uploads": 0, "uploaded_bytes": 0, "reused": 0, "inline": 0}
+
+    def _content_hash(self, filepath: str) -> str:
+        stat = os.stat(filepath)
+        key = (os.path.abspath(filepath), stat.st_size, stat.st_mtime_ns)
+        with self._hashes_lock:
+            if key in self._hashes:
+                self._hashes.move_to_end(key)
+                return self._hashes[key]
+        digest = hashlib.sha256()
+        with open(filepath, "rb") as f:
+            while chunk := f.read(CHUNK_SIZE):
+                digest.update(chunk)
+        with self._hashes_lock:
+            self._hashes[key] = digest.hexdigest()
+            while len(self._hashes) > settings.media_cache_max_files:
+                self._hashes.popitem(last=False)
+        return digest.hexdigest()
+
+    async def _upload(self, filepath: str, mime_type: str) -> UploadedFile:
+        file = await self.client.aio.files.upload(file=filepath, config=types.UploadFileConfig(mime_type=mime_type))
+        # Videos are processed before they can be used in a prompt
+        deadline = time.monotonic() + settings.media_processing_timeout_seconds
+        while file.state == types.FileState.PROCESSING:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{os.path.basename(filepath)} is still being processed by the Files API")
+            await asyncio.sleep(1)
+            file = await self.client.aio.files.get(name=file.name)
+        if file.state == types.FileState.FAILED:
+            raise ValueError(f"The Files API could not process {os.path.basename(filepath)}")
+
+        self.stats["uploads"] += 1
+        self.stats["uploaded_bytes"] += os.path.getsize(filepath)
+        expires_at = file.expiration_time.timestamp() if file.expiration_time else time.time() + 47 * 3600
+        logger.info(f"Uploaded {filepath} to the Files API ({file.uri})")
+        return UploadedFile(file.uri, file.mime_type or mime_type, expires_at - settings.media_expiry_margin_seconds)
+
+    def _remember(self, content_hash: str, uploaded: UploadedFile) -> None:
+        self.files[content_hash] = uploaded
+        self.files.move_to_end(content_hash)
+        now = time.time()
+        for expired in [key for key, file in self.files.items() if file.expires_at <= now]:
+            del self.files[expired]
+        while len(self.files) > settings.media_cache_max_files:
+            self.files.popitem(last=False)
+
+    async def _upload_and_remember(self, content_hash: str, filepath: str, mime_type: str) -> UploadedFile:
+        uploaded = await self._upload(filepath, mime_type)
+        self._remember(content_hash, uploaded)
+        return uploaded
+
+    def _upload_done(self, content_hash: str, task: asyncio.Task) -> None:
+        if self._uploads.get(content_hash) is task:
+            del self._uploads[content_hash]
+        if not task.cancelled():
+            task.exception()  # Mark as retrieved when nobody else is waiting
+
+    async def _uploaded(self, filepath: str, mime_type: str) -> UploadedFile:
+        content_hash = await asyncio.to_thread(self._content_hash, filepath)
+        cached = self.files.get(content_hash)
+        if cached is not None:
+            if cached.expires_at > time.time():
+                self.files.move_to_end(content_hash)
+                self.stats["reused"] += 1
+                return cached
+            del self.files[content_hash]
+        task = self._uploads.get(content_hash)
+        if task is None:
+            task = self._uploads[content_hash] = asyncio.ensure_future(self._upload_and_remember(content_hash, filepath, mime_type))
+            task.add_done_callback(lambda done: self._upload_done(content_hash, done))
+        self._waiters[content_hash] = self._waiters.get(content_hash, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[content_hash] == 1 and not task.done():
+                # Last waiter gone: stop the upload, and don't hand it to a new caller
+                task.cancel()
+                if self._uploads.get(content_hash) is task:
+                    del self._uploads[content_hash]
+            raise
+        finally:
+            self._waiters[content_hash] -= 1
+            if not self._waiters[content_hash]:
+                del self._waiters[content_hash]
+
+    def forget(self, filepath: str) -> None:
+        """Drop the cached URI of a file, e.g. when the Files API no longer knows it."""
+        self.files.pop(self._content_hash(filepath), None)
+
+    async def part(self, filepath: str) -> types.Part:
+        """Prompt part for a media file: inline bytes for small files, a cached Files API URI otherwise."""
+        mime_type = sniff_mime_type(filepath)
+        if not mime_type.startswith(SUPPORTED_MIME_PREFIXES):
+            raise ValueError(f"Unsupported file type: {mime_type}")
+        if os.path.getsize(filepath) <= settings.media_inline_max_mb * 1024 * 1024:
+            self.stats["inline"] += 1
+            data = await asyncio.to_thread(_read_bytes, filepath)
+            return types.Part.from_bytes(data=data, mime_type=mime_type)
+        uploaded = await self._uploaded(filepath, mime_type)
+        return types.Part.from_uri(file_uri=uploaded.uri, mime_type=uploaded.mime_type)
+
+def _read_bytes(filepath: str) -> bytes:
+    with open(filepath, "rb") as f:
+        return f.read()
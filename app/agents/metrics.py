@@ -0,0 +1,265 @@
+"""
+In-process metrics for agent turns, exported in the Prometheus text format.
+
+Usage (offline report over recorded turns): python -m app.agents.metrics logs/metrics.jsonl
+"""
+from app.core.config import settings
+from app.core.logger_config import BatchingQueueListener, LazyQueueHandler, rotating_file_handler, logger
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from dataclasses import dataclass, field, asdict
+from functools import lru_cache
+from typing import Optional
+import threading
+import argparse
+import logging
+import atexit
+import bisect
+import queue
+import json
+import math
+import time
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RATIO_BUCKETS = (0.1, 0.25, 0.5, 0.75, 0.9, 1.0)
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name, self.help, self.label_names = name, help, labels
+        self.values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, *labels: str) -> None:
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, labels)} {value:g}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.name, self.help, self.label_names, self.buckets = name, help, labels, buckets
+        self.values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}  # labels -> (bucket counts, [sum, count])
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            counts, total = self.values.setdefault(labels, ([0] * len(self.buckets), [0.0, 0]))
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(counts):
+                counts[index] += 1
+            total[0] += value
+            total[1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, (total, count)) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    le = 'le="%g"' % bound
+                    lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le)} {count}")
+                lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {total:g}")
+                lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {count}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: dict[str, Counter | Histogram] = {}
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        return self.metrics.setdefault(name, Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self.metrics.setdefault(name, Histogram(name, help, labels, buckets))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        return "\n".join(line for metric in self.metrics.values() for line in metric.render()) + "\n"
+
+registry = MetricsRegistry()
+TURNS = registry.counter("agent_turns_total", "Agent turns completed")
+TURN_SECONDS = registry.histogram("agent_turn_seconds", "Agent turn latency")
+FIRST_TOKEN_SECONDS = registry.histogram("agent_time_to_first_token_seconds", "Time from the start of a turn to its first streamed token")
+MODEL_CALL_SECONDS = registry.histogram("agent_model_call_seconds", "Model call latency")
+TOOL_CALL_SECONDS = registry.histogram("agent_tool_call_seconds", "Tool call latency", ("tool",))
+TOOL_ERRORS = registry.counter("agent_tool_errors_total", "Tool calls that raised", ("tool",))
+TOKENS = registry.counter("agent_tokens_total", "Tokens reported in usage_metadata", ("type",))
+TRIM_KEPT_RATIO = registry.histogram("agent_trim_kept_ratio", "Fraction of the history messages sent to the model", buckets=RATIO_BUCKETS)
+CHECKPOINT_SECONDS = registry.histogram("agent_checkpoint_save_seconds", "Checkpoint save latency", buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+
+@dataclass
+class TurnMetrics:
+    thread_id: str
+    started: float = field(default_factory=time.time)
+    seconds: float = 0.0
+    first_token_seconds: Optional[float] = None
+    model_calls: list[float] = field(default_factory=list)
+    tool_calls: list[tuple[str, float]] = field(default_factory=list)
+    input_tokens: int = 0
+    output_tokens: int = 0
+    trim_kept_ratios: list[float] = field(default_factory=list)
+    checkpoint_saves: list[float] = field(default_factory=list)
+
+_turns: dict[str, TurnMetrics] = {}
+
+def start_turn(thread_id: Optional[str]) -> None:
+    if thread_id:
+        _turns[thread_id] = TurnMetrics(thread_id)
+
+def current_turn(thread_id: Optional[str]) -> Optional[TurnMetrics]:
+    return _turns.get(thread_id) if thread_id else None
+
+def mark_first_token(thread_id: str) -> None:
+    """Called by the UI when the first token of a turn is streamed."""
+    turn = current_turn(thread_id)
+    if turn is not None and turn.first_token_seconds is None:
+        turn.first_token_seconds = time.time() - turn.started
+        FIRST_TOKEN_SECONDS.observe(turn.first_token_seconds)
+
+def record_model_call(thread_id: Optional[str], seconds: float, usage: Optional[dict], kept_ratio: Optional[float]) -> None:
+    MODEL_CALL_SECONDS.observe(seconds)
+    input_tokens = (usage or {}).get("input_tokens", 0)
+    output_tokens = (usage or {}).get("output_tokens", 0)
+    TOKENS.inc(input_tokens, "input")
+    TOKENS.inc(output_tokens, "output")
+    if kept_ratio is not None:
+        TRIM_KEPT_RATIO.observe(kept_ratio)
+    turn = current_turn(thread_id)
+    if turn is not None:
+        turn.model_calls.append(seconds)
+        turn.input_tokens += input_tokens
+        turn.output_tokens += output_tokens
+        if kept_ratio is not None:
+            turn.trim_kept_ratios.append(kept_ratio)
+
+def record_tool_call(thread_id: Optional[str], tool: str, seconds: float, failed: bool = False) -> None:
+    TOOL_CALL_SECONDS.observe(seconds, tool)
+    if failed:
+        TOOL_ERRORS.inc(1, tool)
+    turn = current_turn(thread_id)
+    if turn is not None:
+        turn.tool_calls.append((tool, seconds))
+
+def record_checkpoint_save(thread_id: Optional[str], seconds: float) -> None:
+    CHECKPOINT_SECONDS.observe(seconds)
+    turn = current_turn(thread_id)
+    if turn is not None:
+        turn.checkpoint_saves.append(seconds)
+
+def finish_turn(thread_id: Optional[str]) -> Optional[TurnMetrics]:
+    """Close the turn of `thread_id` and append it to `metrics_runs_file`."""
+    turn = _turns.pop(thread_id, None) if thread_id else None
+    if turn is None:
+        return None
+    turn.seconds = time.time() - turn.started
+    TURNS.inc()
+    TURN_SECONDS.observe(turn.seconds)
+    recorder = get_run_recorder()
+    if recorder is not None:
+        recorder.info(json.dumps(asdict(turn)))
+    return turn
+
+def instrument_checkpointer(checkpointer) -> None:
+    """Time the checkpoint saves of `checkpointer` (its `aput` method is wrapped in place; agents only run async)."""
+    if getattr(checkpointer, "_metrics_instrumented", False):
+        return
+    aput = checkpointer.aput
+
+    async def timed_aput(config, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await aput(config, *args, **kwargs)
+        finally:
+            record_checkpoint_save(config.get("configurable", {}).get("thread_id"), time.perf_counter() - start)
+
+    checkpointer.aput = timed_aput
+    checkpointer._metrics_instrumented = True
+
+@lru_cache
+def get_run_recorder() -> Optional[logging.Logger]:
+    """JSON lines logger of finished turns, written off the event loop like the application log."""
+    if not settings.metrics_runs_file:
+        return None
+    handler = rotating_file_handler(settings.metrics_runs_file, logging.Formatter("%(message)s"))
+    recorder = logging.getLogger("metrics.turns")
+    recorder.setLevel("INFO")
+    recorder.propagate = False
+    if settings.log_mode == "queue":
+        turn_queue = queue.SimpleQueue()
+        listener = BatchingQueueListener(turn_queue, handler, flush_interval=settings.log_flush_interval_seconds)
+        listener.start()
+        atexit.register(listener.stop)
+        recorder.handlers = [LazyQueueHandler(turn_queue)]
+    else:
+        recorder.handlers = [handler]
+    return recorder
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve the registry on http://<host>:<port>/metrics from a daemon thread (local only by default)."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info("Metrics served on %s:%d", host, port)
+    return server
+
+def _percentiles(values: list[float]) -> dict:
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    pick = lambda pct: ordered[max(1, math.ceil(pct / 100 * len(ordered))) - 1]
+    return {"count": len(ordered), "p50": round(pick(50), 3), "p95": round(pick(95), 3), "p99": round(pick(99), 3), "max": round(ordered[-1], 3)}
+
+def report(paths: list[str]) -> dict:
+    """Latency percentiles, token usage and trimming over the turns recorded in `paths`."""
+    turns = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            turns += [json.loads(line) for line in f if line.strip()]
+    tools: dict[str, list[float]] = {}
+    for turn in turns:
+        for tool, seconds in turn["tool_calls"]:
+            tools.setdefault(tool, []).append(seconds)
+    return {
+        "turns": len(turns),
+        "threads": len({turn["thread_id"] for turn in turns}),
+        "turn_seconds": _percentiles([turn["seconds"] for turn in turns]),
+        "first_token_seconds": _percentiles([turn["first_token_seconds"] for turn in turns if turn["first_token_seconds"] is not None]),
+        "model_call_seconds": _percentiles([s for turn in turns for s in turn["model_calls"]]),
+        "tool_call_seconds": {tool: _percentiles(values) for tool, values in sorted(tools.items())},
+        "checkpoint_save_seconds": _percentiles([s for turn in turns for s in turn["checkpoint_saves"]]),
+        "trim_kept_ratio": _percentiles([r for turn in turns for r in turn["trim_kept_ratios"]]),
+        "tokens_per_turn": {
+            "input": _percentiles([turn["input_tokens"] for turn in turns]),
+            "output": _percentiles([turn["output_tokens"] for turn in turns]),
+        },
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+" if not settings.metrics_runs_file else "*", default=[settings.metrics_runs_file])
+    args = parser.parse_args()
+    print(json.dumps(report(args.paths), indent=2))
@@ -5,22 +5,48 @@ from langchain.agents.middleware import (
 )
 from langgraph.prebuilt.tool_node import ToolCallRequest
 from langgraph.runtime import Runtime
-from langchain_core.messages import trim_messages, RemoveMessage
-from langgraph.graph.message import REMOVE_ALL_MESSAGES
-from app.utils import remove_incomplete_tool_calls
+from langgraph.config import get_config
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import trim_messages, get_buffer_string, BaseMessage, HumanMessage, RemoveMessage, SystemMessage, ToolMessage
+from app.utils import remove_incomplete_tool_calls, MessageTokenCounter
 from app.core.logger_config import logger
 from app.core.config import settings
-from typing import Any
+from app.agents import metrics
+from collections import OrderedDict
+from typing import Any, NotRequired, Optional
+import contextvars
+import asyncio
+import time
+
+SUMMARY_PROMPT = """Update the running summary of a conversation with the new messages below.
+Keep facts, user preferences, decisions, results of tool calls and open questions. Drop small talk.
+Answer with the updated summary only.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}"""
+
+# Summaries are internal: no parent callbacks, and kept out of the user's stream_mode="messages" stream
+SUMMARY_CALL_CONFIG = {"callbacks": [], "tags": ["nostream"]}
+
+CHARS_PER_TOKEN = 4  # Same approximation as MessageTokenCounter
 
 class TrimMessagesMiddleware(AgentMiddleware):
-    def _apply_trimming(self, messages, max_count: int, is_for_llm=False):
+    def __init__(self):
+        super().__init__()
+        self.token_counter = MessageTokenCounter()
+
+    def _apply_trimming(self, messages, max_count: int, is_for_llm=False, token_counter=len):
         """
         Unified trimming logic. 
         - If is_for_llm=True: Strict rules to ensure the LLM doesn't hallucinate or crash.
         - If is_for_llm=False: Lazy rules just to keep the DB size in check & preserve instructions.
+        `max_count` is measured with `token_counter` (number of messages by default).
         """
         kwargs = {
-            "token_counter": len,
+            "token_counter": token_counter,
             "strategy": "last",
             "max_tokens": max_count,
             "include_system": True,
@@ -38,15 +64,24 @@ class TrimMessagesMiddleware(AgentMiddleware):
         # Always clean up orphaned tool calls/responses to prevent state corruption
         return remove_incomplete_tool_calls(trimmed)
     
+    def _evicted_messages(self, messages) -> list[BaseMessage]:
+        """
+        Messages to drop from the stored history.
+        Hysteresis: nothing is evicted until `max_stored_messages` is exceeded, then the history
+        is cut down to `stored_messages_after_prune`.
+        """
+        if len(messages) <= settings.max_stored_messages:
+            return []
+        # PRUNE FOR DB: Keep more messages, no strict start/end rules
+        kept_messages = self._apply_trimming(messages, settings.stored_messages_after_prune, is_for_llm=False)
+        kept_ids = {msg.id for msg in kept_messages}
+        return [msg for msg in messages if msg.id not in kept_ids]
+
     def _prune_stored_messages(self, messages):
-        """Keeps the state messages clean for the UI."""
-        if len(messages) > settings.max_stored_messages:
-            # PRUNE FOR DB: Keep more messages, no strict start/end rules
-            kept_messages = self._apply_trimming(messages, settings.max_stored_messages, is_for_llm=False)
-            return {"messages": [
-                RemoveMessage(id=REMOVE_ALL_MESSAGES),
-                *kept_messages
-            ]}
+        """Keeps the state messages clean for the UI, removing only the evicted message ids."""
+        evicted = self._evicted_messages(messages)
+        if evicted:
+            return {"messages": [RemoveMessage(id=msg.id) for msg in evicted]}
         return None
 
     def after_agent(self, state: AgentState, runtime: Runtime):
@@ -55,24 +90,163 @@ class TrimMessagesMiddleware(AgentMiddleware):
     async def aafter_agent(self, state: AgentState, runtime: Runtime):
         return self._prune_stored_messages(state["messages"])
 
-    def wrap_model_call(self, request: ModelRequest, handler):
+    def _clip_tool_outputs(self, messages, max_tokens: int) -> list[BaseMessage]:
+        """
+        Tool outputs over half the token budget are cut to that size, so one huge output can't
+        push the whole conversation (its own tool call and question included) out of the window.
+        """
+        limit = max_tokens // 2
+        clipped = []
+        for msg in messages:
+            if isinstance(msg, ToolMessage) and self.token_counter.count_message(msg) > limit:
+                text, keep = msg.text, limit * CHARS_PER_TOKEN
+                # No id: the token counter caches counts by id, and this copy is not the stored message
+                msg = msg.model_copy(update={"id": None, "content": f"{text[:keep]}\n... [tool output truncated, {len(text) - keep} more chars]"})
+            clipped.append(msg)
+        return clipped
+
+    @staticmethod
+    def _keep_latest_human(messages, trimmed):
+        """The model always gets the user's latest message and the rest of its turn, even over budget."""
+        latest = next((i for i in range(len(messages) - 1, -1, -1) if isinstance(messages[i], HumanMessage)), None)
+        if latest is None:
+            return trimmed
+        human = messages[latest]
+        if any(msg is human or (human.id is not None and msg.id == human.id) for msg in trimmed):
+            return trimmed
+        system = [msg for msg in messages[:1] if isinstance(msg, SystemMessage)]
+        return system + remove_incomplete_tool_calls(messages[latest:])
+
+    def _trim_for_llm(self, messages):
         # TRIM FOR LLM: Small context window, strict start/end rules
-        trimmed = self._apply_trimming(request.messages, settings.max_llm_input_messages, is_for_llm=True)
-        return handler(request.override(messages=trimmed))
+        if settings.llm_trim_mode == "tokens":
+            messages = self._clip_tool_outputs(messages, settings.max_llm_input_tokens)
+            trimmed = self._apply_trimming(messages, settings.max_llm_input_tokens, is_for_llm=True, token_counter=self.token_counter)
+        else:
+            trimmed = self._apply_trimming(messages, settings.max_llm_input_messages, is_for_llm=True)
+        return self._keep_latest_human(messages, trimmed)
+
+    def wrap_model_call(self, request: ModelRequest, handler):
+        return handler(request.override(messages=self._trim_for_llm(request.messages)))
+
+    async def awrap_model_call(self, request: ModelRequest, handler):
+        return await handler(request.override(messages=self._trim_for_llm(request.messages)))
+
+class SummaryState(AgentState):
+    summary: NotRequired[str]
+
+class RollingSummaryMiddleware(AgentMiddleware):
+    """
+    Folds the messages evicted by `TrimMessagesMiddleware` into a running summary kept in the agent state,
+    and adds that summary to the system prompt of every model call.
+    On the async path the summarization LLM call runs in a background task started in `aafter_agent`
+    (in a fresh context, so it doesn't inherit the turn's callbacks); its result is stored at the
+    start of the next turn if ready, so it never delays the user's turn. Pending results are kept
+    for at most `summary_max_pending_threads` threads, the least recently updated done ones go first.
+    Must be placed after `TrimMessagesMiddleware` in the middleware list so it sees the history before pruning.
+    """
+    state_schema = SummaryState
+
+    def __init__(self, llm: BaseChatModel, trim_middleware: TrimMessagesMiddleware):
+        super().__init__()
+        self.llm = llm
+        self.trim_middleware = trim_middleware
+        self._pending: OrderedDict[str, asyncio.Task[str]] = OrderedDict()
+
+    def _summary_prompt(self, summary: str, evicted: list[BaseMessage]) -> str:
+        return SUMMARY_PROMPT.format(summary=summary or "(empty)", messages=get_buffer_string(evicted))
+
+    async def _fold(self, summary: str, evicted: list[BaseMessage], previous: Optional[asyncio.Task[str]]) -> str:
+        if previous is not None:
+            # Chain onto a summary that has not been stored in the state yet
+            try:
+                summary = await previous
+            except Exception as e:
+                logger.error(f"Previous summarization failed: {e}")
+        response = await self.llm.ainvoke(self._summary_prompt(summary, evicted), config=SUMMARY_CALL_CONFIG)
+        logger.info(f"Conversation summary updated ({len(evicted)} messages folded)")
+        return response.text
+
+    def _set_pending(self, thread_id: str, task: asyncio.Task[str]) -> None:
+        self._pending[thread_id] = task
+        self._pending.move_to_end(thread_id)
+        # Results of abandoned threads are never collected: drop the oldest finished ones over the limit
+        excess = len(self._pending) - settings.summary_max_pending_threads
+        for stale_id in [tid for tid, pending in self._pending.items() if pending.done()][:max(excess, 0)]:
+            del self._pending[stale_id]
+
+    def _thread_id(self) -> Optional[str]:
+        return get_config().get("configurable", {}).get("thread_id")
+
+    def _with_summary(self, request: ModelRequest) -> ModelRequest:
+        summary = request.state.get("summary")
+        if not summary:
+            return request
+        system_prompt = request.system_prompt
+        content = f"{system_prompt}\n\n" if system_prompt else ""
+        content += f"Summary of the earlier conversation:\n{summary}"
+        return request.override(system_message=SystemMessage(content=content))
+
+    def after_agent(self, state: SummaryState, runtime: Runtime) -> dict[str, Any] | None:
+        evicted = self.trim_middleware._evicted_messages(state["messages"])
+        if not evicted:
+            return None
+        response = self.llm.invoke(self._summary_prompt(state.get("summary", ""), evicted), config=SUMMARY_CALL_CONFIG)
+        return {"summary": response.text}
+
+    async def aafter_agent(self, state: SummaryState, runtime: Runtime) -> dict[str, Any] | None:
+        evicted = self.trim_middleware._evicted_messages(state["messages"])
+        thread_id = self._thread_id()
+        if evicted and thread_id:
+            previous = self._pending.get(thread_id)
+            task = asyncio.create_task(self._fold(state.get("summary", ""), evicted, previous), context=contextvars.Context())
+            self._set_pending(thread_id, task)
+        return None
+
+    async def abefore_agent(self, state: SummaryState, runtime: Runtime) -> dict[str, Any] | None:
+        thread_id = self._thread_id()
+        task = self._pending.get(thread_id)
+        if task is None or not task.done():
+            return None
+        del self._pending[thread_id]
+        if task.cancelled():
+            return None
+        try:
+            return {"summary": task.result()}
+        except Exception as e:
+            logger.error(f"Summarization failed: {e}")
+            return None
+
+    def wrap_model_call(self, request: ModelRequest, handler):
+        return handler(self._with_summary(request))
 
     async def awrap_model_call(self, request: ModelRequest, handler):
-        trimmed = self._apply_trimming(request.messages, settings.max_llm_input_messages, is_for_llm=True)
-        return await handler(request.override(messages=trimmed))
+        return await handler(self._with_summary(request))
 
 class LoggingMiddleware(AgentMiddleware):
+    """
+    Logs model responses and tool calls, and records per-turn metrics (see `app.agents.metrics`):
+    model and tool call latency, token usage and the share of the history sent to the model.
+    Must be placed after `TrimMessagesMiddleware` so it sees the trimmed request. Turns are opened
+    and closed by `AIAgent` around the whole run, so the first and last checkpoint saves are part of it.
+    """
+    def _thread_id(self) -> Optional[str]:
+        return get_config().get("configurable", {}).get("thread_id")
+
     def _log_model_response(self, state: AgentState) -> None:
         if state["messages"]:
             last_msg = state["messages"][-1].content
             if isinstance(last_msg, str) and last_msg != "":
-                logger.info(f"New AI Message: {repr(last_msg[:50])}...")
+                logger.info("New AI Message: %r...", last_msg[:50])
     
     def _log_tool_call(self, request: ToolCallRequest) -> None:
-        logger.info(f"New Tool Call: '{request.tool_call['name']}' with args {request.tool_call['args']}...")
+        logger.info("New Tool Call: '%s' with args %s...", request.tool_call['name'], request.tool_call['args'])
+
+    def _record_model_call(self, request: ModelRequest, response, seconds: float) -> None:
+        messages = getattr(response, "result", [response])
+        usage = next((msg.usage_metadata for msg in messages if getattr(msg, "usage_metadata", None)), None)
+        history = len(request.state.get("messages", []))
+        metrics.record_model_call(self._thread_id(), seconds, usage, len(request.messages) / history if history else None)
 
     def after_model(self, state: AgentState, runtime: Runtime) -> dict[str, Any] | None:
         self._log_model_response(state)
@@ -82,12 +256,34 @@ class LoggingMiddleware(AgentMiddleware):
         self._log_model_response(state)
         return None
 
+    def wrap_model_call(self, request: ModelRequest, handler):
+        start = time.perf_counter()
+        response = handler(request)
+        self._record_model_call(request, response, time.perf_counter() - start)
+        return response
+
+    async def awrap_model_call(self, request: ModelRequest, handler):
+        start = time.perf_counter()
+        response = await handler(request)
+        self._record_model_call(request, response, time.perf_counter() - start)
+        return response
+
     def wrap_tool_call(self, request: ToolCallRequest, handler):
         self._log_tool_call(request)
-        result = handler(request)
-        return result
+        start, failed = time.perf_counter(), True
+        try:
+            result = handler(request)
+            failed = False
+            return result
+        finally:
+            metrics.record_tool_call(self._thread_id(), request.tool_call['name'], time.perf_counter() - start, failed)
 
     async def awrap_tool_call(self, request: ToolCallRequest, handler):
         self._log_tool_call(request)
-        result = await handler(request)
-        return result
\ No newline at end of file
+        start, failed = time.perf_counter(), True
+        try:
+            result = await handler(request)
+            failed = False
+            return result
+        finally:
+            metrics.record_tool_call(self._thread_id(), request.tool_call['name'], time.perf_counter() - start, failed)
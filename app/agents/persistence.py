@@ -1,18 +1,263 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, AsyncMongoClient, ASCENDING, UpdateOne
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.checkpoint.mongodb import MongoDBSaver
+from langgraph.checkpoint.mongodb.utils import dumps_metadata, loads_metadata
 from app.core.config import settings
 from app.core.logger_config import logger
-from typing import Literal
+from collections.abc import AsyncIterator, Sequence
+from datetime import datetime
+from typing import Any, Callable, Literal, Optional
+import asyncio
+import weakref
 
-async def setup_persistence() -> tuple[Literal["MongoDBSaver", "MemorySaver"], MemorySaver | MongoDBSaver]:
+CheckpointerType = Literal["AsyncMongoDBSaver", "MongoDBSaver", "MemorySaver"]
+
+class AsyncMongoDBSaver(BaseCheckpointSaver):
+    """
+    Checkpointer backed by the native asyncio MongoDB driver (`pymongo.AsyncMongoClient`).
+    Uses the same document layout as `MongoDBSaver`, so both can read each other's threads,
+    but every read and write is awaited on the event loop instead of going through a thread pool.
+    Only the async API is supported: call `await setup()` once before use.
+
+    An AsyncMongoClient can only be used on the event loop it first ran on. `client` is used on
+    the first loop; with a `client_factory`, each other loop (e.g. Gradio's serving loop when the
+    agents were built under `asyncio.run`) gets its own client from the factory.
+    """
+    def __init__(
+        self,
+        client: AsyncMongoClient,
+        db_name: str = "checkpointing_db",
+        checkpoint_collection_name: str = "checkpoints",
+        writes_collection_name: str = "checkpoint_writes",
+        ttl: Optional[int] = None,
+        client_factory: Optional[Callable[[], AsyncMongoClient]] = None,
+    ):
+        super().__init__()
+        self.client = client
+        self.db_name = db_name
+        self.checkpoint_collection_name = checkpoint_collection_name
+        self.writes_collection_name = writes_collection_name
+        self.ttl = ttl
+        self.client_factory = client_factory
+        self._clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncMongoClient] = weakref.WeakKeyDictionary()
+
+    def _loop_client(self) -> AsyncMongoClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            if not self._clients or self.client_factory is None:
+                client = self.client
+            else:
+                client = self.client_factory()
+                logger.info("New MongoDB client for event loop %s", id(loop))
+            self._clients[loop] = client
+        return client
+
+    @property
+    def db(self):
+        return self._loop_client()[self.db_name]
+
+    @property
+    def checkpoint_collection(self):
+        return self.db[self.checkpoint_collection_name]
+
+    @property
+    def writes_collection(self):
+        return self.db[self.writes_collection_name]
+
+    async def setup(self) -> None:
+        """Create the collection indexes if they are not present yet."""
+        if len(await (await self.checkpoint_collection.list_indexes()).to_list()) < 2:
+            await self.checkpoint_collection.create_index(
+                keys=[("thread_id", 1), ("checkpoint_ns", 1), ("checkpoint_id", -1)],
+                unique=True,
+            )
+            if self.ttl:
+                await self.checkpoint_collection.create_index(keys=[("created_at", ASCENDING)], expireAfterSeconds=self.ttl)
+        if len(await (await self.writes_collection.list_indexes()).to_list()) < 2:
+            await self.writes_collection.create_index(
+                keys=[("thread_id", 1), ("checkpoint_ns", 1), ("checkpoint_id", -1), ("task_id", 1), ("idx", 1)],
+                unique=True,
+            )
+            if self.ttl:
+                await self.writes_collection.create_index(keys=[("created_at", ASCENDING)], expireAfterSeconds=self.ttl)
+
+    async def _load_tuple(self, doc: dict[str, Any]) -> CheckpointTuple:
+        """Build a CheckpointTuple from a checkpoint document and its pending writes."""
+        config_values = {
+            "thread_id": doc["thread_id"],
+            "checkpoint_ns": doc["checkpoint_ns"],
+            "checkpoint_id": doc["checkpoint_id"],
+        }
+        pending_writes = [
+            (wrt["task_id"], wrt["channel"], self.serde.loads_typed((wrt["type"], wrt["value"])))
+            async for wrt in self.writes_collection.find(config_values)
+        ]
+        parent_config = None
+        if doc.get("parent_checkpoint_id"):
+            parent_config = {"configurable": {**config_values, "checkpoint_id": doc["parent_checkpoint_id"]}}
+        return CheckpointTuple(
+            config={"configurable": config_values},
+            checkpoint=self.serde.loads_typed((doc["type"], doc["checkpoint"])),
+            metadata=loads_metadata(self.serde, doc["metadata"]),
+            parent_config=parent_config,
+            pending_writes=pending_writes,
+        )
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        query = {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}
+        if checkpoint_id := get_checkpoint_id(config):
+            query["checkpoint_id"] = checkpoint_id
+        async for doc in self.checkpoint_collection.find(query, sort=[("checkpoint_id", -1)], limit=1):
+            return await self._load_tuple(doc)
+        return None
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        query = {}
+        if config is not None:
+            if "thread_id" in config["configurable"]:
+                query["thread_id"] = config["configurable"]["thread_id"]
+            if "checkpoint_ns" in config["configurable"]:
+                query["checkpoint_ns"] = config["configurable"]["checkpoint_ns"]
+        if filter:
+            for key, value in filter.items():
+                query[f"metadata.{key}"] = dumps_metadata(self.serde, value)
+        if before is not None:
+            query["checkpoint_id"] = {"$lt": before["configurable"]["checkpoint_id"]}
+
+        async for doc in self.checkpoint_collection.find(query, limit=limit or 0, sort=[("checkpoint_id", -1)]):
+            yield await self._load_tuple(doc)
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        type_, serialized_checkpoint = self.serde.dumps_typed(checkpoint)
+        metadata = {**metadata, **config.get("metadata", {})}
+        doc = {
+            "parent_checkpoint_id": config["configurable"].get("checkpoint_id"),
+            "type": type_,
+            "checkpoint": serialized_checkpoint,
+            "metadata": dumps_metadata(self.serde, metadata),
+        }
+        if self.ttl:
+            doc["created_at"] = datetime.now()
+        upsert_query = {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}
+        await self.checkpoint_collection.update_one(upsert_query, {"$set": doc}, upsert=True)
+        return {"configurable": upsert_query}
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        # Allow replacement on existing writes only if there were errors
+        set_method = "$set" if all(w[0] in WRITES_IDX_MAP for w in writes) else "$setOnInsert"
+        now = datetime.now()
+        operations = []
+        for idx, (channel, value) in enumerate(writes):
+            upsert_query = {
+                "thread_id": config["configurable"]["thread_id"],
+                "checkpoint_ns": config["configurable"]["checkpoint_ns"],
+                "checkpoint_id": config["configurable"]["checkpoint_id"],
+                "task_id": task_id,
+                "task_path": task_path,
+                "idx": WRITES_IDX_MAP.get(channel, idx),
+            }
+            type_, serialized_value = self.serde.dumps_typed(value)
+            update_doc: dict[str, Any] = {"channel": channel, "type": type_, "value": serialized_value}
+            if self.ttl:
+                update_doc["created_at"] = now
+            operations.append(UpdateOne(filter=upsert_query, update={set_method: update_doc}, upsert=True))
+        if operations:
+            await self.writes_collection.bulk_write(operations)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self.checkpoint_collection.delete_many({"thread_id": thread_id})
+        await self.writes_collection.delete_many({"thread_id": thread_id})
+
+    async def aclose(self) -> None:
+        """Close the clients of every loop; those of other, still running loops are closed on their loop."""
+        current = asyncio.get_running_loop()
+        clients = dict(self._clients) or {current: self.client}
+        self._clients.clear()
+        for loop, client in clients.items():
+            if loop is current:
+                await client.close()
+            elif loop.is_running():
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(client.close(), loop))
+
+def _mongodb_client_options() -> dict[str, Any]:
+    return {
+        "maxPoolSize": settings.mongodb_max_pool_size,
+        "minPoolSize": 0,
+        "maxIdleTimeMS": settings.mongodb_max_idle_time_ms,
+        "serverSelectionTimeoutMS": settings.mongodb_server_selection_timeout_ms,
+    }
+
+def create_mongodb_client() -> MongoClient:
+    """Create a pooled MongoDB client. Idle sockets are released after `mongodb_max_idle_time_ms`."""
+    return MongoClient(settings.mongodb_uri, **_mongodb_client_options())
+
+def create_async_mongodb_client() -> AsyncMongoClient:
+    """Create a pooled asyncio MongoDB client with the same pool settings as `create_mongodb_client`."""
+    return AsyncMongoClient(settings.mongodb_uri, **_mongodb_client_options())
+
+async def setup_persistence() -> tuple[CheckpointerType, BaseCheckpointSaver]:
+    """
+    Build a checkpointer according to `settings.checkpointer_mode`:
+    - "async": AsyncMongoDBSaver on the native asyncio driver, no blocking I/O on the event loop
+    - "sync": MongoDBSaver on the threaded driver, connection check and setup run in a worker thread
+    Falls back to MemorySaver when MongoDB is unreachable.
+    """
     try:
-        host = settings.mongodb_uri
-        mongodb_client = MongoClient(host)
-        mongodb_client.server_info()  # Check if the connection is successful
-        checkpointer_type, checkpointer = "MongoDBSaver", MongoDBSaver(mongodb_client, ttl=settings.mongodb_ttl_seconds)
+        if settings.checkpointer_mode == "async":
+            async_client = create_async_mongodb_client()
+            try:
+                await async_client.admin.command("ping")  # Check if the connection is successful
+                checkpointer = AsyncMongoDBSaver(async_client, ttl=settings.mongodb_ttl_seconds,
+                                                 client_factory=create_async_mongodb_client)
+                await checkpointer.setup()
+            except Exception:
+                await async_client.close()
+                raise
+            return "AsyncMongoDBSaver", checkpointer
+
+        mongodb_client = create_mongodb_client()
+        try:
+            await asyncio.to_thread(mongodb_client.server_info)  # Check if the connection is successful
+            checkpointer = await asyncio.to_thread(MongoDBSaver, mongodb_client, ttl=settings.mongodb_ttl_seconds)
+        except Exception:
+            mongodb_client.close()
+            raise
+        return "MongoDBSaver", checkpointer
     except Exception as e:
         logger.error(f"Error connecting to MongoDB: {e}")
         logger.info("Falling back to MemorySaver")
-        checkpointer_type, checkpointer = "MemorySaver", MemorySaver()
-    return checkpointer_type, checkpointer
\ No newline at end of file
+        return "MemorySaver", MemorySaver()
@@ -2,19 +2,23 @@ from pydantic import BaseModel
 from langchain.tools import BaseTool
 from langchain.agents.middleware import AgentMiddleware
 from typing import Optional, Callable
-from app.agents.tools import (
-    web_search, wiki_search, academic_search, visit_web_page,
-    calculator, get_weather,
-    get_now_playing_movies, text_analysis, multimodal_analysis, youtube_analysis, sql_file_analysis
-)
+from importlib import import_module
 
 class AgentProfile(BaseModel):
     id: str
     name: str
     prompt: Optional[str] = None
-    tools: list[Callable | BaseTool] = []
+    # Tools are referenced by name and imported when the agent is built, so a profile
+    # only loads the tools (and their dependencies) it uses
+    tools: list[str | Callable | BaseTool] = []
     middlewares: list = []
 
+    def load_tools(self) -> list[Callable | BaseTool]:
+        """Resolve tool names to the tools defined in `app.agents.tools`."""
+        names = [tool for tool in self.tools if isinstance(tool, str)]
+        module = import_module("app.agents.tools") if names else None
+        return [getattr(module, tool) if isinstance(tool, str) else tool for tool in self.tools]
+
 TRAVEL_AGENT = AgentProfile(
     id="travel",
     name="Travel Assistant",
@@ -22,7 +26,7 @@ TRAVEL_AGENT = AgentProfile(
 You are a travel assistant.
 You help users plan trips, find attractions, weather, and logistics.
 """,
-    tools=[web_search, get_weather],
+    tools=["web_search", "get_weather"],
 )
 
 TUTOR_AGENT = AgentProfile(
@@ -32,7 +36,7 @@ TUTOR_AGENT = AgentProfile(
 You are a patient tutor.
 Explain concepts step-by-step and ask clarifying questions.
 """,
-    tools=[calculator],
+    tools=["calculator"],
 )
 
 RESEARCH_AGENT = AgentProfile(
@@ -42,7 +46,7 @@ RESEARCH_AGENT = AgentProfile(
 You are a research assistant.
 Use academic sources and provide citations.
 """,
-    tools=[academic_search, wiki_search, web_search],
+    tools=["academic_search", "wiki_search", "web_search"],
 )
 
 DATA_ANALYST_AGENT = AgentProfile(
@@ -64,11 +68,7 @@ Rules:
 - When appropriate, present findings as bullet points
 - Highlight assumptions and limitations
 """,
-    tools=[
-        sql_file_analysis,
-        text_analysis,
-        calculator,
-    ],
+    tools=["sql_file_analysis", "text_analysis", "calculator"],
 )
 
 MOVIE_RECOMMENDER_AGENT = AgentProfile(
@@ -90,9 +90,10 @@ Rules:
 - Be concise but engaging
 - Prefer quality over quantity
 """,
-    tools=[
-        get_now_playing_movies,
-        web_search,
-        wiki_search,
-    ],
-)
\ No newline at end of file
+    tools=["get_now_playing_movies", "web_search", "wiki_search"],
+)
+# Every profile, by id, in tab order
+PROFILES: dict[str, AgentProfile] = {
+    profile.id: profile
+    for profile in [TUTOR_AGENT, TRAVEL_AGENT, DATA_ANALYST_AGENT, RESEARCH_AGENT, MOVIE_RECOMMENDER_AGENT]
+}
@@ -1,84 +1,291 @@
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_community.vectorstores import FAISS
 from langchain_community.docstore.in_memory import InMemoryDocstore
-from markdownify import markdownify
+from langchain_core.documents import Document
 from langchain_text_splitters import MarkdownHeaderTextSplitter
+from app.core.config import settings
+from app.agents.embedding_cache import CachedEmbeddings
+from app.agents.keyword_index import BM25Index, reciprocal_rank_fusion, tokenize
+from app.agents.vector_index import SQLiteDocstore, build_index, configure_search, index_io_flags, retire_docstore
 from app.core.logger_config import logger
-from typing import Literal
+from app.utils.html_utils import html_to_markdown
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from typing import Literal, Optional
+import threading
+import hashlib
+import numpy as np
 import faiss
-import re
+import shutil
+import glob
+import json
 import os
 
 FAISS_PATH = "faiss_vector_store"
+PAGES_MANIFEST = "pages.json"
+
+# Split markdown based on sections
+MARKDOWN_SPLITTER = MarkdownHeaderTextSplitter(
+    [("#", "Header 1"), ("##", "Header 2"), ("###", "Header 3")],
+    strip_headers=False,
+)
+
+@dataclass
+class PageEntry:
+    """A visited page: HTTP validators, content hash and the FAISS namespace holding its chunks."""
+    url: str
+    namespace: str
+    content_hash: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    indexed: bool = False
+    docs: list[Document] = field(default_factory=list, repr=False)
+    keyword_index: Optional[BM25Index] = field(default=None, repr=False)
 
 class RAGManager:
+    """
+    Retrieval over visited web pages. Each URL has its own FAISS namespace saved under
+    `FAISS_PATH/<namespace>`, so a page is parsed and embedded once per content version
+    and repeat queries go straight to similarity search. A BM25 keyword index is kept next to
+    each page, so short keyword queries are answered without an embeddings API call.
+
+    Pages are locked individually, so concurrent sessions can ingest and query different
+    pages in parallel. Live indexes are kept in a bounded LRU (`rag_max_live_indexes`,
+    `rag_max_index_memory_mb`); evicted namespaces are reloaded from disk on next use.
+    The index engine (`rag_index_engine`) is configurable; saved indexes are memory-mapped and
+    chunks are read from an on-disk docstore (`rag_docstore`).
+    """
     def __init__(self):
-        self.embeddings = GoogleGenerativeAIEmbeddings(model="models/text-embedding-004")
-        self.vector_store = None
+        # Only chunks never seen before (by content hash) reach the embeddings API
+        self.embeddings = CachedEmbeddings(GoogleGenerativeAIEmbeddings(model="models/text-embedding-004"))
         self.vector_store_path = FAISS_PATH
-        self._load_vector_store()
+        self.max_live_indexes = settings.rag_max_live_indexes
+        self.max_index_bytes = settings.rag_max_index_memory_mb * 1024 * 1024
+        self.vector_stores: OrderedDict[str, FAISS] = OrderedDict()
+        self.index_bytes: dict[str, int] = {}
+        self.evictions = 0
+        self.index_loads = 0
+        self.pages: dict[str, PageEntry] = {}
+        self._lock = threading.Lock()  # Guards pages, vector_stores and the manifest
+        self._page_locks: dict[str, threading.Lock] = {}
+        self._load_manifest()
 
-    def _load_vector_store(self):
-        """Loads the vector store from disk if it exists, otherwise creates a new one."""
-        if os.path.exists(self.vector_store_path):
+    def _load_manifest(self):
+        """Loads the visited pages manifest from disk if it exists."""
+        manifest_path = os.path.join(self.vector_store_path, PAGES_MANIFEST)
+        if os.path.exists(manifest_path):
             try:
-                self.vector_store = FAISS.load_local(self.vector_store_path, self.embeddings, allow_dangerous_deserialization=True)
-                logger.info("Vector store loaded successfully.")
+                with open(manifest_path, "r", encoding="utf-8") as f:
+                    self.pages = {url: PageEntry(**entry) for url, entry in json.load(f).items()}
+                logger.info(f"Pages manifest loaded successfully ({len(self.pages)} pages).")
             except Exception as e:
-                self.vector_store = None
+                logger.error(f"Error loading pages manifest: {e}")
+                self.pages = {}
+
+    def _save_manifest(self):
+        with self._lock:
+            manifest = {url: {k: v for k, v in asdict(entry).items() if k not in ("docs", "keyword_index")} for url, entry in self.pages.items()}
+        os.makedirs(self.vector_store_path, exist_ok=True)
+        tmp_path = os.path.join(self.vector_store_path, f"{PAGES_MANIFEST}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, os.path.join(self.vector_store_path, PAGES_MANIFEST))
+
+    def _page_lock(self, url: str) -> threading.Lock:
+        with self._lock:
+            return self._page_locks.setdefault(url, threading.Lock())
+
+    def _get_page(self, url: str) -> Optional[PageEntry]:
+        with self._lock:
+            return self.pages.get(url)
+
+    def _new_vector_store(self, entry: PageEntry, vectors: np.ndarray) -> FAISS:
+        """Empty vector store for a page, with the index engine and docstore chosen in settings."""
+        if settings.rag_docstore == "disk":
+            # One file per content version, so readers of the previous version are not affected (see retire_docstore)
+            docstore = SQLiteDocstore(os.path.join(self.vector_store_path, entry.namespace, f"docstore-{entry.content_hash[:16]}.sqlite3"))
         else:
-            index = faiss.IndexHNSWFlat(768, 10)  # (emb_size, n_neighbors)
-            self.vector_store = FAISS(embedding_function=self.embeddings,
-                                      index=index,  # where to store the vectors
-                                      docstore=InMemoryDocstore(),  # where to store documents metadata
-                                      index_to_docstore_id={}  # how to map index to docstore
-                                      )
-            logger.info("Initializing new vector store.")
-
-    def clear_vector_store(self):
-        """Delete all docs from vector store"""
-        self.vector_store.delete()
-        
-    def ingest_documents_from_html(self, html: str):
-        """Load documents from HTML to the vector store."""
-        # Convert the HTML content to Markdown
-        markdown_content = markdownify(html).strip()
-
-        # Remove multiple line breaks
-        markdown_content = re.sub(r"\n{3,}", "\n\n", markdown_content)[:40000]
-
-        # Split markdown based on sections
-        headers_to_split_on = [
-            ("#", "Header 1"),
-            ("##", "Header 2"),
-            ("###", "Header 3"),
-        ]
-        markdown_splitter = MarkdownHeaderTextSplitter(headers_to_split_on, strip_headers=False)
-        docs = markdown_splitter.split_text(markdown_content)
+            docstore = InMemoryDocstore()
+        return FAISS(embedding_function=self.embeddings,
+                     index=build_index(vectors),  # where to store the vectors
+                     docstore=docstore,  # where to store documents metadata
+                     index_to_docstore_id={}  # how to map index to docstore
+                     )
+
+    @staticmethod
+    def _estimate_index_bytes(vector_store: FAISS) -> int:
+        """Approximate resident size of an index: vectors, HNSW links and stored chunk text."""
+        index = faiss.downcast_index(vector_store.index)
+        codes = faiss.downcast_index(index.storage) if isinstance(index, faiss.IndexHNSW) else index
+        size = index.ntotal * getattr(codes, "code_size", index.d * 4)
+        if isinstance(index, faiss.IndexHNSW):
+            size += index.ntotal * index.hnsw.nb_neighbors(0) * 4
+        if isinstance(vector_store.docstore, InMemoryDocstore):
+            size += sum(len(doc.page_content) + len(doc.metadata) * 64 for doc in vector_store.docstore._dict.values())
+        return size
+
+    def _cache_vector_store(self, namespace: str, vector_store: FAISS):
+        """Add a live index to the LRU and evict the least recently used ones over budget."""
+        with self._lock:
+            self.vector_stores[namespace] = vector_store
+            self.vector_stores.move_to_end(namespace)
+            self.index_bytes[namespace] = self._estimate_index_bytes(vector_store)
+            while len(self.vector_stores) > 1 and (
+                len(self.vector_stores) > self.max_live_indexes or sum(self.index_bytes.values()) > self.max_index_bytes
+            ):
+                evicted, _ = self.vector_stores.popitem(last=False)
+                self.index_bytes.pop(evicted, None)
+                self.evictions += 1
+                # Chunks of indexed pages are restored from the index on disk
+                for entry in self.pages.values():
+                    if entry.namespace == evicted and entry.indexed:
+                        entry.docs = []
+                        entry.keyword_index = None
+                logger.info(f"Vector store {evicted} evicted from memory.")
+
+    def _load_vector_store(self, namespace: str) -> Optional[FAISS]:
+        """Loads a namespace vector store from memory or disk."""
+        with self._lock:
+            if namespace in self.vector_stores:
+                self.vector_stores.move_to_end(namespace)
+                return self.vector_stores[namespace]
+        path = os.path.join(self.vector_store_path, namespace)
+        if os.path.exists(path):
+            try:
+                try:
+                    vector_store = FAISS.load_local(path, self.embeddings, allow_dangerous_deserialization=True, io_flags=index_io_flags())
+                except RuntimeError:
+                    # Not every index type can be memory-mapped
+                    vector_store = FAISS.load_local(path, self.embeddings, allow_dangerous_deserialization=True)
+                configure_search(vector_store.index)
+                with self._lock:
+                    self.index_loads += 1
+                self._cache_vector_store(namespace, vector_store)
+                logger.info(f"Vector store {namespace} loaded successfully.")
+                return vector_store
+            except Exception as e:
+                logger.error(f"Error loading vector store {namespace}: {e}")
+        return None
+
+    def stats(self) -> dict:
+        """Memory accounting of the live indexes, LRU eviction/reload counts and embedding cache counters, for monitoring."""
+        with self._lock:
+            return {
+                "pages": len(self.pages),
+                "live_indexes": len(self.vector_stores),
+                "live_index_bytes": sum(self.index_bytes.values()),
+                "evictions": self.evictions,
+                "index_loads": self.index_loads,
+                "embeddings": self.embeddings.stats(),
+            }
+
+    @staticmethod
+    def _split_html(html: str) -> list[Document]:
+        """Convert HTML to markdown (up to `rag_max_page_chars`) and split it into header sections."""
+        return MARKDOWN_SPLITTER.split_text(html_to_markdown(html, settings.rag_max_page_chars))
+
+    def _page_docs(self, entry: PageEntry) -> list[Document]:
+        """Parsed chunks of a page, restored from its vector store after a restart or an eviction."""
+        if not entry.docs and entry.indexed:
+            vector_store = self._load_vector_store(entry.namespace)
+            if vector_store is not None:
+                docs = [vector_store.docstore.search(doc_id) for doc_id in vector_store.index_to_docstore_id.values()]
+                return sorted(docs, key=lambda doc: doc.metadata.get("chunk_index", 0))
+        return entry.docs
+
+    def page_request_headers(self, url: str) -> dict[str, str]:
+        """Conditional request headers (If-None-Match / If-Modified-Since) for a known page."""
+        with self._page_lock(url):
+            entry = self._get_page(url)
+            if entry is None or not self._page_docs(entry):
+                return {}
+            headers = {}
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+            return headers
+
+    def load_page(self, url: str, html: Optional[str], etag: Optional[str] = None, last_modified: Optional[str] = None) -> list[Document]:
+        """
+        Return the parsed chunks of a page. `html=None` means the server answered 304 Not Modified.
+        The page is only re-parsed (and later re-embedded) when its content hash changed.
+        """
+        with self._page_lock(url):
+            entry = self._get_page(url)
+            if html is None:
+                if entry is None:
+                    raise ValueError(f"Page {url} was not modified but is not cached.")
+                return self._page_docs(entry)
+
+            content_hash = hashlib.sha256(html.encode("utf-8")).hexdigest()
+            if entry is not None and entry.content_hash == content_hash:
+                docs = self._page_docs(entry)
+                if docs:
+                    entry.etag, entry.last_modified = etag, last_modified
+                    return docs
+
+            docs = self._split_html(html)
+            for i, doc in enumerate(docs):
+                doc.metadata.update({"url": url, "chunk_index": i})
+            namespace = hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+            with self._lock:
+                if self.vector_stores.pop(namespace, None) is not None:
+                    self.index_bytes.pop(namespace, None)
+                self.pages[url] = PageEntry(url, namespace, content_hash, etag, last_modified, indexed=False, docs=docs)
+            self._save_manifest()
+            return docs
+
+    @staticmethod
+    def _save_vector_store(vector_store: FAISS, namespace_path: str) -> None:
+        """
+        Save to a temp dir, then move each file into place. A loaded index may still be memory-mapped:
+        os.replace gives the new version a new inode instead of rewriting the mapped file.
+        """
+        tmp_path = f"{namespace_path}.{threading.get_ident()}.tmp"
+        try:
+            vector_store.save_local(tmp_path)
+            os.makedirs(namespace_path, exist_ok=True)
+            for name in ("index.faiss", "index.pkl"):
+                os.replace(os.path.join(tmp_path, name), os.path.join(namespace_path, name))
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    def _ensure_indexed(self, entry: PageEntry) -> Optional[FAISS]:
+        """Embed the page chunks into its namespace once, and persist the namespace to disk."""
+        if entry.indexed:
+            vector_store = self._load_vector_store(entry.namespace)
+            if vector_store is not None:
+                return vector_store
+        docs = self._page_docs(entry)
         if not docs:
-            return "No content could be parsed from the webpage."
+            return None
+        texts = [doc.page_content for doc in docs]
+        vectors = self.embeddings.embed_documents(texts)
+        vector_store = self._new_vector_store(entry, np.asarray(vectors, dtype=np.float32))
+        vector_store.add_embeddings(zip(texts, vectors), metadatas=[doc.metadata for doc in docs])
+        namespace_path = os.path.join(self.vector_store_path, entry.namespace)
+        self._save_vector_store(vector_store, namespace_path)
+        # Docstores of previous content versions, deleted once no loaded store reads them
+        current = getattr(vector_store.docstore, "path", None)
+        for stale in glob.glob(os.path.join(namespace_path, "docstore-*.sqlite3")):
+            if stale != current:
+                retire_docstore(stale)
+        entry.indexed = True
+        self._cache_vector_store(entry.namespace, vector_store)
+        self._save_manifest()
+        logger.info(f"Indexed {len(docs)} sections of {entry.url}")
+        return vector_store
 
-        # Reset vector store
-        self.clear_vector_store()
-        # Ingest documents into vector store
-        self.vector_store.add_documents(docs)
-
-    def retrieve_html_section(self, html:str, section: Literal['start', 'middle', 'end']) -> str:
-        markdown_content = markdownify(html).strip()
-        markdown_content = re.sub(r"\n{3,}", "\n\n", markdown_content)[:40000]
-        # Split markdown based on sections
-        headers_to_split_on = [
-            ("#", "Header 1"),
-            ("##", "Header 2"),
-            ("###", "Header 3"),
-        ]
-        markdown_splitter = MarkdownHeaderTextSplitter(headers_to_split_on, strip_headers=False)
-        docs = markdown_splitter.split_text(markdown_content)
+    def retrieve_html_section(self, url: str, section: Literal['start', 'middle', 'end']) -> str:
+        with self._page_lock(url):
+            entry = self._get_page(url)
+            docs = self._page_docs(entry) if entry else []
         if not docs:
             return "No content could be parsed from the webpage."
         if len(docs) < 3:
             return "\n\n".join([doc.page_content for doc in docs])
-        
+
         third = len(docs) // 3
         if section == "start":
             return "\n\n".join([doc.page_content for doc in docs[:third]])
@@ -87,13 +294,62 @@ class RAGManager:
         elif section == "end":
             return "\n\n".join([doc.page_content for doc in docs[-third:]])
 
-    
-    def retrieve_documents(self, query: str, k:int=3):
-        """Retrieves most similar documents"""
-        results = self.vector_store.similarity_search(query, k=k)
+    def _keyword_index(self, entry: PageEntry) -> Optional[BM25Index]:
+        """BM25 index of the page chunks, built on first use."""
+        if entry.keyword_index is None:
+            docs = self._page_docs(entry)
+            if docs:
+                entry.keyword_index = BM25Index(docs)
+        return entry.keyword_index
+
+    @staticmethod
+    def _is_keyword_query(query: str, keyword_index: BM25Index) -> bool:
+        """Short queries whose terms all appear on the page (names, versions, prices) skip the vector search."""
+        terms = tokenize(query)
+        return 0 < len(terms) <= settings.rag_keyword_query_max_terms and all(term in keyword_index for term in terms)
+
+    def _keyword_search(self, keyword_index: BM25Index, query: str, k: int, score_threshold: float) -> list[Document]:
+        """BM25 matches, keeping those scoring at least `score_threshold` relative to the best match."""
+        results = keyword_index.search(query, k)
+        if not results:
+            return []
+        best = results[0][1]
+        return [doc for doc, score in results if score / best >= score_threshold]
+
+    def retrieve_documents(self, url: str, query: str, k: Optional[int] = None, score_threshold: Optional[float] = None,
+                           mode: Optional[Literal["vector", "hybrid"]] = None):
+        """
+        Retrieves the sections of a page most relevant to the query.
+        In hybrid mode BM25 and vector rankings are fused with reciprocal rank fusion, and keyword
+        queries are answered from BM25 alone. Candidates below `score_threshold` (vector relevance,
+        or BM25 score relative to the best match) are dropped before fusion.
+        """
+        k = k or settings.rag_top_k
+        score_threshold = settings.rag_score_threshold if score_threshold is None else score_threshold
+        mode = mode or settings.rag_retrieval_mode
+        fetch_k = k * 4
+
+        with self._page_lock(url):
+            entry = self._get_page(url)
+            keyword_index = self._keyword_index(entry) if entry and mode == "hybrid" else None
+            keyword_results = self._keyword_search(keyword_index, query, fetch_k, score_threshold) if keyword_index else []
+            if keyword_index is not None and keyword_results and self._is_keyword_query(query, keyword_index):
+                logger.info(f"Keyword query {query!r} on {url} answered from BM25, vector search skipped")
+                return "\n\n".join([doc.page_content for doc in keyword_results[:k]])
+            vector_store = self._ensure_indexed(entry) if entry else None
+        if vector_store is None:
+            return "No content could be parsed from the webpage."
+
+        vector_results = [
+            doc for doc, _ in vector_store.similarity_search_with_relevance_scores(
+                query, k=fetch_k if mode == "hybrid" else k, score_threshold=score_threshold or None
+            )
+        ]
+        if mode == "hybrid":
+            results = [doc for doc, _ in reciprocal_rank_fusion([keyword_results, vector_results], settings.rag_rrf_k)[:k]]
+        else:
+            results = vector_results
         if results:
             return "\n\n".join([doc.page_content for doc in results])
         else:
             return "No matching sections"
-     
-
@@ -0,0 +1,65 @@
+from langchain.chat_models import init_chat_model
+from langchain_core.language_models import BaseChatModel
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.mongodb import MongoDBSaver
+from app.core.config import settings
+from app.core.logger_config import logger
+from app.agents.metrics import instrument_checkpointer
+from app.agents.persistence import setup_persistence, AsyncMongoDBSaver, CheckpointerType
+from functools import lru_cache
+from typing import Optional
+import asyncio
+import weakref
+
+class AgentRuntime:
+    """
+    Process-wide resources shared by every agent profile:
+    - one chat model client per (provider, model, temperature)
+    - one pooled MongoDB client and a single checkpointer built on top of it
+    """
+    def __init__(self):
+        self._llms: dict[tuple[str, str, float], BaseChatModel] = {}
+        self._persistence: Optional[tuple[CheckpointerType, BaseCheckpointSaver]] = None
+        self._persistence_locks: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock] = weakref.WeakKeyDictionary()
+
+    @property
+    def _persistence_lock(self) -> asyncio.Lock:
+        # An asyncio.Lock waited on by one loop can't be used by another
+        return self._persistence_locks.setdefault(asyncio.get_running_loop(), asyncio.Lock())
+
+    def get_llm(self, provider: Optional[str] = None, model: Optional[str] = None, temperature: Optional[float] = None) -> BaseChatModel:
+        """Return the shared chat model for the given configuration, defaulting to settings."""
+        key = (
+            provider or settings.llm_provider,
+            model or settings.llm_model,
+            settings.llm_temperature if temperature is None else temperature,
+        )
+        if key not in self._llms:
+            self._llms[key] = init_chat_model(f"{key[0]}:{key[1]}", temperature=key[2])
+            logger.info(f"Chat model initialized: {key[0]}:{key[1]} (temperature={key[2]})")
+        return self._llms[key]
+
+    async def get_persistence(self) -> tuple[CheckpointerType, BaseCheckpointSaver]:
+        """Return the shared checkpointer, connecting to MongoDB on first use only."""
+        async with self._persistence_lock:
+            if self._persistence is None:
+                self._persistence = await self._connect()
+                instrument_checkpointer(self._persistence[1])
+            return self._persistence
+
+    async def _connect(self) -> tuple[CheckpointerType, BaseCheckpointSaver]:
+        """Create the checkpointer (the benchmarks override this to hand out a stand-in)."""
+        return await setup_persistence()
+
+    async def aclose(self) -> None:
+        """Release the pooled MongoDB connections."""
+        checkpointer = self._persistence[1] if self._persistence else None
+        if isinstance(checkpointer, AsyncMongoDBSaver):
+            await checkpointer.aclose()
+        elif isinstance(checkpointer, MongoDBSaver):
+            await asyncio.to_thread(checkpointer.close)
+        self._persistence = None
+
+@lru_cache
+def get_agent_runtime() -> AgentRuntime:
+    return AgentRuntime()
@@ -0,0 +1,41 @@
+from app.core.config import settings
+import gradio as gr
+import time
+
+class StreamingReply:
+    """
+    Assistant reply built from streamed text chunks.
+    Chunks are appended to a list and folded into a single, in-place `gr.ChatMessage`
+    only when the UI should be refreshed (every `flush_interval_ms` or `flush_chars` characters).
+    """
+    def __init__(self, flush_interval_ms: int | None = None, flush_chars: int | None = None):
+        self.message = gr.ChatMessage(role="assistant", content="")
+        self.flush_interval = (settings.stream_flush_interval_ms if flush_interval_ms is None else flush_interval_ms) / 1000
+        self.flush_chars = settings.stream_flush_chars if flush_chars is None else flush_chars
+        self._pending: list[str] = []
+        self._pending_chars = 0
+        self._last_flush = time.monotonic()
+
+    def append(self, text: str) -> bool:
+        """Buffer a chunk. Returns True when the message was refreshed and the UI should be updated."""
+        if not text:
+            return False
+        self._pending.append(text)
+        self._pending_chars += len(text)
+        if self._pending_chars >= self.flush_chars or time.monotonic() - self._last_flush >= self.flush_interval:
+            return self.flush()
+        return False
+
+    def flush(self) -> bool:
+        """Fold pending chunks into the message. Returns True if the content changed."""
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return False
+        self.message.content += "".join(self._pending)
+        self._pending.clear()
+        self._pending_chars = 0
+        return True
+
+    @property
+    def text(self) -> str:
+        return self.message.content + "".join(self._pending)
@@ -0,0 +1,186 @@
+from app.core.config import settings
+from app.core.logger_config import logger
+from collections import OrderedDict, defaultdict
+from functools import lru_cache, wraps
+from typing import Any, Awaitable, Callable, Optional
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+class MemoryCacheBackend:
+    """In-process LRU store of (value, expires_at) pairs."""
+    blocking = False
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[tuple[Any, float]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, value: Any, expires_at: float) -> int:
+        """Store an entry, returns the number of evicted entries."""
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        evicted = 0
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            evicted += 1
+        return evicted
+
+    def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class SQLiteCacheBackend:
+    """On-disk LRU store that survives restarts. Values must be JSON serializable."""
+    blocking = True
+
+    def __init__(self, path: str, max_entries: int):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tool_cache (key TEXT PRIMARY KEY, value TEXT, expires_at REAL, accessed_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tool_cache_accessed ON tool_cache (accessed_at)")
+        self._conn.execute("DELETE FROM tool_cache WHERE expires_at < ?", (time.time(),))
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[tuple[Any, float]]:
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM tool_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE tool_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, expires_at: float) -> int:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tool_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, time.time()),
+            )
+            evicted = self._conn.execute(
+                "DELETE FROM tool_cache WHERE key IN (SELECT key FROM tool_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+            self._conn.commit()
+        return evicted
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM tool_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM tool_cache").fetchone()[0]
+
+class ToolCache:
+    """
+    TTL cache for tool results with request coalescing:
+    concurrent calls with the same key share a single in-flight fetch.
+    The fetch runs in its own task, so a caller being cancelled (a user stopping a turn) doesn't
+    cancel it for the others; it is only cancelled when no caller is waiting for it anymore.
+    Only successful results are cached, exceptions propagate to every waiter.
+    """
+    def __init__(self, backend: MemoryCacheBackend | SQLiteCacheBackend):
+        self.backend = backend
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self._waiters: dict[str, int] = {}
+        self._stats: dict[str, dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0})
+
+    async def _call_backend(self, method: Callable, *args):
+        if self.backend.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def _fetch(self, name: str, key: str, ttl: float, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        value = await fetch()
+        self._stats[name]["evictions"] += await self._call_backend(self.backend.set, key, value, time.time() + ttl)
+        return value
+
+    def _fetch_done(self, key: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            task.exception()  # Mark as retrieved when nobody else is waiting
+
+    async def get_or_fetch(self, name: str, key: str, ttl: float, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        stats = self._stats[name]
+        entry = await self._call_backend(self.backend.get, key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at > time.time():
+                stats["hits"] += 1
+                return value
+            await self._call_backend(self.backend.delete, key)
+
+        task = self._in_flight.get(key)
+        if task is None:
+            stats["misses"] += 1
+            task = self._in_flight[key] = asyncio.ensure_future(self._fetch(name, key, ttl, fetch))
+            task.add_done_callback(lambda done: self._fetch_done(key, done))
+        else:
+            stats["coalesced"] += 1
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[key] == 1 and not task.done():
+                # Last waiter gone: stop the fetch, and don't hand it to a new caller
+                task.cancel()
+                if self._in_flight.get(key) is task:
+                    del self._in_flight[key]
+            raise
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Hit/miss counters per tool, for monitoring."""
+        return {name: dict(counters) for name, counters in self._stats.items()}
+
+@lru_cache
+def get_tool_cache() -> ToolCache:
+    if settings.tool_cache_backend == "disk":
+        backend = SQLiteCacheBackend(settings.tool_cache_path, settings.tool_cache_max_entries)
+    else:
+        backend = MemoryCacheBackend(settings.tool_cache_max_entries)
+    logger.info(f"Tool cache initialized ({settings.tool_cache_backend} backend)")
+    return ToolCache(backend)
+
+def _cache_key(name: str, args: tuple, kwargs: dict) -> str:
+    # Case and surrounding whitespace don't change the answer of the cached upstreams
+    normalize = lambda v: v.strip().casefold() if isinstance(v, str) else v
+    payload = json.dumps([name, [normalize(a) for a in args], {k: normalize(v) for k, v in sorted(kwargs.items())}], default=str)
+    return f"{name}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+def cached(name: str):
+    """
+    Cache the result of an async fetch function for `settings.tool_cache_ttls[name]` seconds.
+    Tools without a configured TTL are not cached.
+    """
+    def decorator(func: Callable[..., Awaitable[Any]]):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            ttl = settings.tool_cache_ttls.get(name)
+            if not ttl:
+                return await func(*args, **kwargs)
+            key = _cache_key(name, args, kwargs)
+            return await get_tool_cache().get_or_fetch(name, key, ttl, lambda: func(*args, **kwargs))
+        return wrapper
+    return decorator
@@ -1,140 +1,215 @@
 from langchain.tools import tool
-from duckduckgo_search import DDGS
-from typing import Annotated, Literal, Optional
-from langchain_community.tools import ArxivQueryRun
+from typing import TYPE_CHECKING, Annotated, Literal, Optional
 from app.core.logger_config import logger
-from app.agents.retriever import RAGManager
-import wikipedia
-import requests
-import duckdb
-from google import genai
-from google.genai import types
-from typing import Annotated
-import pandas as pd
+from app.core.config import settings
+from app.agents.tool_cache import cached
+from app.utils.text_utils import read_text_page
+from langgraph.config import get_config
+import httpx
 from functools import lru_cache
+import asyncio
 import os
 import json
 
+# Heavy dependencies (faiss, duckdb, google-genai, search clients) are imported when a tool first needs them
+if TYPE_CHECKING:
+    from app.agents.retriever import RAGManager
+    from app.agents.datasets import DatasetManager
+    from app.agents.media import GeminiFileCache
+
 # RAG Manager
 @lru_cache
-def get_rag_manager():
+def get_rag_manager() -> "RAGManager":
+    from app.agents.retriever import RAGManager
     return RAGManager()
 
+# Dataset Manager (uploaded CSV/Excel files cached as Parquet)
+@lru_cache
+def get_dataset_manager() -> "DatasetManager":
+    from app.agents.datasets import DatasetManager
+    return DatasetManager()
+
+# Read-only queries, plus temp tables/views for intermediate results
+def current_thread_id() -> Optional[str]:
+    """thread_id of the conversation a tool is running for, if any."""
+    try:
+        return get_config().get("configurable", {}).get("thread_id")
+    except RuntimeError:
+        return None
+
+# Shared HTTP client (keep-alive connection pool)
+@lru_cache
+def get_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=settings.http_timeout_seconds,
+        limits=httpx.Limits(max_connections=settings.http_max_connections),
+        follow_redirects=True,
+    )
+
+# Per-tool concurrency limits, so a burst of users doesn't hammer one upstream
+_tool_semaphores: dict[str, asyncio.Semaphore] = {}
+
+def get_tool_semaphore(tool_name: str) -> asyncio.Semaphore:
+    if tool_name not in _tool_semaphores:
+        limit = settings.tool_concurrency_limits.get(tool_name, settings.tool_default_concurrency)
+        _tool_semaphores[tool_name] = asyncio.Semaphore(limit)
+    return _tool_semaphores[tool_name]
+
 # Gemini multimodal client
 @lru_cache
 def get_gemini_multimodal_client():
+    from google import genai
     if os.getenv("GOOGLE_API_KEY"):
         return genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
     else:
         return genai.Client()
 
 @tool
-def visit_web_page(url: str, query: str, section_position: Optional[Literal["start", "middle", "end"]] = None) -> str:
+async def visit_web_page(url: str, query: str, section_position: Optional[Literal["start", "middle", "end"]] = None) -> str:
     """
     Visits a webpage at the given url, reads its content as markdown and return relevant sections based on query.
     A section_position relative to the document (start, middle, end) can be added if needed.
     """
     try:
-        rag_manager = get_rag_manager()
-        response = requests.get(url, timeout=20)
-        response.raise_for_status()  # Raise an exception for bad status codes
-        html = response.text
+        # Parsing and embedding are blocking, keep them off the event loop
+        rag_manager = await asyncio.to_thread(get_rag_manager)
+
+        # Revalidate a cached page instead of downloading it again
+        headers = await asyncio.to_thread(rag_manager.page_request_headers, url)
+        async with get_tool_semaphore("visit_web_page"):
+            response = await get_http_client().get(url, headers=headers)
+        if response.status_code == 304:
+            html = None
+        else:
+            response.raise_for_status()  # Raise an exception for bad status codes
+            html = response.text
+        await asyncio.to_thread(rag_manager.load_page, url, html, response.headers.get("ETag"), response.headers.get("Last-Modified"))
 
         # Optional: Section bias toward start, middle, or end
         if section_position:
-            return rag_manager.retrieve_html_section(html , section_position)
+            return await asyncio.to_thread(rag_manager.retrieve_html_section, url, section_position)
 
-        # Ingest documents into vector store
-        rag_manager.ingest_documents_from_html(html)
-        # Retrieve most similar documents
-        return rag_manager.retrieve_documents(query)
+        # Retrieve most similar documents (the page is embedded on first use only)
+        return await asyncio.to_thread(rag_manager.retrieve_documents, url, query)
     
     except Exception as e:
         logger.error(f"Web Visiting tool error: {str(e)}")
         return f"Could not access the website. Error: {str(e)[:100]}..."
 
+# Upstream fetches raise on failure, so only successful results end up in the tool cache
+@cached("web_search")
+async def _fetch_web_search(query: str) -> str:
+    from duckduckgo_search import DDGS
+    async with get_tool_semaphore("web_search"):
+        results = await asyncio.to_thread(DDGS().text, query, max_results=8)
+    if len(results) == 0:
+        raise ValueError("No results found! Try a less restrictive/shorter query.")
+    postprocessed_results = [f"[{result['title']}]({result['href']})\n{result['body']}" for result in results]
+    return "## Search Results\n\n" + "\n\n".join(postprocessed_results)
+
 @tool
-def web_search(query: str) -> str:
+async def web_search(query: str) -> str:
     """Search the web for information"""
     try:
-        results = DDGS().text(query, max_results=8)
-        if len(results) == 0:
-            raise ValueError("No results found! Try a less restrictive/shorter query.")
-        postprocessed_results = [f"[{result['title']}]({result['href']})\n{result['body']}" for result in results]
-        return "## Search Results\n\n" + "\n\n".join(postprocessed_results)
+        return await _fetch_web_search(query)
     except Exception as e:
         logger.error(f"Web search tool error: {e}")
         return f"Error searching the web: {str(e)[:100]}..."
     
+@cached("academic_search")
+async def _fetch_academic_search(query: str) -> str:
+    from langchain_community.tools import ArxivQueryRun
+    async with get_tool_semaphore("academic_search"):
+        search = ArxivQueryRun()
+        return await search.ainvoke(query)
+
 @tool
-def academic_search(query: str) -> str:
+async def academic_search(query: str) -> str:
     """Search for arXiv academic papers related to the given query"""
     try:
-        search = ArxivQueryRun()
-        return search.invoke(query)
+        return await _fetch_academic_search(query)
     except Exception as e:
         logger.error(f"Academic search tool error: {e}")
         return f"Error searching the web: {str(e)[:100]}..."
 
+@cached("get_weather")
+async def _fetch_weather(location: str) -> str:
+    url = "http://api.openweathermap.org/data/2.5/weather"
+    params = {"q": location, "appid": os.getenv('OPEN_WEATHER_MAP')}
+    async with get_tool_semaphore("get_weather"):
+        response = await get_http_client().get(url, params=params)
+    response.raise_for_status()
+    data = response.json()
+    main_weather = data["weather"][0]["description"]
+    temperature = data["main"]["temp"] - 273.15  # Convert from Kelvin to Celsius
+    return f"The weather in {location} is currently {main_weather} with a temperature of {temperature:.2f}°C."
+
 @tool
-def get_weather(location: Annotated[str, "City Name"]) -> str:
+async def get_weather(location: Annotated[str, "City Name"]) -> str:
     """Get the current weather for a given location"""
-    api_key = os.getenv('OPEN_WEATHER_MAP')
-    url = f"http://api.openweathermap.org/data/2.5/weather?q={location}&appid={api_key}"
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        main_weather = data["weather"][0]["description"]
-        temperature = data["main"]["temp"] - 273.15  # Convert from Kelvin to Celsius
-        return f"The weather in {location} is currently {main_weather} with a temperature of {temperature:.2f}°C."
+        return await _fetch_weather(location)
     except Exception as e:
         logger.error(f"Weather tool error: {e}")
         return f"Sorry, I couldn't get the weather information at the moment. Error: {str(e)[:100]}..."
 
 
-@tool
-def get_now_playing_movies() -> str:
-    """Get the movies that are now playing in cinema"""
+@cached("get_now_playing_movies")
+async def _fetch_now_playing_movies() -> str:
     url = "https://api.themoviedb.org/3/movie/now_playing"
     params={
         "api_key": os.getenv("TMDB_API_KEY"),
         "language": "en-US",
         "page": 1
     }
+    async with get_tool_semaphore("get_now_playing_movies"):
+        response = await get_http_client().get(url, params=params)
+    response.raise_for_status()
+    data = response.json()
+    movies = data['results'][:5]
+    movie_list = [
+        {
+            'title': movie['title'],
+            'release_date': movie['release_date'],
+            'overview': movie['overview'],
+        }
+        for movie in movies
+    ]
+    return json.dumps(movie_list, indent=2)
+
+@tool
+async def get_now_playing_movies() -> str:
+    """Get the movies that are now playing in cinema"""
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        movies = data['results'][:5]
-        movie_list = [
-            {
-                'title': movie['title'],
-                'release_date': movie['release_date'],
-                'overview': movie['overview'],
-            }
-            for movie in movies
-        ]
-        return json.dumps(movie_list, indent=2)
+        return await _fetch_now_playing_movies()
     except Exception as e:
         logger.error(f"Movie tool error: {e}")
         return f"Couldnt find the movies. Error: {str(e)[:100]}..."
 
-@tool
-def wiki_search(query: str) -> str:
-    """Searches Wikipedia and returns a summary of the top results"""
+def _wiki_page_summary(title: str) -> Optional[str]:
+    import wikipedia
     try:
-        search_results = wikipedia.search(query, results=3)
+        page = wikipedia.page(title)
+        return f"**Wikipedia Page:** {page.title}\n**Summary:** {wikipedia.summary(page.title, sentences=1)}\n**Read more:** {page.url}"
+    except Exception:
+        return None
+
+@cached("wiki_search")
+async def _fetch_wiki_search(query: str) -> str:
+    import wikipedia
+    async with get_tool_semaphore("wiki_search"):
+        search_results = await asyncio.to_thread(wikipedia.search, query, results=3)
         if not search_results:
             raise ValueError("No results found on Wikipedia for that query.")
-        docs = []
-        for res in search_results:
-            try:
-                page = wikipedia.page(res)
-                docs.append(f"**Wikipedia Page:** {page.title}\n**Summary:** {wikipedia.summary(page.title, sentences=1)}\n**Read more:** {page.url}")
-            except Exception as e:
-                continue
-        return "\n\n".join(docs)
+        # Fetch the result pages concurrently
+        docs = await asyncio.gather(*(asyncio.to_thread(_wiki_page_summary, res) for res in search_results))
+    return "\n\n".join(doc for doc in docs if doc)
+
+@tool
+async def wiki_search(query: str) -> str:
+    """Searches Wikipedia and returns a summary of the top results"""
+    try:
+        return await _fetch_wiki_search(query)
     except Exception as e:
         logger.error(f"Wikipedia tool error: {e}")
         return "Could not find wikipedia article for that query"
@@ -147,51 +222,30 @@ def calculator(expression: str) -> str:
     return str(eval(expression, {"__builtins__": None}, {}))
 
 @tool
-def text_analysis(filepath: str) -> str:
+def text_analysis(filepath: str, offset: int = 0) -> str:
     """
     Use this tool to get the text content of a file.
     Supported file types: .txt, .md, .csv, .json, .py, .xlsx
+    Long text files are returned one page at a time: pass the offset given at the end of a page to read the next one.
+    CSV and Excel files are summarized: column types, null counts, distinct counts, quantiles and sample rows.
     """
     ext = os.path.splitext(filepath)[1].lower()
 
     try:
-        if ext == '.txt' or ext == '.md':
-            # For .txt and .md files, simply read the text
-            with open(filepath, 'r', encoding='utf-8') as file:
-                return file.read()
-
-        elif ext == '.csv':
-            # For CSV, return a summary
-            df = pd.read_csv(filepath)
-            summary = f"""
-            CSV file loaded with {df.shape[0]} rows and {df.shape[1]} columns.
-            Columns: {', '.join(df.columns)}
-            Summary statistics:
-            {str(df.describe())}
-            """
-            return summary
+        if ext in ('.txt', '.md', '.py'):
+            # For text files, return a capped page of the text
+            return read_text_page(filepath, offset, settings.text_page_bytes)
+
+        elif ext in ('.csv', '.xlsx'):
+            # For CSV and Excel, return a profile computed by DuckDB in bounded memory
+            return get_dataset_manager().profile(filepath)
 
         elif ext == '.json':
-            # For JSON, load and return the content as a string
-            with open(filepath, 'r', encoding='utf-8') as file:
-                data = json.load(file)
-                return json.dumps(data, indent=4)  # Return pretty-printed JSON
-
-        elif ext == '.py':
-            # For Python files, just read the text
-            with open(filepath, 'r', encoding='utf-8') as file:
-                return file.read()
-
-        elif ext == '.xlsx':
-            # For Excel files, use pandas to read the sheet and return as a string
-            df = pd.read_excel(filepath)
-            summary = f"""
-            Excel file loaded with {df.shape[0]} rows and {df.shape[1]} columns.
-            Columns: {', '.join(df.columns)}
-            Summary statistics:
-            {str(df.describe())}
-            """
-            return summary
+            # For small JSON, return the content pretty-printed, page through large ones
+            if offset == 0 and os.path.getsize(filepath) <= settings.text_page_bytes:
+                with open(filepath, 'r', encoding='utf-8') as file:
+                    return json.dumps(json.load(file), indent=4)
+            return read_text_page(filepath, offset, settings.text_page_bytes)
 
         else:
             raise ValueError(f"Unsupported file type: {ext}")
@@ -203,63 +257,49 @@ def text_analysis(filepath: str) -> str:
 @tool
 def sql_file_analysis(filepath: str, query: Annotated[str, "SQL query"]) -> str:
     """
-    Use this tool to run SQL queries on a CSV or Excel file using DuckDB.
+    Use this tool to run SQL queries on a CSV, Excel or Parquet file using DuckDB.
     Use 'df' as the table name.
     Example: SELECT * FROM df WHERE column_name = 'value'
+    Every file uploaded in the conversation is also a table named after the file (orders.csv -> orders),
+    so files can be joined. CREATE TEMP TABLE keeps intermediate results for the following queries.
+    Large results are truncated and saved to a Parquet file that can be queried again.
     """
-    ext = os.path.splitext(filepath)[1].lower()
     try:
-        if ext == '.csv':
-            df = pd.read_csv(filepath)
-        elif ext == '.xlsx':
-            df = pd.read_excel(filepath)
-        else:
-            raise ValueError(f"Unsupported file type: {ext}")
-        
-        # Validate query
-        if not query.strip().lower().startswith("select"):
-            raise ValueError("Only SELECT queries are supported.")
-        
-        # Run the query using DuckDB
-        result = duckdb.query_df(df, 'df', query).to_df()
-        return result.to_string()
+        # Run the query using DuckDB, in the conversation's session (one SELECT or CREATE TEMP statement only)
+        result = get_dataset_manager().query(filepath, query, thread_id=current_thread_id())
+        return result.render(settings.sql_max_result_chars, settings.sql_result_format)
         
     except Exception as e:
         logger.error(f"SQL Analysis tool error: {e}")
         return f"Error running SQL query on file {filepath}: {str(e)[:100]}..."   
 
+@lru_cache
+def get_gemini_file_cache() -> "GeminiFileCache":
+    from app.agents.media import GeminiFileCache
+    return GeminiFileCache(get_gemini_multimodal_client())
+
 @tool
-def multimodal_analysis(filepath: str, prompt: str) -> str:
+async def multimodal_analysis(filepath: str, prompt: str) -> str:
     """
-    Send a prompt and a file (image, audio or video) to LLM for multimodal analysis
-    Supported file types to analyze: .png, .jpg, .mp3
+    Send a prompt and a file (image, audio, video or PDF) to LLM for multimodal analysis
+    Large files are uploaded once and reused for follow-up prompts about the same file.
     """
+    from google.genai import errors
     try:
-        ext = os.path.splitext(filepath)[1].lower()
-        if ext == ".png":
-            mime_type = "image/png"
-        elif ext == ".jpg":
-            mime_type = "image/jpeg"
-        elif ext == ".mp3":
-            mime_type = "audio/mp3"
-        else:
-            raise ValueError(f"Unsupported file type: {ext}")
-
-        with open(filepath, "rb") as f:
-            file_bytes = f.read()
-        
-        gemini_client = get_gemini_multimodal_client()
-        response = gemini_client.models.generate_content(
-            model='models/gemini-2.5-pro-exp-03-25',
-            contents=[
-            types.Part.from_bytes(
-                data=file_bytes,
-                mime_type=mime_type,
-            ),
-            prompt
-            ]
-        )
-        return response.text
+        file_cache = get_gemini_file_cache()
+        for attempt in range(2):
+            part = await file_cache.part(filepath)
+            try:
+                response = await file_cache.client.aio.models.generate_content(
+                    model='models/gemini-2.5-pro-exp-03-25',
+                    contents=[part, prompt]
+                )
+                return response.text
+            except errors.ClientError as e:
+                # The uploaded file was deleted or expired early: upload it again once
+                if attempt or not part.file_data or e.code not in (403, 404):
+                    raise
+                file_cache.forget(filepath)
     except Exception as e:
         logger.error(f"Error reading file {filepath}: {str(e)}")
         return f"Error reading file {filepath}: {str(e)[:100]}..."
@@ -269,6 +309,7 @@ def youtube_analysis(url: Annotated[str, "Youtube URL"], prompt: str) -> str:
     """
     Send a youtube url and a prompt to LLM for multimodal processing
     """
+    from google.genai import types
     try:
         gemini_client = get_gemini_multimodal_client()
         response = gemini_client.models.generate_content(
@@ -0,0 +1,125 @@
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+from app.core.config import settings
+from app.core.logger_config import logger
+from typing import Optional, Union
+import numpy as np
+import faiss
+import json
+import os
+import sqlite3
+import threading
+import weakref
+
+def build_index(vectors: np.ndarray, engine: Optional[str] = None) -> faiss.Index:
+    """
+    Empty FAISS index for `vectors` (n x dim float32), trained on them when the engine needs it.
+    IVF-PQ falls back to Flat when there are too few vectors to train its quantizers: it needs
+    at least max(`rag_ivfpq_nlist`, 2 ** `rag_ivfpq_nbits`) (256 by default), more chunks than
+    a single web page usually has, so it only pays off for large namespaces.
+    """
+    engine = engine or settings.rag_index_engine
+    n, dim = vectors.shape
+    if engine == "ivfpq" and n < max(settings.rag_ivfpq_nlist, 2 ** settings.rag_ivfpq_nbits):
+        logger.debug(f"{n} vectors are too few to train IVF-PQ, using a Flat index.")
+        engine = "flat"
+
+    if engine == "flat":
+        index = faiss.IndexFlatL2(dim)
+    elif engine == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, settings.rag_hnsw_m)
+        index.hnsw.efConstruction = settings.rag_hnsw_ef_construction
+    elif engine == "ivfpq":
+        quantizer = faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFPQ(quantizer, dim, settings.rag_ivfpq_nlist, settings.rag_ivfpq_m, settings.rag_ivfpq_nbits)
+        index.train(vectors)
+    else:
+        raise ValueError(f"Unknown FAISS index engine: {engine}")
+    configure_search(index)
+    return index
+
+def configure_search(index: faiss.Index) -> None:
+    """Apply the query-time knobs from settings, which are not all persisted with the index."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = settings.rag_hnsw_ef_search
+    elif isinstance(index, faiss.IndexIVF):
+        index.nprobe = settings.rag_ivfpq_nprobe
+
+def index_io_flags() -> int:
+    """Saved indexes are memory-mapped read-only, so their vectors live in the page cache instead of the heap."""
+    return faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if settings.rag_index_mmap else 0
+
+# Docstore files still open in this process, and the retired ones to delete once they are released
+_live_docstores: dict[str, "weakref.WeakSet[SQLiteDocstore]"] = {}
+_retired_docstores: set[str] = set()
+_docstores_lock = threading.Lock()
+
+def _docstore_open(path: str) -> bool:
+    # Iterating skips dead entries, which len() still counts while their weakref callbacks are pending
+    return any(True for _ in _live_docstores.get(path, ()))
+
+def _docstore_released(path: str, conn: sqlite3.Connection) -> None:
+    conn.close()
+    with _docstores_lock:
+        if path in _retired_docstores and not _docstore_open(path):
+            _retired_docstores.discard(path)
+            _live_docstores.pop(path, None)
+            if os.path.exists(path):
+                os.remove(path)
+
+def retire_docstore(path: str) -> None:
+    """Delete a docstore file of an old content version, or once the last store reading it is released."""
+    with _docstores_lock:
+        if _docstore_open(path):
+            _retired_docstores.add(path)
+            return
+        _live_docstores.pop(path, None)
+    if os.path.exists(path):
+        os.remove(path)
+
+class SQLiteDocstore(Docstore, AddableMixin):
+    """
+    On-disk docstore for a FAISS namespace: chunks are read from SQLite on each hit
+    instead of being kept in RAM. Pickles as its path, so `FAISS.save_local` still works.
+    """
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS documents (id TEXT PRIMARY KEY, content TEXT, metadata TEXT)")
+        self._conn.commit()
+        with _docstores_lock:
+            _live_docstores.setdefault(path, weakref.WeakSet()).add(self)
+        weakref.finalize(self, _docstore_released, path, self._conn)
+
+    def __getstate__(self) -> dict:
+        return {"path": self.path}
+
+    def __setstate__(self, state: dict):
+        self.__init__(state["path"])
+
+    def add(self, texts: dict[str, Document]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO documents (id, content, metadata) VALUES (?, ?, ?)",
+                [(doc_id, doc.page_content, json.dumps(doc.metadata)) for doc_id, doc in texts.items()],
+            )
+            self._conn.commit()
+
+    def delete(self, ids: list) -> None:
+        with self._lock:
+            self._conn.executemany("DELETE FROM documents WHERE id = ?", [(doc_id,) for doc_id in ids])
+            self._conn.commit()
+
+    def search(self, search: str) -> Union[str, Document]:
+        with self._lock:
+            row = self._conn.execute("SELECT content, metadata FROM documents WHERE id = ?", (search,)).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(id=search, page_content=row[0], metadata=json.loads(row[1]))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from dotenv import load_dotenv
+from typing import Literal, Optional
 
 load_dotenv()
 
@@ -7,12 +8,99 @@ class Settings(BaseSettings):
     debug: bool = True
     mongodb_uri: str = "mongodb://localhost:27017"
     mongodb_ttl_seconds: int = 604800
+    checkpointer_mode: Literal["async", "sync"] = "async"
+    mongodb_max_pool_size: int = 20
+    mongodb_max_idle_time_ms: int = 60000
+    mongodb_server_selection_timeout_ms: int = 5000
     llm_provider: str = "google_genai"
     llm_model: str = "gemini-2.5-flash"
     llm_temperature: float = 0.2
+    llm_trim_mode: Literal["messages", "tokens"] = "messages"
     max_llm_input_messages: int = 15
-    max_stored_messages: int = 50
+    max_llm_input_tokens: int = 32000
+    max_stored_messages: int = 60
+    stored_messages_after_prune: int = 40
+    summarize_evicted_messages: bool = True
+    summary_max_pending_threads: int = 1000
+    stream_flush_interval_ms: int = 50
+    stream_flush_chars: int = 200
+    http_timeout_seconds: float = 20.0
+    http_max_connections: int = 100
+    tool_default_concurrency: int = 8
+    tool_concurrency_limits: dict[str, int] = {
+        "web_search": 4,
+        "wiki_search": 4,
+        "academic_search": 2,
+        "visit_web_page": 4,
+        "get_weather": 8,
+        "get_now_playing_movies": 4,
+    }
+    tool_cache_backend: Literal["memory", "disk"] = "memory"
+    tool_cache_path: str = "cache/tool_cache.sqlite3"
+    tool_cache_max_entries: int = 1024
+    tool_cache_ttls: dict[str, int] = {
+        "get_weather": 600,
+        "get_now_playing_movies": 21600,
+        "academic_search": 86400,
+        "wiki_search": 86400,
+        "web_search": 3600,
+    }
+    rag_max_live_indexes: int = 32
+    rag_max_index_memory_mb: int = 256
+    rag_max_page_chars: int = 40000
+    rag_retrieval_mode: Literal["vector", "hybrid"] = "hybrid"
+    rag_top_k: int = 3
+    rag_score_threshold: float = 0.0
+    rag_rrf_k: int = 60
+    rag_keyword_query_max_terms: int = 3
+    # ivfpq needs max(rag_ivfpq_nlist, 2 ** rag_ivfpq_nbits) chunks in a namespace, smaller ones use flat
+    rag_index_engine: Literal["flat", "hnsw", "ivfpq"] = "hnsw"
+    rag_hnsw_m: int = 10
+    rag_hnsw_ef_construction: int = 40
+    rag_hnsw_ef_search: int = 64
+    rag_ivfpq_nlist: int = 64
+    rag_ivfpq_m: int = 48
+    rag_ivfpq_nbits: int = 8
+    rag_ivfpq_nprobe: int = 8
+    rag_index_mmap: bool = True
+    rag_docstore: Literal["memory", "disk"] = "disk"
+    embedding_cache_path: str = "cache/embeddings.sqlite3"
+    embedding_cache_max_entries: int = 200000
+    embedding_batch_size: int = 100
+    dataset_cache_dir: str = "cache/datasets"
+    sql_max_result_rows: int = 50
+    sql_max_result_chars: int = 8000
+    sql_result_format: Literal["markdown", "csv"] = "markdown"
+    sql_spill_results: bool = True
+    sql_max_spilled_results: int = 50
+    sql_max_sessions: int = 32
+    sql_sessions_memory_mb: int = 1024
+    sql_session_memory_mb: int = 512
+    sql_session_idle_seconds: int = 1800
+    profile_sample_rows: int = 1000000
+    profile_max_chars: int = 8000
+    text_page_bytes: int = 20000
+    upload_dir: str = "uploads"
+    upload_max_mb: int = 2048
+    upload_ttl_seconds: int = 604800
+    media_inline_max_mb: int = 8
+    media_expiry_margin_seconds: int = 3600
+    media_processing_timeout_seconds: int = 300
+    media_cache_max_files: int = 1000  # Files API URIs and content hashes kept by GeminiFileCache
+    log_mode: Literal["sync", "queue"] = "queue"
+    log_batch_size: int = 256
+    log_flush_interval_seconds: float = 1.0
+    log_file_max_mb: int = 50
+    log_file_backups: int = 5
+    log_max_message_chars: int = 2000
+    log_json_file: Optional[str] = None
+    log_sample_rates: dict[str, float] = {}  # e.g. {"INFO": 0.1, "DEBUG": 0.0}
+    metrics_runs_file: Optional[str] = None  # e.g. "logs/metrics.jsonl" (logs/ is not tracked)
+    metrics_port: Optional[int] = None
+    metrics_host: str = "127.0.0.1"  # "0.0.0.0" exposes per-thread metrics on every interface
+    agent_tabs: list[str] = ["tutor", "travel", "data_analyst", "research", "movie_recommender"]
+    agent_startup: Literal["eager", "lazy"] = "eager"
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
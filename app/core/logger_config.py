@@ -1,51 +1,152 @@
+from app.core.config import settings
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
 import logging
-import logging.config
+import atexit
+import random
+import queue
+import json
 import os
 
 os.makedirs("logs", exist_ok=True)
 
-LOGGING_CONFIG = {
-    "version": 1,
-    "disable_existing_loggers": False,
+class TruncatingFormatter(logging.Formatter):
+    """Formatter that caps the message at `max_chars`, so one huge tool output can't flood the log."""
+    def __init__(self, fmt: Optional[str] = None, max_chars: int = 0):
+        super().__init__(fmt)
+        self.max_chars = max_chars
 
-    "formatters": {
-        "simple": {
-            "format": "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+    def truncate(self, message: str) -> str:
+        if self.max_chars and len(message) > self.max_chars:
+            return f"{message[:self.max_chars]}... [{len(message) - self.max_chars} chars truncated]"
+        return message
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        record.message = self.truncate(record.message)
+        return super().formatMessage(record)
+
+class JsonFormatter(TruncatingFormatter):
+    """One JSON object per line, for log shippers."""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "message": self.truncate(record.getMessage()),
         }
-    },
-
-    "handlers": {
-        "console": {
-            "class": "logging.StreamHandler",
-            "formatter": "simple",
-            "level": "INFO",
-        },
-        "file": {
-            "class": "logging.FileHandler",
-            "filename": "logs/app.log",
-            "mode": "w",
-            "formatter": "simple",
-            "level": "INFO",
-        },
-    },
-    "loggers": {
-        "myapp": {
-            "handlers": ["console", "file"],
-            "level": "INFO",
-            "propagate": False,
-        },
-        "gradio": {
-            "handlers": ["console", "file"],
-            "level": "INFO",
-            "propagate": False,
-        },
-    },
-    "root": {
-        "handlers": ["console", "file"],
-        "level": "ERROR",
-    },
-}
-
-logging.config.dictConfig(LOGGING_CONFIG)
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of the records of each level (1.0 when the level has no rate); warnings and errors should keep 1.0."""
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = {logging.getLevelName(level.upper()): rate for level, rate in rates.items()}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.rates.get(record.levelno, 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+class BatchingRotatingFileHandler(RotatingFileHandler):
+    """Size-rotated file handler that flushes every `batch_size` records instead of after each one."""
+    def __init__(self, filename: str, batch_size: int = 256, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.batch_size = batch_size
+        self._unflushed = 0
+
+    def flush(self) -> None:
+        self._unflushed = 0
+        super().flush()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            if self.shouldRollover(record):
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+            self._unflushed += 1
+            if self._unflushed >= self.batch_size or record.levelno >= logging.WARNING:
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+class LazyQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread: the calling coroutine only
+    enqueues the record, %-style arguments are merged and formatted off the event loop.
+    Arguments must not be mutated after the logging call.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+class BatchingQueueListener(QueueListener):
+    """QueueListener that also flushes its handlers when the queue has been idle for `flush_interval` seconds."""
+    def __init__(self, log_queue: queue.Queue, *handlers: logging.Handler, flush_interval: float = 1.0):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.flush_interval = flush_interval
+
+    def dequeue(self, block: bool) -> logging.LogRecord:
+        while True:
+            try:
+                return self.queue.get(block, self.flush_interval)
+            except queue.Empty:
+                for handler in self.handlers:
+                    handler.flush()
+
+def rotating_file_handler(filename: str, formatter: logging.Formatter) -> BatchingRotatingFileHandler:
+    """Size-rotated file handler, batched in "queue" mode."""
+    handler = BatchingRotatingFileHandler(
+        filename,
+        batch_size=settings.log_batch_size if settings.log_mode == "queue" else 1,
+        maxBytes=settings.log_file_max_mb * 1024 * 1024,
+        backupCount=settings.log_file_backups,
+        encoding="utf-8",
+    )
+    handler.setFormatter(formatter)
+    return handler
+
+def build_handlers() -> list[logging.Handler]:
+    """Console, rotating file and (if `log_json_file` is set) JSON handlers."""
+    formatter = TruncatingFormatter("%(asctime)s | %(levelname)s | %(name)s | %(message)s", settings.log_max_message_chars)
+    console = logging.StreamHandler()
+    console.setFormatter(formatter)
+    handlers = [console, rotating_file_handler("logs/app.log", formatter)]
+    if settings.log_json_file:
+        handlers.append(rotating_file_handler(settings.log_json_file, JsonFormatter(max_chars=settings.log_max_message_chars)))
+    for handler in handlers:
+        handler.setLevel("INFO")
+    return handlers
+
+def configure_logging() -> Optional[QueueListener]:
+    """
+    In "queue" mode, loggers only put records on a queue; a listener thread formats them and
+    writes them in batches. In "sync" mode, every record is written by the logging call.
+    Returns the started listener, if any.
+    """
+    handlers = build_handlers()
+    listener = None
+    if settings.log_mode == "queue":
+        log_queue = queue.SimpleQueue()
+        listener = BatchingQueueListener(log_queue, *handlers, flush_interval=settings.log_flush_interval_seconds)
+        handlers = [LazyQueueHandler(log_queue)]
+    sampling = SamplingFilter(settings.log_sample_rates) if settings.log_sample_rates else None
+
+    for name, level in [("myapp", "INFO"), ("gradio", "INFO"), ("", "ERROR")]:
+        named_logger = logging.getLogger(name or None)
+        named_logger.handlers = list(handlers)
+        named_logger.setLevel(level)
+        if name:
+            named_logger.propagate = False
+        if sampling:
+            # On the logger, so dropped records are never formatted nor enqueued
+            named_logger.addFilter(sampling)
+    if listener is not None:
+        listener.start()
+        atexit.register(listener.stop)
+    return listener
+
+log_listener = configure_logging()
 
 logger = logging.getLogger("myapp")
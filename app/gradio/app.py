@@ -1,31 +1,42 @@
-import asyncio
+import time
+from contextlib import asynccontextmanager
 import gradio as gr
-from app.gradio.views.tutor import create_tutor_agent_view
-from app.gradio.views.travel import create_travel_agent_view
-from app.gradio.views.data_analyst import create_data_analyst_agent_view
+from app.gradio.views.agent_chat import create_agent_view
+from app.agents.base import AgentPool
+from app.agents.profiles import PROFILES
+from app.agents.runtime import get_agent_runtime
 from app.core.logger_config import logger
+from app.core.config import settings
+from app.agents.metrics import start_metrics_server
 
-async def main():
+def main():
     logger.info("Launching Gradio Multi-Agent Interface...")
+    if settings.metrics_port:
+        start_metrics_server(settings.metrics_port, settings.metrics_host)
 
-    tutor_ui = await create_tutor_agent_view()
-    travel_ui = await create_travel_agent_view()
-    data_analyst_ui = await create_data_analyst_agent_view()
+    pool = AgentPool(PROFILES[profile_id] for profile_id in settings.agent_tabs)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        # Runs on the loop serving the requests: the agents and their async MongoDB client are bound to it
+        if settings.agent_startup == "eager":
+            start = time.perf_counter()
+            await pool.build_all()
+            logger.info("%d agents built in %.2fs", len(pool.agents), time.perf_counter() - start)
+        yield
+        await get_agent_runtime().aclose()
 
     # Use Tabs to separate agents
     with gr.Blocks() as demo:
         with gr.Tabs():
-            with gr.TabItem("Tutor"):
-                tutor_ui.render()
-            with gr.TabItem("Travel"):
-                travel_ui.render()
-            with gr.TabItem("Data Analyst"):
-                data_analyst_ui.render()
+            for profile in pool.profiles.values():
+                with gr.TabItem(profile.name):
+                    create_agent_view(profile, pool, demo)
 
-    demo.launch()
+    demo.launch(app_kwargs={"lifespan": lifespan})
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        main()
     except KeyboardInterrupt:
         logger.info("Program interrupted, shutting down gracefully...")
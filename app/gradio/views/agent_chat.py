@@ -0,0 +1,45 @@
+import gradio as gr
+from app.agents.base import AgentPool
+from app.agents.profiles import AgentProfile
+from app.core.logger_config import logger
+from uuid import uuid4
+
+def create_agent_view(profile: AgentProfile, pool: AgentPool, demo: gr.Blocks) -> None:
+    """
+    Chat for `profile`, built inside the current layout block of `demo` (a standalone gr.Blocks
+    per tab would set up its own web app). The agent is taken from `pool`, built on first use if needed.
+    """
+    with gr.Column():
+        thread_id = gr.State("")
+        hist = gr.State([])
+
+        async def load_session():
+            tid = uuid4().hex
+            # A new thread has no history, so an agent that isn't built yet isn't built for it
+            agent = pool.agents.get(profile.id)
+            messages = await agent.load_prev_messages(tid) if agent else []
+            return tid, messages
+
+        async def respond(tid: str, msg_dict: dict, chat_hist: list):
+            try:
+                agent = await pool.get(profile.id)
+            except Exception as e:
+                logger.error("Could not build the %s agent: %s", profile.name, e)
+                yield msg_dict, chat_hist + [gr.ChatMessage(role="assistant", content="Internal error. Try again later ")]
+                return
+            async for update in agent.stream_answer(tid, msg_dict, chat_hist):
+                yield update
+
+        demo.load(load_session, outputs=[thread_id, hist])
+        gr.Markdown(f"## {profile.name} Chat")
+
+        chatbot = gr.Chatbot(value=hist.value, placeholder="Ask anything...", label=profile.name)
+        msg = gr.MultimodalTextbox(
+            placeholder="Ask your question",
+            file_types=[".txt", ".csv", ".md", ".json", ".py", ".xlsx", ".png", ".jpg", ".mp3"],
+            show_label=False,
+            submit_btn=True
+        )
+
+        msg.submit(respond, [thread_id, msg, chatbot], [msg, chatbot])
+        gr.ClearButton([msg, chatbot])
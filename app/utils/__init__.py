@@ -1,4 +1,18 @@
-from .file_utils import download_file
-from .text_utils import try_parse, remove_incomplete_tool_calls
+from importlib import import_module
 
-__all__ = ["download_file", "try_parse", "remove_incomplete_tool_calls"]
\ No newline at end of file
+# Submodules are imported on first use: file_utils pulls in gradio and html_utils bs4/markdownify
+_EXPORTS = {
+    "download_file": "file_utils",
+    "try_parse": "text_utils",
+    "remove_incomplete_tool_calls": "text_utils",
+    "MessageTokenCounter": "text_utils",
+    "read_text_page": "text_utils",
+    "html_to_markdown": "html_utils",
+}
+
+__all__ = ["download_file", "try_parse", "remove_incomplete_tool_calls", "MessageTokenCounter", "html_to_markdown", "read_text_page"]
+
+def __getattr__(name: str):
+    if name in _EXPORTS:
+        return getattr(import_module(f".{_EXPORTS[name]}", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,26 +1,162 @@
-from app.gradio.schemas import FileData
 from pathlib import Path
+from app.core.config import settings
 from app.core.logger_config import logger
-import shutil
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional
+import threading
+import hashlib
+import time
+import re
 import os
 
-def download_file(uploaded_file: FileData | str) -> str:
-    """Process uploaded file from Gradio interface and save it locally"""
+if TYPE_CHECKING:
+    from app.gradio.schemas import FileData
+
+CHUNK_SIZE = 1024 * 1024
+
+class UploadStore:
+    """
+    Content-addressed store of uploaded files.
+    Each distinct content is stored once under `blobs/<sha256>`; every thread sees its uploads
+    under `threads/<thread_id>/<name>` as hard links to the blobs, so two users uploading a
+    different `data.csv` never see each other's file. Uploads on the same filesystem are linked
+    instead of copied, others are hashed while they are copied, so each costs one pass of I/O.
+    Blobs unused for `upload_ttl_seconds`, then the least recently used ones over
+    `upload_max_mb`, are removed together with their thread links. Last use is tracked with
+    touch files under `blobs/.used/`: blobs share their inode with the uploaded file and the
+    thread links, so touching them would change the mtime other code keys caches on.
+    """
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or settings.upload_dir
+        self.blob_dir = os.path.join(self.root, "blobs")
+        self.thread_dir = os.path.join(self.root, "threads")
+        self.used_dir = os.path.join(self.blob_dir, ".used")
+        os.makedirs(self.used_dir, exist_ok=True)
+        os.makedirs(self.thread_dir, exist_ok=True)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _hash_file(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(CHUNK_SIZE):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _copy_and_hash(source: str, target: str) -> str:
+        digest = hashlib.sha256()
+        with open(source, "rb") as src, open(target, "wb") as dst:
+            while chunk := src.read(CHUNK_SIZE):
+                digest.update(chunk)
+                dst.write(chunk)
+        return digest.hexdigest()
+
+    def _mark_used(self, content_hash: str) -> None:
+        used_path = os.path.join(self.used_dir, content_hash)
+        with open(used_path, "a"):
+            pass
+        os.utime(used_path)
+
+    def _last_used(self, entry: os.DirEntry) -> float:
+        try:
+            return os.stat(os.path.join(self.used_dir, entry.name)).st_mtime
+        except FileNotFoundError:
+            return entry.stat().st_mtime
+
+    def _store_blob(self, source: str) -> str:
+        """Blob path holding the content of `source`, stored if not already there."""
+        tmp_path = os.path.join(self.blob_dir, f".{threading.get_ident()}-{time.time_ns()}.tmp")
+        try:
+            try:
+                os.link(source, tmp_path)
+                content_hash = self._hash_file(tmp_path)
+            except OSError:
+                # Other filesystem (or no hard links): copy once, hashing on the way
+                content_hash = self._copy_and_hash(source, tmp_path)
+            blob_path = os.path.join(self.blob_dir, content_hash)
+            with self._lock:
+                if os.path.exists(blob_path):
+                    logger.info(f"Upload deduplicated: {content_hash[:12]}")
+                else:
+                    os.replace(tmp_path, blob_path)
+                self._mark_used(content_hash)
+            return blob_path
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def put(self, source: str, name: str, thread_id: str) -> str:
+        """Store an upload and return its path in the thread's namespace."""
+        blob_path = self._store_blob(source)
+        namespace = os.path.join(self.thread_dir, re.sub(r"[^\w.-]", "_", thread_id) or "default")
+        stem, ext = os.path.splitext(Path(name).name)
+        blob_inode = os.stat(blob_path).st_ino
+        with self._lock:
+            os.makedirs(namespace, exist_ok=True)
+            # Same name and content is the same file; a different content gets a new name
+            for i in range(1, 1000):
+                file_path = os.path.join(namespace, f"{stem}{ext}" if i == 1 else f"{stem}_{i}{ext}")
+                if not os.path.exists(file_path):
+                    os.link(blob_path, file_path)
+                    break
+                if os.stat(file_path).st_ino == blob_inode:
+                    break
+            else:
+                raise FileExistsError(f"Too many different uploads named {name} in this thread")
+        self.collect_garbage(keep=blob_path)
+        return file_path
+
+    def collect_garbage(self, keep: Optional[str] = None) -> int:
+        """Remove expired blobs, then least recently used ones over budget (except `keep`); returns the number removed."""
+        with self._lock:
+            blobs = []
+            for entry in os.scandir(self.blob_dir):
+                if entry.is_file() and not entry.name.startswith(".") and entry.path != keep:
+                    stat = entry.stat()
+                    blobs.append((self._last_used(entry), stat.st_size, stat.st_ino, entry.path))
+            blobs.sort()
+            now = time.time()
+            total = sum(size for _, size, _, _ in blobs)
+            budget = settings.upload_max_mb * 1024 * 1024
+            evicted = {}
+            for mtime, size, inode, path in blobs:
+                if now - mtime <= settings.upload_ttl_seconds and total <= budget:
+                    break
+                evicted[inode] = path
+                total -= size
+            if not evicted:
+                return 0
+
+            for directory, _, files in os.walk(self.thread_dir, topdown=False):
+                for name in files:
+                    path = os.path.join(directory, name)
+                    if os.stat(path).st_ino in evicted:
+                        os.remove(path)
+                if directory != self.thread_dir and not os.listdir(directory):
+                    os.rmdir(directory)
+            for path in evicted.values():
+                os.remove(path)
+                used_path = os.path.join(self.used_dir, os.path.basename(path))
+                if os.path.exists(used_path):
+                    os.remove(used_path)
+        logger.info(f"Upload store: removed {len(evicted)} blobs, {total / 1024 / 1024:.1f} MB kept")
+        return len(evicted)
+
+@lru_cache
+def get_upload_store() -> UploadStore:
+    return UploadStore()
+
+def download_file(uploaded_file: "FileData | str", thread_id: Optional[str] = None) -> Optional[str]:
+    """Process uploaded file from Gradio interface and save it in the thread's upload namespace"""
     try:
-        os.makedirs("temp", exist_ok=True)
         if isinstance(uploaded_file, str):
-            file_path= f"temp/{Path(uploaded_file).name}"
-            if os.path.exists(file_path):
-                return file_path
-            shutil.copy(uploaded_file, file_path)
+            source, name = uploaded_file, Path(uploaded_file).name
         else:
-            file_path = f"temp/{uploaded_file.orig_name}"
-            if os.path.exists(file_path):
-                return file_path
-            # Save the uploaded file locally
-            shutil.copy(uploaded_file.path, file_path)
+            source, name = uploaded_file.path, uploaded_file.orig_name or Path(uploaded_file.path).name
+        file_path = get_upload_store().put(source, name, thread_id or "default")
         logger.info(f"File uploaded and saved to {file_path}")
+        return file_path
     except Exception as e:
         logger.error(f"Error saving uploaded file: {e}")
-        
-    return file_path
\ No newline at end of file
+        return None
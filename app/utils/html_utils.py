@@ -0,0 +1,68 @@
+from bs4 import BeautifulSoup, NavigableString, Tag
+from markdownify import MarkdownConverter
+from collections.abc import Iterator
+import re
+
+# Dropped before parsing: their content never reaches the markdown and can be most of a modern page
+_NON_CONTENT = re.compile(r"<(script|style|noscript|template|svg)\b[^>]*>.*?</\1\s*>|<!--.*?-->", re.IGNORECASE | re.DOTALL)
+_DROPPED_TAGS = ["nav", "iframe", "object", "canvas"]
+
+# Wrappers that are walked into instead of converted as one block, so conversion can stop early
+_CONTAINER_TAGS = {"html", "body", "main", "article", "section", "div", "header", "footer", "aside", "form"}
+_BLOCK_TAGS = _CONTAINER_TAGS | {
+    "p", "h1", "h2", "h3", "h4", "h5", "h6", "ul", "ol", "dl", "table", "pre", "blockquote", "figure", "hr",
+}
+
+# First parsed prefix, in HTML characters per markdown character of budget
+PARSE_WINDOW_FACTOR = 8
+
+_converter = MarkdownConverter(heading_style="ATX")
+
+def _iter_blocks(node: Tag) -> Iterator[Tag | NavigableString]:
+    """Yield the blocks of a document in order, descending into wrappers that contain other blocks."""
+    for child in node.children:
+        if isinstance(child, Tag) and child.name in _CONTAINER_TAGS and child.find(_BLOCK_TAGS, recursive=False):
+            yield from _iter_blocks(child)
+        else:
+            yield child
+
+def _convert_blocks(html: str, max_chars: int) -> tuple[str, bool]:
+    """Convert blocks until the collapsed markdown reaches `max_chars`, returns (markdown, budget_reached)."""
+    soup = BeautifulSoup(html, "lxml")
+    for tag in soup.find_all(_DROPPED_TAGS):
+        tag.decompose()
+
+    pieces: list[str] = []
+    size, next_check = 0, max_chars
+    for block in _iter_blocks(soup.body or soup):
+        piece = _converter.process_element(block, parent_tags=set())
+        if isinstance(block, Tag) and block.name in _BLOCK_TAGS:
+            piece = f"\n\n{piece}\n\n"
+        pieces.append(piece)
+        size += len(piece)
+        # Raw size overestimates the collapsed text, so only stop once the collapsed text is over budget
+        if size >= next_check:
+            collapsed_size = len(_collapse("".join(pieces)))
+            if collapsed_size >= max_chars:
+                return _collapse("".join(pieces))[:max_chars], True
+            next_check = size + max_chars - collapsed_size
+    return _collapse("".join(pieces)), False
+
+def html_to_markdown(html: str, max_chars: int) -> str:
+    """
+    Convert HTML to markdown with "#" headings, at most `max_chars` long.
+    Non-content tags are dropped before parsing, and only a prefix of the page is parsed,
+    growing until the budget is reached, instead of converting the whole page and truncating.
+    """
+    html = _NON_CONTENT.sub("", html)
+    window = max_chars * PARSE_WINDOW_FACTOR
+    while True:
+        markdown, budget_reached = _convert_blocks(html[:window], max_chars)
+        if budget_reached or window >= len(html):
+            return markdown
+        window *= 4
+
+def _collapse(markdown: str) -> str:
+    """Strip and remove multiple line breaks."""
+    markdown = re.sub(r"[ \t]+\n", "\n", markdown.strip())
+    return re.sub(r"\n{3,}", "\n\n", markdown)
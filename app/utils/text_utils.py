@@ -1,6 +1,9 @@
 import json
+import os
+from collections import OrderedDict
 from typing import Any
 from langchain_core.messages import ToolMessage, AIMessage, BaseMessage
+from langchain_core.messages.utils import count_tokens_approximately
 from app.core.logger_config import logger
 
 def try_parse(string: str) -> str | dict[str, Any]:
@@ -73,3 +76,56 @@ def remove_incomplete_tool_calls(messages: list[BaseMessage]) -> list[BaseMessag
             i += 1
     
     return result
+
+
+class MessageTokenCounter:
+    """
+    Approximate (~4 chars/token) token counter for `trim_messages`, memoized per message id.
+    Each stored message is measured once; later calls only sum cached counts.
+    Messages without an id (e.g. the system prompt) are measured on every call.
+    """
+    def __init__(self, max_cached_messages: int = 10000):
+        self.max_cached_messages = max_cached_messages
+        self._cache: OrderedDict[str, int] = OrderedDict()
+
+    def count_message(self, message: BaseMessage) -> int:
+        if message.id is None:
+            return count_tokens_approximately([message])
+        count = self._cache.get(message.id)
+        if count is None:
+            count = count_tokens_approximately([message])
+            self._cache[message.id] = count
+            if len(self._cache) > self.max_cached_messages:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(message.id)
+        return count
+
+    def __call__(self, messages: list[BaseMessage]) -> int:
+        return sum(self.count_message(msg) for msg in messages)
+
+def read_text_page(filepath: str, offset: int = 0, max_bytes: int = 20000) -> str:
+    """
+    Read at most `max_bytes` of a text file from byte `offset`, without loading the rest of it.
+    Pages end on a UTF-8 character boundary; a footer gives the offset of the next page.
+    """
+    size = os.path.getsize(filepath)
+    with open(filepath, "rb") as file:
+        file.seek(offset)
+        chunk = file.read(max_bytes)
+    # Back off from a multi-byte character cut in half, at most 3 bytes
+    for cut in range(min(4, len(chunk) + 1)):
+        try:
+            text = chunk[:len(chunk) - cut].decode("utf-8")
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        text = chunk.decode("utf-8", errors="replace")
+        cut = 0
+    end = offset + len(chunk) - cut
+    if offset == 0 and end >= size:
+        return text
+    footer = f"\n\n[bytes {offset}-{end} of {size}"
+    footer += f"; call again with offset={end} to read more]" if end < size else "; end of file]"
+    return text + footer
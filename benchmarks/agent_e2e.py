@@ -0,0 +1,190 @@
+"""
+Offline end-to-end agent benchmark: the framework overhead of a turn, with no network.
+
+`AIAgent.create` builds the agent from an `AgentProfile` exactly as the app does (middlewares,
+checkpointer instrumentation, logging), but the runtime hands out a `ScriptedChatModel` (streamed
+chunks at a given rate, a given tool-call pattern) and the profile's tools are stubs. Many
+threads then run turns concurrently through `stream_answer` (or `answer`), against MemorySaver and
+AsyncMongoDBSaver on a local in-memory MongoDB stand-in.
+
+Each checkpointer runs in its own subprocess so peak RSS is per run. The JSON report (with the
+git commit) can be saved with --output and compared with a previous one with --baseline.
+
+Usage: python -m benchmarks.agent_e2e --threads 50 --turns 5 --tool-rounds 1 --parallel-calls 2 --output e2e.json
+"""
+from app.agents.base import AIAgent
+from app.agents import metrics
+from app.agents.persistence import AsyncMongoDBSaver, CheckpointerType
+from app.agents.profiles import AgentProfile
+from app.agents.runtime import AgentRuntime
+from app.core.config import settings
+from benchmarks.fakes import FakeAsyncMongoClient, ScriptedChatModel, stub_tool
+from benchmarks.utils import latency_summary
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import MemorySaver
+import argparse
+import asyncio
+import json
+import logging
+import resource
+import subprocess
+import sys
+import time
+
+CHECKPOINTERS = ["MemorySaver", "AsyncMongoDBSaver"]
+TOOL_NAMES = ["web_search", "get_weather", "calculator"]
+
+class BenchRuntime(AgentRuntime):
+    """AgentRuntime handing out a scripted model and a given checkpointer."""
+    def __init__(self, llm: ScriptedChatModel, checkpointer_type: str, checkpointer: BaseCheckpointSaver):
+        super().__init__()
+        self.llm = llm
+        self.checkpointer_type = checkpointer_type
+        self.checkpointer = checkpointer
+
+    def get_llm(self, *args, **kwargs):
+        return self.llm
+
+    async def _connect(self) -> tuple[CheckpointerType, BaseCheckpointSaver]:
+        return self.checkpointer_type, self.checkpointer
+
+def checkpoint_bytes(checkpointer: BaseCheckpointSaver) -> dict[str, int]:
+    """Serialized checkpoint and pending write bytes stored per thread."""
+    sizes: dict[str, int] = {}
+    if isinstance(checkpointer, AsyncMongoDBSaver):
+        for collection, field in [(checkpointer.checkpoint_collection, "checkpoint"), (checkpointer.writes_collection, "value")]:
+            for thread_id, size in collection.stored_bytes(field).items():
+                sizes[thread_id] = sizes.get(thread_id, 0) + size
+    else:
+        for thread_id, namespaces in checkpointer.storage.items():
+            sizes[thread_id] = sum(len(checkpoint[1]) for checkpoints in namespaces.values() for checkpoint, _, _ in checkpoints.values())
+        for (thread_id, _, _), writes in checkpointer.writes.items():
+            sizes[thread_id] = sizes.get(thread_id, 0) + sum(len(value[1]) for _, _, value, _ in writes.values())
+    return sizes
+
+async def run(args: argparse.Namespace, checkpointer_type: str) -> dict:
+    llm = ScriptedChatModel(
+        tool_names=TOOL_NAMES, tool_rounds=args.tool_rounds, parallel_calls=args.parallel_calls,
+        answer_tokens=args.answer_tokens, first_chunk_latency=args.first_chunk_ms / 1000, chunk_interval=args.chunk_interval_ms / 1000,
+    )
+    if checkpointer_type == "AsyncMongoDBSaver":
+        checkpointer = AsyncMongoDBSaver(FakeAsyncMongoClient(args.db_latency_ms / 1000))
+        await checkpointer.setup()
+    else:
+        checkpointer = MemorySaver()
+    profile = AgentProfile(id="bench", name="Benchmark", prompt="You are a benchmark agent.",
+                           tools=[stub_tool(name, args.tool_latency_ms / 1000) for name in TOOL_NAMES])
+    agent = await AIAgent.create(profile, runtime=BenchRuntime(llm, checkpointer_type, checkpointer))
+
+    latencies, first_updates, errors = [], [], 0
+
+    async def conversation(thread_id: str):
+        nonlocal errors
+        hist = []
+        for turn in range(args.turns):
+            start = time.perf_counter()
+            if args.mode == "answer":
+                errors += await agent.answer(f"question {turn}", thread_id) is None
+            else:
+                first = None
+                async for _, hist in agent.stream_answer(thread_id, {"text": f"question {turn}", "files": []}, hist):
+                    if first is None and hist and hist[-1].role == "assistant":
+                        first = time.perf_counter() - start
+                first_updates.append(first or 0.0)
+                errors += "Internal error" in str(hist[-1].content)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(conversation(f"bench-{i}") for i in range(args.threads)))
+    elapsed = time.perf_counter() - start
+    sizes = list(checkpoint_bytes(checkpointer).values())
+    result = {
+        "checkpointer": checkpointer_type,
+        "turns_total": len(latencies),
+        "errors": errors,
+        "wall_seconds": round(elapsed, 3),
+        "turns_per_second": round(len(latencies) / elapsed, 1),
+        "turn_latency": latency_summary(latencies),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "checkpoint_kb_per_thread": {
+            "mean": round(sum(sizes) / len(sizes) / 1024, 1) if sizes else 0,
+            "max": round(max(sizes, default=0) / 1024, 1),
+        },
+    }
+    _, (save_seconds, saves) = metrics.CHECKPOINT_SECONDS.values.get((), (None, (0.0, 0)))
+    result["checkpoint_saves"] = {"count": saves, "mean_ms": round(save_seconds / saves * 1000, 3) if saves else 0}
+    if first_updates:
+        result["first_assistant_update"] = latency_summary(first_updates)
+    return result
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results: list[dict], baseline: dict) -> list[dict]:
+    """Relative change of the headline numbers against a previous report (positive = slower/bigger)."""
+    previous = {r["checkpointer"]: r for r in baseline["results"]}
+    changes = []
+    for result in results:
+        before = previous.get(result["checkpointer"])
+        if before is None:
+            continue
+        pairs = {
+            "p50_ms": (before["turn_latency"]["p50_ms"], result["turn_latency"]["p50_ms"]),
+            "p99_ms": (before["turn_latency"]["p99_ms"], result["turn_latency"]["p99_ms"]),
+            "turns_per_second": (before["turns_per_second"], result["turns_per_second"]),
+            "peak_rss_mb": (before["peak_rss_mb"], result["peak_rss_mb"]),
+            "checkpoint_kb_per_thread": (before["checkpoint_kb_per_thread"]["mean"], result["checkpoint_kb_per_thread"]["mean"]),
+        }
+        changes.append({"checkpointer": result["checkpointer"],
+                        **{key: round((new - old) / old * 100, 1) if old else None for key, (old, new) in pairs.items()}})
+    return changes
+
+def main(args: argparse.Namespace):
+    if args.checkpointer:
+        # Child run: one checkpointer, result on stdout
+        logging.getLogger("myapp").setLevel(logging.INFO if args.with_logging else logging.WARNING)
+        settings.metrics_runs_file = None
+        print(json.dumps(asyncio.run(run(args, args.checkpointer))))
+        return
+
+    results = []
+    for checkpointer_type in CHECKPOINTERS:
+        child = subprocess.run([sys.executable, "-m", "benchmarks.agent_e2e", *sys.argv[1:], "--checkpointer", checkpointer_type],
+                               capture_output=True, text=True, check=True)
+        results.append(json.loads(child.stdout.strip().splitlines()[-1]))
+    report = {
+        "commit": git_commit(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("checkpointer", "output", "baseline")},
+        "results": results,
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report["baseline_commit"] = baseline.get("commit")
+        report["change_pct"] = compare(results, baseline)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--mode", choices=["stream", "answer"], default="stream")
+    parser.add_argument("--tool-rounds", type=int, default=1, help="Rounds of tool calls per turn")
+    parser.add_argument("--parallel-calls", type=int, default=2, help="Tool calls per round")
+    parser.add_argument("--answer-tokens", type=int, default=100)
+    parser.add_argument("--first-chunk-ms", type=float, default=0.0, help="Delay before the first chunk of each model call")
+    parser.add_argument("--chunk-interval-ms", type=float, default=0.0, help="Delay between streamed chunks")
+    parser.add_argument("--tool-latency-ms", type=float, default=0.0)
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="Round trip of the MongoDB stand-in")
+    parser.add_argument("--with-logging", action="store_true", help="Keep INFO logging on during the run")
+    parser.add_argument("--checkpointer", choices=CHECKPOINTERS, help=argparse.SUPPRESS)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="Previous JSON report to compare with")
+    main(parser.parse_args())
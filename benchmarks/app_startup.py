@@ -0,0 +1,104 @@
+"""
+App startup benchmark: time until the tabbed UI is built, and the first turn of each tab.
+
+- sequential: agents built one after another, as the per-tab views used to do
+- concurrent: AgentPool.build_all, every agent built at once (agent_startup="eager")
+- lazy:       no agent built at startup, each is built by the first message of its tab (agent_startup="lazy")
+
+Every mode builds the same UI (one `create_agent_view` tab per profile in `agent_tabs`) with a
+scripted model (no tool calls) and a MongoDB stand-in whose handshake takes --handshake-ms. The
+first turns then run one question per tab, so lazy mode pays the build there. Each mode runs in
+its own subprocess, so tool imports and peak RSS are not shared between modes.
+
+Usage: python -m benchmarks.app_startup --handshake-ms 200
+"""
+from app.agents.base import AIAgent, AgentPool
+from app.agents.persistence import AsyncMongoDBSaver, CheckpointerType
+from app.agents.profiles import PROFILES
+from app.agents.runtime import AgentRuntime
+from app.core.config import settings
+from app.gradio.views.agent_chat import create_agent_view
+from benchmarks.fakes import FakeAsyncMongoClient, ScriptedChatModel
+from langgraph.checkpoint.base import BaseCheckpointSaver
+import gradio as gr
+import argparse
+import asyncio
+import json
+import logging
+import resource
+import subprocess
+import sys
+import time
+
+MODES = ["sequential", "concurrent", "lazy"]
+
+class StartupRuntime(AgentRuntime):
+    """AgentRuntime handing out a scripted model, with a MongoDB handshake of `handshake` seconds."""
+    def __init__(self, handshake: float, db_latency: float):
+        super().__init__()
+        self.llm = ScriptedChatModel(tool_rounds=0, answer_tokens=20)
+        self.handshake = handshake
+        self.db_latency = db_latency
+
+    def get_llm(self, *args, **kwargs):
+        return self.llm
+
+    async def _connect(self) -> tuple[CheckpointerType, BaseCheckpointSaver]:
+        await asyncio.sleep(self.handshake)
+        checkpointer = AsyncMongoDBSaver(FakeAsyncMongoClient(self.db_latency))
+        await checkpointer.setup()
+        return "AsyncMongoDBSaver", checkpointer
+
+async def run(args: argparse.Namespace, mode: str) -> dict:
+    pool = AgentPool([PROFILES[profile_id] for profile_id in settings.agent_tabs],
+                     runtime=StartupRuntime(args.handshake_ms / 1000, args.db_latency_ms / 1000))
+    start = time.perf_counter()
+    if mode == "sequential":
+        for profile_id, profile in pool.profiles.items():
+            pool.agents[profile_id] = await AIAgent.create(profile, pool.runtime)
+    elif mode == "concurrent":
+        await pool.build_all()
+    with gr.Blocks() as demo:
+        with gr.Tabs():
+            for profile in pool.profiles.values():
+                with gr.TabItem(profile.name):
+                    create_agent_view(profile, pool, demo)
+    startup = time.perf_counter() - start
+    built_at_startup = len(pool.agents)
+
+    first_turns = {}
+    for profile_id in pool.profiles:
+        start = time.perf_counter()
+        agent = await pool.get(profile_id)
+        await agent.answer("hello", f"startup-{profile_id}")
+        first_turns[profile_id] = round((time.perf_counter() - start) * 1000, 1)
+    return {
+        "mode": mode,
+        "tabs": len(pool.profiles),
+        "startup_seconds": round(startup, 3),
+        "agents_built_at_startup": built_at_startup,
+        "first_turn_ms": first_turns,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+def main(args: argparse.Namespace):
+    if args.mode:
+        # Child run: one mode, result on stdout
+        logging.getLogger("myapp").setLevel(logging.WARNING)
+        settings.metrics_runs_file = None
+        print(json.dumps(asyncio.run(run(args, args.mode))))
+        return
+
+    results = []
+    for mode in MODES:
+        child = subprocess.run([sys.executable, "-m", "benchmarks.app_startup", *sys.argv[1:], "--mode", mode],
+                               capture_output=True, text=True, check=True)
+        results.append(json.loads(child.stdout.strip().splitlines()[-1]))
+    print(json.dumps({"handshake_ms": args.handshake_ms, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--handshake-ms", type=float, default=200.0, help="MongoDB ping and setup time")
+    parser.add_argument("--db-latency-ms", type=float, default=1.0, help="Round trip of the MongoDB stand-in")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    main(parser.parse_args())
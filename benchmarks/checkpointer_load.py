@@ -0,0 +1,88 @@
+"""
+Checkpointer load test: p50/p99 turn latency with many concurrent threads.
+
+Without --mongodb-uri an in-process stand-in is used: a MemorySaver whose writes and reads
+pay a simulated I/O latency, either in the default thread pool (how MongoDBSaver wraps the
+blocking driver) or awaited on the event loop (how AsyncMongoDBSaver uses the async driver).
+With --mongodb-uri both real savers are measured against that server.
+
+Usage: python -m benchmarks.checkpointer_load --threads 50 --turns 5
+"""
+from langchain.agents import create_agent
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import run_in_executor
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import MemorySaver
+from benchmarks.fakes import fake_chat_model
+from benchmarks.utils import latency_summary
+import argparse
+import asyncio
+import json
+import time
+
+class SimulatedIOSaver(MemorySaver):
+    """MemorySaver paying `io_latency` seconds per async read/write, threaded or awaited."""
+    def __init__(self, io_latency: float, threaded: bool):
+        super().__init__()
+        self.io_latency = io_latency
+        self.threaded = threaded
+
+    async def _io(self):
+        if self.threaded:
+            await run_in_executor(None, time.sleep, self.io_latency)
+        else:
+            await asyncio.sleep(self.io_latency)
+
+    async def aget_tuple(self, config):
+        await self._io()
+        return await super().aget_tuple(config)
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        await self._io()
+        return await super().aput(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        await self._io()
+        return await super().aput_writes(config, writes, task_id, task_path)
+
+async def run_load(name: str, checkpointer: BaseCheckpointSaver, n_threads: int, n_turns: int) -> dict:
+    llm = fake_chat_model("This is a benchmark answer.")
+    agent = create_agent(llm, [], checkpointer=checkpointer)
+    latencies = []
+
+    async def conversation(thread_id: str):
+        config = {"configurable": {"thread_id": thread_id}}
+        for turn in range(n_turns):
+            start = time.perf_counter()
+            async for _ in agent.astream({"messages": [HumanMessage(content=f"question {turn}")]}, config=config, stream_mode="messages"):
+                pass
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(conversation(f"{name}-{i}-{time.time_ns()}") for i in range(n_threads)))
+    return {"checkpointer": name, "threads": n_threads, "turns": n_turns,
+            "wall_seconds": round(time.perf_counter() - start, 3), **latency_summary(latencies)}
+
+async def main(n_threads: int, n_turns: int, io_latency: float, mongodb_uri: str | None):
+    results = []
+    if mongodb_uri:
+        from app.core.config import settings
+        from app.agents.persistence import setup_persistence
+        settings.mongodb_uri = mongodb_uri
+        for mode in ("sync", "async"):
+            settings.checkpointer_mode = mode
+            checkpointer_type, checkpointer = await setup_persistence()
+            results.append(await run_load(checkpointer_type, checkpointer, n_threads, n_turns))
+    else:
+        results.append(await run_load("threaded-stand-in", SimulatedIOSaver(io_latency, threaded=True), n_threads, n_turns))
+        results.append(await run_load("async-stand-in", SimulatedIOSaver(io_latency, threaded=False), n_threads, n_turns))
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--io-latency", type=float, default=0.005, help="Simulated seconds per checkpoint read/write")
+    parser.add_argument("--mongodb-uri", default=None, help="Run against a real MongoDB server instead of the stand-in")
+    args = parser.parse_args()
+    asyncio.run(main(args.threads, args.turns, args.io_latency, args.mongodb_uri))
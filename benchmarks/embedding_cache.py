@@ -0,0 +1,91 @@
+"""
+Embedding cache benchmark: pages of one site sharing boilerplate sections.
+
+Every page carries the same nav bar, cookie banner and footer plus a few sections of its
+own. Pages are ingested through `RAGManager` with a stand-in embeddings model paying a
+fixed latency per API call, first without the content-hash cache, then with a cold cache,
+then again after a restart (new index directory, same on-disk embedding store).
+
+The corpus is scripted, so the embeddings calls, cache hits and misses of each run are known
+in advance (`expected`); the run fails when they differ.
+
+Usage: python -m benchmarks.embedding_cache --pages 50 --unique-sections 4 --batch-size 100
+"""
+from langchain_core.embeddings import Embeddings
+from app.agents import retriever
+from app.core.config import settings
+from app.agents.embedding_cache import CachedEmbeddings, SQLiteEmbeddingStore
+from benchmarks.fakes import HashingFakeEmbeddings
+from benchmarks.utils import check
+import argparse
+import math
+import json
+import os
+import tempfile
+import time
+
+BOILERPLATE = [
+    "<h1>Example Site</h1><p>Home | Products | Blog | About | Contact</p>",
+    "<h2>Cookies</h2><p>We use cookies to improve your experience. Accept all or manage preferences.</p>",
+    "<h2>Footer</h2><p>Copyright Example Site. Privacy policy. Terms of use. Follow us.</p>",
+]
+
+def site_page(page: int, unique_sections: int) -> str:
+    sections = [f"<h2>Article {page} part {i}</h2><p>Content {page}-{i} about subject {page * 7 + i}.</p>" for i in range(unique_sections)]
+    return f"<html><body>{BOILERPLATE[0]}{''.join(sections)}{BOILERPLATE[1]}{BOILERPLATE[2]}</body></html>"
+
+def expected(n_pages: int, unique_sections: int, batch_size: int) -> dict[str, dict]:
+    """Embeddings calls and cache hits/misses per run: one chunk per section, one query per page."""
+    chunks = unique_sections + len(BOILERPLATE)
+    texts = n_pages * (chunks + 1)
+    # The first page misses its boilerplate and the query too, the others only their own sections
+    misses = n_pages * unique_sections + len(BOILERPLATE) + 1
+    cold_calls = math.ceil(chunks / batch_size) + 1 + (n_pages - 1) * math.ceil(unique_sections / batch_size)
+    return {
+        "no cache": {"embed_calls": 2 * n_pages, "embedded_texts": texts},
+        "cold cache": {"embed_calls": cold_calls, "hits": texts - misses, "misses": misses, "embedded_texts": misses},
+        "after restart": {"embed_calls": 0, "hits": texts, "misses": 0, "embedded_texts": 0},
+    }
+
+def ingest(pages: dict[str, str], embeddings: Embeddings, label: str) -> dict:
+    retriever.FAISS_PATH = tempfile.mkdtemp(prefix="faiss_bench_")
+    rag_manager = retriever.RAGManager()
+    rag_manager.embeddings = embeddings
+    start = time.perf_counter()
+    for url, html in pages.items():
+        rag_manager.load_page(url, html)
+        # Vector mode: a keyword query answered from BM25 alone would never embed the page
+        rag_manager.retrieve_documents(url, "subject", mode="vector")
+    result = {"run": label, "wall_s": round(time.perf_counter() - start, 3)}
+    if isinstance(embeddings, CachedEmbeddings):
+        result.update(embeddings.stats())
+    return result
+
+def main(n_pages: int, unique_sections: int, batch_size: int, latency_ms: float):
+    pages = {f"https://site.test/page/{i}": site_page(i, unique_sections) for i in range(n_pages)}
+    retriever.GoogleGenerativeAIEmbeddings = lambda model: HashingFakeEmbeddings()
+    store_path = os.path.join(tempfile.mkdtemp(prefix="embeddings_bench_"), "embeddings.sqlite3")
+    settings.embedding_cache_path = store_path
+    results = []
+
+    model = HashingFakeEmbeddings(latency=latency_ms / 1000)
+    results.append({**ingest(pages, model, "no cache"), "embed_calls": model.calls, "embedded_texts": model.embedded_texts})
+
+    for label in ["cold cache", "after restart"]:
+        model = HashingFakeEmbeddings(latency=latency_ms / 1000)
+        cached = CachedEmbeddings(model, SQLiteEmbeddingStore(store_path, max_entries=100000), batch_size=batch_size)
+        results.append({**ingest(pages, cached, label), "embedded_texts": model.embedded_texts})
+
+    print(json.dumps({"pages": n_pages, "chunks_per_page": unique_sections + len(BOILERPLATE), "results": results}, indent=2))
+    for result in results:
+        for key, value in expected(n_pages, unique_sections, batch_size)[result["run"]].items():
+            check(result[key] == value, f"{result['run']}: {key} is {result[key]}, expected {value}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--unique-sections", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=100, help="Simulated latency of one embeddings API call")
+    args = parser.parse_args()
+    main(args.pages, args.unique_sections, args.batch_size, args.latency_ms)
@@ -0,0 +1,297 @@
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, get_buffer_string, message_chunk_to_message
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.tools import StructuredTool
+from langchain_core.embeddings import Embeddings
+from collections.abc import Iterator
+from functools import reduce
+from datetime import datetime, timedelta, timezone
+from google.genai import types
+from types import SimpleNamespace
+import asyncio
+import numpy as np
+import operator
+import hashlib
+import json
+import time
+import uuid
+import re
+
+class FakeToolCallingChatModel(GenericFakeChatModel):
+    """GenericFakeChatModel that accepts tools; the scripted messages decide which tools get called."""
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+def fresh_answers(text: str) -> Iterator[AIMessage]:
+    """Endless stream of new AIMessage objects (a reused instance keeps its id and overwrites history)."""
+    while True:
+        yield AIMessage(content=text)
+
+def fake_chat_model(text: str) -> GenericFakeChatModel:
+    """Chat model that answers every call with `text`, streamed word by word."""
+    return GenericFakeChatModel(messages=fresh_answers(text))
+
+class HashingFakeEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words embeddings: each word is hashed into one of `size` buckets,
+    so texts sharing words are similar. `latency` seconds per call stands in for the API round trip.
+    """
+    def __init__(self, size: int = 768, latency: float = 0.0):
+        self.size = size
+        self.latency = latency
+        self.calls = 0
+        self.embedded_texts = 0
+
+    def _embed(self, text: str) -> list[float]:
+        vector = np.zeros(self.size, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            vector[int.from_bytes(hashlib.md5(word.encode()).digest()[:4], "little") % self.size] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.calls += 1
+        self.embedded_texts += len(texts)
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+class FakeGeminiClient:
+    """
+    Local stand-in for `genai.Client` with the async surface multimodal_analysis uses.
+    Uploads are read in chunks like the SDK's resumable upload and counted, as are the bytes
+    sent inline in prompts; `latency` seconds per upload or inline file stand in for the network.
+    """
+    def __init__(self, latency: float = 0.0, chunk_size: int = 8 * 1024 * 1024):
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.files: dict[str, types.File] = {}
+        self.stats = {"uploads": 0, "uploaded_bytes": 0, "inline_bytes": 0, "prompts": 0}
+        self.aio = SimpleNamespace(
+            files=SimpleNamespace(upload=self._upload, get=self._get),
+            models=SimpleNamespace(generate_content=self._generate_content),
+        )
+
+    async def _upload(self, file: str, config=None) -> types.File:
+        with open(file, "rb") as f:
+            while chunk := f.read(self.chunk_size):
+                self.stats["uploaded_bytes"] += len(chunk)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.stats["uploads"] += 1
+        name = f"files/{len(self.files) + 1}"
+        self.files[name] = types.File(
+            name=name, uri=f"https://fake.googleapis.com/v1beta/{name}", mime_type=config.mime_type,
+            state=types.FileState.ACTIVE, expiration_time=datetime.now(timezone.utc) + timedelta(hours=48),
+        )
+        return self.files[name]
+
+    async def _get(self, name: str) -> types.File:
+        return self.files[name]
+
+    async def _generate_content(self, model: str, contents: list) -> SimpleNamespace:
+        self.stats["prompts"] += 1
+        for part in contents:
+            if isinstance(part, types.Part) and part.inline_data:
+                self.stats["inline_bytes"] += len(part.inline_data.data)
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+        return SimpleNamespace(text="fake answer")
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Stateless scripted chat model, safe to share between concurrent threads.
+    Each turn makes `tool_rounds` rounds of `parallel_calls` tool calls (cycling through
+    `tool_names`), then streams an answer of `answer_tokens` words. The first chunk of each call
+    comes after `first_chunk_latency` seconds and the following ones every `chunk_interval` seconds.
+    """
+    tool_names: list[str] = []
+    tool_rounds: int = 1
+    parallel_calls: int = 1
+    answer_tokens: int = 50
+    first_chunk_latency: float = 0.0
+    chunk_interval: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _rounds_done(self, messages: list[BaseMessage]) -> int:
+        rounds = 0
+        for msg in reversed(messages):
+            if isinstance(msg, HumanMessage):
+                break
+            if isinstance(msg, AIMessage) and msg.tool_calls:
+                rounds += 1
+        return rounds
+
+    def _chunks(self, messages: list[BaseMessage]) -> list[AIMessageChunk]:
+        usage = {"input_tokens": sum(len(get_buffer_string([msg]).split()) for msg in messages), "output_tokens": 0, "total_tokens": 0}
+        rounds = self._rounds_done(messages)
+        if self.tool_names and rounds < self.tool_rounds:
+            chunks = [AIMessageChunk(content="", tool_call_chunks=[{
+                "name": self.tool_names[(rounds * self.parallel_calls + i) % len(self.tool_names)],
+                "args": json.dumps({"query": f"round {rounds} call {i}"}),
+                "id": f"call_{rounds}_{i}_{uuid.uuid4().hex[:8]}",
+                "index": i,
+            }]) for i in range(self.parallel_calls)]
+            usage["output_tokens"] = 10 * self.parallel_calls
+        else:
+            words = [f"word{i % 97} " for i in range(self.answer_tokens)]
+            chunks = [AIMessageChunk(content=word) for word in words]
+            usage["output_tokens"] = self.answer_tokens
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        chunks[-1] = chunks[-1] + AIMessageChunk(content="", usage_metadata=usage)
+        return chunks
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = reduce(operator.add, self._chunks(messages))
+        return ChatResult(generations=[ChatGeneration(message=message_chunk_to_message(message))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        for i, chunk in enumerate(self._chunks(messages)):
+            delay = self.first_chunk_latency if i == 0 else self.chunk_interval
+            if delay:
+                await asyncio.sleep(delay)
+            generation = ChatGenerationChunk(message=chunk)
+            if run_manager and chunk.content:
+                await run_manager.on_llm_new_token(chunk.content, chunk=generation)
+            yield generation
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        chunks = [generation.message async for generation in self._astream(messages, stop, run_manager)]
+        return ChatResult(generations=[ChatGeneration(message=message_chunk_to_message(reduce(operator.add, chunks)))])
+
+class SummaryChatModel(BaseChatModel):
+    """
+    Answers its n-th call with "ROLLING SUMMARY n", streamed word by word after `latency` seconds.
+    The prompts it received are kept in `prompts`.
+    """
+    latency: float = 0.0
+    prompts: list[str] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "summary-fake"
+
+    def _chunks(self, messages: list[BaseMessage]) -> list[AIMessageChunk]:
+        self.prompts.append(get_buffer_string(messages))
+        return [AIMessageChunk(content=word) for word in ("ROLLING ", "SUMMARY ", str(len(self.prompts)))]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        chunks = self._chunks(messages)
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=message_chunk_to_message(reduce(operator.add, chunks)))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        chunks = self._chunks(messages)
+        await asyncio.sleep(self.latency)
+        for chunk in chunks:
+            generation = ChatGenerationChunk(message=chunk)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.content, chunk=generation)
+            yield generation
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        chunks = [generation.message async for generation in self._astream(messages, stop, run_manager)]
+        return ChatResult(generations=[ChatGeneration(message=message_chunk_to_message(reduce(operator.add, chunks)))])
+
+def stub_tool(name: str, latency: float = 0.0, output: str = "stub result") -> StructuredTool:
+    """Async tool named like a real one, answering `output` after `latency` seconds."""
+    async def run(query: str) -> str:
+        if latency:
+            await asyncio.sleep(latency)
+        return f"{output} for {query}"
+    return StructuredTool.from_function(coroutine=run, name=name, description=f"Stub of the {name} tool.")
+
+class FakeAsyncCollection:
+    """In-memory stand-in for the parts of `pymongo.AsyncCollection` that AsyncMongoDBSaver uses."""
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.docs: dict[str, dict[tuple, dict]] = {}  # thread_id -> {upsert key -> doc}
+
+    async def _io(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    @staticmethod
+    def _matches(doc: dict, query: dict) -> bool:
+        for key, value in query.items():
+            if isinstance(value, dict) and "$lt" in value:
+                if not doc.get(key) < value["$lt"]:
+                    return False
+            elif doc.get(key) != value:
+                return False
+        return True
+
+    def _upsert(self, query: dict, update: dict) -> None:
+        docs = self.docs.setdefault(query["thread_id"], {})
+        key = tuple(sorted(query.items()))
+        if key in docs:
+            docs[key].update(update.get("$set", {}))
+        else:
+            docs[key] = {**query, **update.get("$set", {}), **update.get("$setOnInsert", {})}
+
+    async def list_indexes(self):
+        await self._io()
+        return SimpleNamespace(to_list=self._no_indexes)
+
+    async def _no_indexes(self):
+        return [{}, {}]
+
+    async def create_index(self, *args, **kwargs):
+        await self._io()
+
+    async def find(self, query: dict, sort=None, limit: int = 0):
+        await self._io()
+        candidates = self.docs.get(query["thread_id"], {}).values() if "thread_id" in query else \
+            [doc for docs in self.docs.values() for doc in docs.values()]
+        found = [doc for doc in candidates if self._matches(doc, query)]
+        if sort:
+            found.sort(key=lambda doc: doc.get(sort[0][0]), reverse=sort[0][1] < 0)
+        for doc in found[:limit or None]:
+            yield doc
+
+    async def update_one(self, query: dict, update: dict, upsert: bool = False):
+        await self._io()
+        self._upsert(query, update)
+
+    async def bulk_write(self, operations: list):
+        await self._io()
+        for operation in operations:
+            self._upsert(operation._filter, operation._doc)
+
+    async def delete_many(self, query: dict):
+        await self._io()
+        self.docs.pop(query["thread_id"], None)
+
+    def stored_bytes(self, field: str) -> dict[str, int]:
+        """Serialized bytes of `field` per thread."""
+        return {thread_id: sum(len(doc.get(field) or b"") for doc in docs.values()) for thread_id, docs in self.docs.items()}
+
+class FakeAsyncMongoClient:
+    """Local MongoDB stand-in for AsyncMongoDBSaver: each operation awaits `latency` seconds (a round trip)."""
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.databases: dict[str, dict[str, FakeAsyncCollection]] = {}
+
+    def __getitem__(self, name: str) -> "FakeAsyncDatabase":
+        return FakeAsyncDatabase(self.databases.setdefault(name, {}), self.latency)
+
+    async def close(self):
+        pass
+
+class FakeAsyncDatabase:
+    def __init__(self, collections: dict[str, FakeAsyncCollection], latency: float):
+        self.collections = collections
+        self.latency = latency
+
+    def __getitem__(self, name: str) -> FakeAsyncCollection:
+        return self.collections.setdefault(name, FakeAsyncCollection(self.latency))
@@ -0,0 +1,96 @@
+"""
+HTML parsing benchmark: time and peak memory per page, full-page conversion vs budgeted parser.
+
+The legacy pipeline converts the whole page with markdownify and truncates the markdown to
+40,000 characters afterwards. `html_to_markdown` drops scripts, styles and navigation before
+parsing and stops converting once the budget is reached. Both outputs go through the same
+header splitter.
+
+Pages come from --corpus (a directory of saved .html files) or are generated: modern-looking
+pages with large inline scripts, styles, SVG icons, a navigation menu and long articles.
+
+Usage: python -m benchmarks.html_parsing --sizes-mb 1 4 16
+       python -m benchmarks.html_parsing --corpus saved_pages/
+"""
+from markdownify import markdownify
+from app.agents.retriever import MARKDOWN_SPLITTER
+from app.utils.html_utils import html_to_markdown
+import argparse
+import json
+import os
+import random
+import re
+import time
+import tracemalloc
+
+MAX_CHARS = 40000
+
+def generate_page(size_mb: float, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    words = ["latency", "throughput", "cache", "index", "vector", "query", "budget", "stream", "parser", "memory"]
+    sentence = lambda n: " ".join(rng.choice(words) for _ in range(n)).capitalize() + "."
+    script = "<script>" + "".join(f"window.__data{i} = {{\"k\": \"{sentence(8)}\"}};" for i in range(200)) + "</script>"
+    style = "<style>" + "".join(f".c{i} {{ margin: {i}px; color: #{i:06x}; }}" for i in range(300)) + "</style>"
+    icon = '<svg viewBox="0 0 24 24">' + '<path d="M12 2L2 7l10 5 10-5-10-5z"/>' * 10 + "</svg>"
+    nav = "<nav><ul>" + "".join(f'<li><a href="/section/{i}">{icon}Section {i}</a></li>' for i in range(80)) + "</ul></nav>"
+
+    parts = ["<html><head>", style, script, "</head><body>", nav, '<div class="page"><main><article>']
+    size, section = sum(map(len, parts)), 0
+    while size < size_mb * 1024 * 1024:
+        block = (
+            f'<section><h2>Section {section}</h2><div class="c{section % 300}">'
+            + "".join(f"<p>{sentence(30)} <a href='/ref/{section}/{i}'>ref</a></p>" for i in range(6))
+            + "<table><tr><th>Metric</th><th>Value</th></tr>"
+            + "".join(f"<tr><td>{rng.choice(words)}</td><td>{rng.random():.3f}</td></tr>" for _ in range(5))
+            + "</table></div>" + script[:2000] + "</script></section>"
+        )
+        parts.append(block)
+        size += len(block)
+        section += 1
+    parts.append("</article></main><footer>Footer</footer></div></body></html>")
+    return "".join(parts)
+
+def legacy_sections(html: str) -> list:
+    markdown_content = markdownify(html).strip()
+    markdown_content = re.sub(r"\n{3,}", "\n\n", markdown_content)[:MAX_CHARS]
+    return MARKDOWN_SPLITTER.split_text(markdown_content)
+
+def budgeted_sections(html: str) -> list:
+    return MARKDOWN_SPLITTER.split_text(html_to_markdown(html, MAX_CHARS))
+
+def measure(parse, html: str) -> dict:
+    start = time.perf_counter()
+    sections = parse(html)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    parse(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ms": round(elapsed * 1000, 1), "peak_mb": round(peak / 1024 / 1024, 1), "sections": len(sections)}
+
+def main(sizes_mb: list[float], corpus: str | None):
+    if corpus:
+        pages = {}
+        for name in sorted(os.listdir(corpus)):
+            if name.endswith((".html", ".htm")):
+                with open(os.path.join(corpus, name), "r", encoding="utf-8", errors="replace") as f:
+                    pages[name] = f.read()
+    else:
+        pages = {f"generated_{size}mb": generate_page(size, seed=i) for i, size in enumerate(sizes_mb)}
+
+    results = []
+    for name, html in pages.items():
+        results.append({
+            "page": name,
+            "html_mb": round(len(html) / 1024 / 1024, 2),
+            "legacy": measure(legacy_sections, html),
+            "budgeted": measure(budgeted_sections, html),
+        })
+    print(json.dumps({"max_chars": MAX_CHARS, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--corpus", default=None, help="Directory of saved .html pages")
+    args = parser.parse_args()
+    main(args.sizes_mb, args.corpus)
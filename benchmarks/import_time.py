@@ -0,0 +1,71 @@
+"""
+Cold start benchmark: import time and memory of the agent modules, based on `python -X importtime`.
+
+Each scenario runs in a fresh interpreter. The import time is the sum of the top-level
+cumulative times reported by -X importtime, with the heaviest third-party packages listed;
+peak RSS and the number of loaded modules are measured in the child at the end. The
+"eager tool dependencies" scenario loads every tool dependency up front, which is what
+importing the profiles used to cost.
+
+Usage: python -m benchmarks.import_time --repeat 3 --top 8
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+SCENARIOS = {
+    "profiles": "import app.agents.profiles",
+    "tutor tools": "import app.agents.profiles as p; p.TUTOR_AGENT.load_tools()",
+    "all profile tools": "import app.agents.profiles as p; [profile.load_tools() for profile in "
+                         "(p.TUTOR_AGENT, p.TRAVEL_AGENT, p.RESEARCH_AGENT, p.DATA_ANALYST_AGENT, p.MOVIE_RECOMMENDER_AGENT)]",
+    "eager tool dependencies": "import app.agents.profiles, app.agents.tools, app.agents.retriever, app.agents.datasets, "
+                               "app.agents.media, app.utils.file_utils, duckduckgo_search, wikipedia, langchain_community.tools",
+    "agent base (UI)": "import app.agents.base",
+}
+REPORT = "; import resource, sys; print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, len(sys.modules))"
+
+def measure(code: str) -> dict:
+    child = subprocess.run([sys.executable, "-X", "importtime", "-c", code + REPORT], capture_output=True, text=True, check=True)
+    max_rss_kb, modules = child.stdout.split()[-2:]
+    entries = []
+    for line in child.stderr.splitlines():
+        if line.startswith("import time:") and "cumulative" not in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            entries.append((depth, name.strip().split(".")[0], int(cumulative)))
+
+    # -X importtime lists a module after its imports; reversed, parents come first. A package's
+    # time is the cumulative time of its outermost imports made from the app (or at top level).
+    total, packages, stack = 0, {}, []
+    for depth, package, cumulative in reversed(entries):
+        while stack and stack[-1][0] >= depth:
+            stack.pop()
+        if depth == 0:
+            total += cumulative
+        if package != "app" and all(parent == "app" for _, parent in stack):
+            packages[package] = packages.get(package, 0) + cumulative
+        stack.append((depth, package))
+    return {"import_ms": total / 1000, "peak_rss_mb": int(max_rss_kb) / 1024, "modules": int(modules), "packages": packages}
+
+def main(repeat: int, top: int):
+    results = []
+    for name, code in SCENARIOS.items():
+        runs = [measure(code) for _ in range(repeat)]
+        best = min(runs, key=lambda run: run["import_ms"])
+        heaviest = sorted(best["packages"].items(), key=lambda item: -item[1])[:top]
+        results.append({
+            "scenario": name,
+            "import_ms": round(best["import_ms"], 1),
+            "peak_rss_mb": round(best["peak_rss_mb"], 1),
+            "modules": best["modules"],
+            "heaviest_ms": {package: round(us / 1000, 1) for package, us in heaviest},
+        })
+    print(json.dumps({"repeat": repeat, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per scenario, the fastest is reported")
+    parser.add_argument("--top", type=int, default=8, help="Heaviest third-party packages to list")
+    args = parser.parse_args()
+    main(args.repeat, args.top)
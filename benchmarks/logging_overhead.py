@@ -0,0 +1,93 @@
+"""
+Logging overhead benchmark: latency added to each streamed chunk by logging on the event loop.
+
+Every chunk logs a tool-call-sized message, as stream_answer and LoggingMiddleware do. "sync"
+formats and writes (and flushes) each record in the calling coroutine, like the previous
+FileHandler setup; "queue" only enqueues the record, a listener thread formats it and writes
+in batches. --disk-latency-ms adds a delay to each flush, standing in for a slow or busy disk.
+
+Usage: python -m benchmarks.logging_overhead --chunks 20000 --disk-latency-ms 0.2
+"""
+from app.core.logger_config import BatchingQueueListener, BatchingRotatingFileHandler, LazyQueueHandler, TruncatingFormatter
+from benchmarks.utils import latency_summary
+import argparse
+import asyncio
+import json
+import logging
+import os
+import queue
+import tempfile
+import time
+
+TOOL_ARGS = {"query": "SELECT segment, SUM(revenue) FROM orders GROUP BY segment", "filepath": "uploads/threads/t/orders.csv"}
+
+class SlowStream:
+    """File stream whose flush takes `latency` seconds."""
+    def __init__(self, stream, latency: float):
+        self.stream = stream
+        self.latency = latency
+
+    def write(self, text: str) -> int:
+        return self.stream.write(text)
+
+    def flush(self) -> None:
+        self.stream.flush()
+        time.sleep(self.latency)
+
+    def close(self) -> None:
+        self.stream.close()
+
+class SlowFileHandler(BatchingRotatingFileHandler):
+    def __init__(self, filename: str, disk_latency: float, **kwargs):
+        self.disk_latency = disk_latency
+        super().__init__(filename, **kwargs)
+
+    def _open(self):
+        return SlowStream(super()._open(), self.disk_latency)
+
+def make_logger(mode: str, path: str, disk_latency: float) -> tuple[logging.Logger, BatchingQueueListener | None]:
+    bench_logger = logging.getLogger(f"bench.{mode}")
+    bench_logger.propagate = False
+    bench_logger.setLevel("INFO" if mode != "off" else "CRITICAL")
+    handler = SlowFileHandler(path, disk_latency, batch_size=256 if mode == "queue" else 1, maxBytes=50 * 1024 * 1024, backupCount=2)
+    handler.setFormatter(TruncatingFormatter("%(asctime)s | %(levelname)s | %(name)s | %(message)s", 2000))
+    listener = None
+    if mode == "queue":
+        log_queue = queue.SimpleQueue()
+        listener = BatchingQueueListener(log_queue, handler)
+        listener.start()
+        bench_logger.handlers = [LazyQueueHandler(log_queue)]
+    else:
+        bench_logger.handlers = [handler]
+    return bench_logger, listener
+
+async def stream(bench_logger: logging.Logger, chunks: int) -> list[float]:
+    latencies = []
+    for i in range(chunks):
+        start = time.perf_counter()
+        bench_logger.info("Chunk %d: invoking tool %s with arguments: %s", i, "sql_file_analysis", TOOL_ARGS)
+        await asyncio.sleep(0)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def main(chunks: int, disk_latency_ms: float):
+    workdir = tempfile.mkdtemp(prefix="logging_bench_")
+    results = []
+    for mode in ["off", "sync", "queue"]:
+        bench_logger, listener = make_logger(mode, os.path.join(workdir, f"{mode}.log"), disk_latency_ms / 1000)
+        start = time.perf_counter()
+        latencies = asyncio.run(stream(bench_logger, chunks))
+        elapsed = time.perf_counter() - start
+        if listener is not None:
+            listener.stop()
+        for handler in bench_logger.handlers:
+            handler.close()
+        results.append({"mode": mode, "total_s": round(elapsed, 3), "per_chunk": latency_summary(latencies)})
+    print(json.dumps({"chunks": chunks, "disk_latency_ms": disk_latency_ms, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--disk-latency-ms", type=float, default=0.2, help="Simulated delay per flush")
+    args = parser.parse_args()
+    main(args.chunks, args.disk_latency_ms)
@@ -0,0 +1,66 @@
+"""
+multimodal_analysis upload benchmark: several prompts about one large audio file, against a fake Gemini client.
+
+Inline, every prompt reads the whole file into memory and sends it again. Through the Files API
+(`GeminiFileCache`), the file is uploaded once in chunks and follow-up prompts reuse the cached
+URI; concurrent prompts share the single upload. Reports bytes sent, uploads, wall time and
+peak traced memory.
+
+Usage: python -m benchmarks.multimodal_uploads --size-mb 40 --prompts 3 --latency 0.5
+"""
+from app.agents.media import GeminiFileCache
+from app.core.config import settings
+from benchmarks.fakes import FakeGeminiClient
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+def generate_audio(path: str, size_mb: int) -> None:
+    with open(path, "wb") as f:
+        f.write(b"ID3\x04\x00\x00\x00\x00\x00\x00")
+        for _ in range(size_mb):
+            f.write(os.urandom(1024 * 1024))
+
+async def ask(file_cache: GeminiFileCache, path: str, prompts: int, concurrent: bool) -> None:
+    async def prompt(i: int):
+        part = await file_cache.part(path)
+        await file_cache.client.aio.models.generate_content(model="fake", contents=[part, f"Question {i}"])
+    if concurrent:
+        await asyncio.gather(*(prompt(i) for i in range(prompts)))
+    else:
+        for i in range(prompts):
+            await prompt(i)
+
+def measure(path: str, prompts: int, latency: float, inline_max_mb: int, concurrent: bool) -> dict:
+    settings.media_inline_max_mb = inline_max_mb
+    client = FakeGeminiClient(latency)
+    tracemalloc.start()
+    start = time.perf_counter()
+    asyncio.run(ask(GeminiFileCache(client), path, prompts, concurrent))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    sent = client.stats["uploaded_bytes"] + client.stats["inline_bytes"]
+    return {"s": round(elapsed, 3), "peak_mb": round(peak / 1024 / 1024, 1), "sent_mb": round(sent / 1024 / 1024, 1), "uploads": client.stats["uploads"]}
+
+def main(size_mb: int, prompts: int, latency: float):
+    path = os.path.join(tempfile.mkdtemp(prefix="multimodal_uploads_"), "interview.mp3")
+    generate_audio(path, size_mb)
+    results = [
+        {"run": "inline", **measure(path, prompts, latency, size_mb + 1, False)},
+        {"run": "files api, sequential", **measure(path, prompts, latency, 0, False)},
+        {"run": "files api, concurrent", **measure(path, prompts, latency, 0, True)},
+    ]
+    print(json.dumps({"size_mb": size_mb, "prompts": prompts, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=40)
+    parser.add_argument("--prompts", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.5, help="Simulated seconds per upload")
+    args = parser.parse_args()
+    main(args.size_mb, args.prompts, args.latency)
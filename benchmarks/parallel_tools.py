@@ -0,0 +1,65 @@
+"""
+Parallel tool execution benchmark: one AIMessage with several tool calls, run through an agent.
+
+HTTP upstreams (OpenWeatherMap, TMDB) are replaced by an in-process stand-in transport
+that answers after a fixed latency, so the wall time of a multi-call turn can be compared
+with the sum and the max of the individual tool latencies. The run fails when the wall time
+exceeds the max latency by more than --tolerance-ms, i.e. when the calls did not overlap.
+
+Usage: python -m benchmarks.parallel_tools --calls 4 --latency-ms 300 --tolerance-ms 100
+"""
+from langchain.agents import create_agent
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from app.agents import tools
+from benchmarks.fakes import FakeToolCallingChatModel
+from benchmarks.utils import check
+import argparse
+import asyncio
+import httpx
+import json
+import time
+
+def stand_in_client(latency: float) -> httpx.AsyncClient:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        if "openweathermap" in request.url.host:
+            return httpx.Response(200, json={"weather": [{"description": "clear sky"}], "main": {"temp": 293.15}})
+        return httpx.Response(200, json={"results": [{"title": "Movie", "release_date": "2025-01-01", "overview": "..."}]})
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+async def main(n_calls: int, latency_ms: float, tolerance_ms: float):
+    latency = latency_ms / 1000
+    client = stand_in_client(latency)
+    tools.get_http_client.cache_clear()
+    tools.get_http_client = lambda: client
+
+    cities = ["Paris", "Madrid", "Lisbon", "Rome", "Berlin", "Vienna", "Prague", "Oslo"]
+    tool_calls = [{"name": "get_weather", "args": {"location": cities[i % len(cities)]}, "id": f"call_{i}"} for i in range(n_calls - 1)]
+    tool_calls.append({"name": "get_now_playing_movies", "args": {}, "id": f"call_{n_calls - 1}"})
+    llm = FakeToolCallingChatModel(messages=iter([AIMessage(content="", tool_calls=tool_calls), AIMessage(content="Done.")]))
+    agent = create_agent(llm, [tools.get_weather, tools.get_now_playing_movies])
+
+    start = time.perf_counter()
+    result = await agent.ainvoke({"messages": [HumanMessage(content="Weather and movies please")]})
+    elapsed = time.perf_counter() - start
+    await client.aclose()
+    outputs = [msg for msg in result["messages"] if isinstance(msg, ToolMessage)]
+    print(json.dumps({
+        "tool_calls": n_calls,
+        "tool_latency_ms": latency_ms,
+        "sum_of_latencies_ms": round(n_calls * latency_ms, 1),
+        "max_latency_ms": latency_ms,
+        "wall_ms": round(elapsed * 1000, 1),
+        "tool_outputs": [msg.content for msg in outputs],
+    }, indent=2))
+    check(len(outputs) == n_calls and not any(msg.status == "error" for msg in outputs), "every tool call should return a result")
+    check(elapsed * 1000 <= latency_ms + tolerance_ms,
+          f"wall time {elapsed * 1000:.0f} ms is over max latency {latency_ms:.0f} ms + {tolerance_ms:.0f} ms: the tool calls did not run in parallel")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--tolerance-ms", type=float, default=100, help="Allowed wall time over the max tool latency")
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.latency_ms, args.tolerance_ms))
@@ -0,0 +1,70 @@
+"""
+text_analysis profiling benchmark: time, peak RSS and output size on large CSV and text files.
+
+A generated CSV (about 1 GB at the default 13M rows) is profiled by `DatasetManager.profile`,
+which ingests it into Parquet and runs DuckDB SUMMARIZE under `sql_session_memory_mb`, on a
+random sample above `profile_sample_rows`. A text file of the same size is paged with
+`read_text_page`, first and last page. With --legacy, the pandas `read_csv` + `describe()`
+baseline runs last, in a subprocess, since it may run out of memory.
+
+Usage: python -m benchmarks.profiling --rows 13000000 --legacy
+"""
+from app.agents.datasets import DatasetManager
+from app.core.config import settings
+from app.utils.text_utils import read_text_page
+from benchmarks.sql_datasets import generate_csv
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+LEGACY = "import pandas as pd, resource, sys, time; t = time.perf_counter(); df = pd.read_csv(sys.argv[1]); " \
+         "s = str(df.describe()); print(time.perf_counter() - t, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, len(s))"
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def main(rows: int, legacy: bool):
+    workdir = tempfile.mkdtemp(prefix="profiling_bench_")
+    csv_path = os.path.join(workdir, "orders.csv")
+    generate_csv(csv_path, rows)
+    size = os.path.getsize(csv_path)
+    text_path = os.path.join(workdir, "orders.txt")
+    os.link(csv_path, text_path)
+    results = []
+
+    manager = DatasetManager(os.path.join(workdir, "datasets"))
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    profile = manager.profile(csv_path)
+    results.append({"run": "profile (cold, with ingestion)", "s": round(time.perf_counter() - start, 2), "chars": len(profile)})
+    start = time.perf_counter()
+    profile = manager.profile(csv_path)
+    results.append({"run": "profile (cached Parquet)", "s": round(time.perf_counter() - start, 2), "chars": len(profile)})
+
+    for label, offset in [("text page (start)", 0), ("text page (end)", size - settings.text_page_bytes)]:
+        start = time.perf_counter()
+        page = read_text_page(text_path, offset, settings.text_page_bytes)
+        results.append({"run": label, "s": round(time.perf_counter() - start, 4), "chars": len(page)})
+    peak = {"peak_rss_mb": round(peak_rss_mb(), 1), "peak_rss_growth_mb": round(peak_rss_mb() - rss_before, 1)}
+
+    if legacy:
+        run = subprocess.run([sys.executable, "-c", LEGACY, csv_path], capture_output=True, text=True)
+        if run.returncode == 0:
+            elapsed, max_rss_kb, chars = run.stdout.split()
+            results.append({"run": "pandas describe", "s": round(float(elapsed), 2), "chars": int(chars), "peak_rss_mb": round(int(max_rss_kb) / 1024, 1)})
+        else:
+            results.append({"run": "pandas describe", "failed": f"exit code {run.returncode}"})
+
+    print(json.dumps({"rows": rows, "csv_mb": round(size / 1024 / 1024, 1), **peak, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=13000000)
+    parser.add_argument("--legacy", action="store_true", help="Also run the pandas baseline in a subprocess")
+    args = parser.parse_args()
+    main(args.rows, args.legacy)
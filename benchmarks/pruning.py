@@ -0,0 +1,116 @@
+"""
+Stored-history pruning benchmark: checkpoint bytes written per turn as a thread grows.
+
+Compares the previous strategy (REMOVE_ALL_MESSAGES + re-add every kept message on every turn
+past the limit) with the incremental, hysteresis-based pruning of TrimMessagesMiddleware.
+
+Then checks RollingSummaryMiddleware on a short history with a slow scripted summary model: a
+summary folded in the background is stored at the start of the next turn, a second fold chains
+onto one that has not finished, pending results are bounded by `summary_max_pending_threads`,
+and no summary token ever shows up in the `stream_mode="messages"` stream.
+
+Usage: python -m benchmarks.pruning --turns 120
+"""
+from langchain.agents import create_agent
+from langchain_core.messages import HumanMessage, RemoveMessage
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+from langgraph.checkpoint.memory import MemorySaver
+from app.agents.middlewares import RollingSummaryMiddleware, TrimMessagesMiddleware
+from app.core.config import settings
+from benchmarks.fakes import SummaryChatModel, fake_chat_model
+from benchmarks.utils import check
+import argparse
+import asyncio
+import json
+
+class ByteCountingSaver(MemorySaver):
+    """MemorySaver that records how many serialized bytes each checkpoint/write carries."""
+    def __init__(self):
+        super().__init__()
+        self.bytes_written = 0
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        for channel in new_versions:
+            if channel in checkpoint["channel_values"]:
+                self.bytes_written += len(self.serde.dumps_typed(checkpoint["channel_values"][channel])[1])
+        return super().put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        for _, value in writes:
+            self.bytes_written += len(self.serde.dumps_typed(value)[1])
+        return super().put_writes(config, writes, task_id, task_path)
+
+class RemoveAllTrimMessagesMiddleware(TrimMessagesMiddleware):
+    """Previous behaviour: rewrite the whole kept history on every turn past the limit."""
+    def _prune_stored_messages(self, messages):
+        if len(messages) > settings.max_stored_messages:
+            kept_messages = self._apply_trimming(messages, settings.max_stored_messages, is_for_llm=False)
+            return {"messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES), *kept_messages]}
+        return None
+
+async def run(middleware: TrimMessagesMiddleware, n_turns: int) -> dict:
+    llm = fake_chat_model("An answer of moderate length. " * 10)
+    checkpointer = ByteCountingSaver()
+    agent = create_agent(llm, [], checkpointer=checkpointer, middleware=[middleware])
+    config = {"configurable": {"thread_id": "pruning"}}
+    per_turn = []
+    for turn in range(n_turns):
+        before = checkpointer.bytes_written
+        await agent.ainvoke({"messages": [HumanMessage(content=f"Question number {turn}?")]}, config=config)
+        per_turn.append(checkpointer.bytes_written - before)
+    return {
+        "strategy": type(middleware).__name__,
+        "turns": n_turns,
+        "total_bytes": sum(per_turn),
+        "mean_bytes_per_turn": round(sum(per_turn) / n_turns),
+        "bytes_per_turn_by_decile": [round(sum(chunk) / len(chunk)) for chunk in
+                                     (per_turn[i:i + max(1, n_turns // 10)] for i in range(0, n_turns, max(1, n_turns // 10)))],
+    }
+
+async def run_summary(summary_latency: float) -> dict:
+    settings.max_stored_messages, settings.stored_messages_after_prune = 6, 4
+    settings.summary_max_pending_threads = 2
+    summary_llm = SummaryChatModel(latency=summary_latency)
+    trim = TrimMessagesMiddleware()
+    summary = RollingSummaryMiddleware(summary_llm, trim)
+    agent = create_agent(fake_chat_model("An answer."), [], checkpointer=MemorySaver(), middleware=[trim, summary])
+    streamed = []
+
+    async def turn(thread_id: str, n: int) -> None:
+        config = {"configurable": {"thread_id": thread_id}}
+        async for chunk, _ in agent.astream({"messages": [HumanMessage(content=f"Question number {n}?")]}, config=config, stream_mode="messages"):
+            streamed.append(chunk.text)
+
+    # 2 messages per turn: turn 4 goes past 6 and folds 4 messages, turn 6 folds again while the first fold still runs
+    for n in range(1, 7):
+        await turn("summary", n)
+    check(len(summary_llm.prompts) == 1, "the second fold should wait for the first one")
+    await asyncio.sleep(3 * summary_latency)
+    check(len(summary_llm.prompts) == 2 and "ROLLING SUMMARY 1" in summary_llm.prompts[1],
+          "the second fold should start from the unfinished first summary")
+    await turn("summary", 7)
+    state = (await agent.aget_state({"configurable": {"thread_id": "summary"}})).values
+    check(state.get("summary") == "ROLLING SUMMARY 2", f"the pending summary should be stored by the next turn, got {state.get('summary')!r}")
+
+    # Every thread leaves a finished result behind: only the last `summary_max_pending_threads` are kept.
+    # With no latency the summary tokens come while the turn is still streaming.
+    summary_llm.latency = 0.0
+    for thread in range(4):
+        for n in range(1, 5):
+            await turn(f"abandoned-{thread}", n)
+        await asyncio.sleep(0.05)
+    check(list(summary._pending) == ["abandoned-2", "abandoned-3"], f"pending summaries not bounded: {list(summary._pending)}")
+    check(not any("ROLLING" in text or "SUMMARY" in text for text in streamed), "summary tokens leaked into the stream")
+    return {"summary_calls": len(summary_llm.prompts), "pending_threads": len(summary._pending), "streamed_chunks": len(streamed), "summary_in_stream": False}
+
+async def main(n_turns: int, summary_latency: float):
+    results = [await run(RemoveAllTrimMessagesMiddleware(), n_turns), await run(TrimMessagesMiddleware(), n_turns)]
+    results.append(await run_summary(summary_latency))
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=120)
+    parser.add_argument("--summary-latency", type=float, default=0.2, help="Seconds per call of the scripted summary model")
+    args = parser.parse_args()
+    asyncio.run(main(args.turns, args.summary_latency))
@@ -0,0 +1,111 @@
+"""
+RAG concurrency stress test: many research sessions visiting different pages at the same time.
+
+Every session has its own page whose sections all carry a session marker word. Sessions
+concurrently call `visit_web_page` (vector similarity queries and section reads) through an
+in-process HTTP stand-in, with a live-index LRU smaller than the number of sessions so
+indexes are evicted and reloaded from disk under load. Any returned section carrying
+another session's marker counts as cross-talk. The run fails on any cross-talk, or when no
+index was built, evicted or reloaded (the FAISS/LRU path was not exercised).
+
+Usage: python -m benchmarks.rag_concurrency --sessions 16 --queries 5 --max-live-indexes 4
+"""
+from app.agents import retriever, tools
+from app.core.config import settings
+from benchmarks.fakes import HashingFakeEmbeddings
+from benchmarks.utils import check, latency_summary
+import argparse
+import asyncio
+import httpx
+import json
+import os
+import random
+import re
+import tempfile
+import time
+
+TOPICS = ["history", "climate", "economy", "transport", "cuisine", "music", "sport", "architecture"]
+
+def session_page(session: int, sections: int) -> str:
+    body = "".join(
+        f"<h2>{TOPICS[i % len(TOPICS)].title()} {i}</h2><p>marker{session} notes about {TOPICS[i % len(TOPICS)]} "
+        f"in part {i} of the page.</p>"
+        for i in range(sections)
+    )
+    return f"<html><head><script>var x = 1;</script></head><body>{body}</body></html>"
+
+def stand_in_client(pages: dict[str, str], latency: float) -> httpx.AsyncClient:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        html = pages[str(request.url)]
+        etag = f'"{hash(html)}"'
+        if request.headers.get("If-None-Match") == etag:
+            return httpx.Response(304)
+        return httpx.Response(200, text=html, headers={"ETag": etag})
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+async def run_session(session: int, n_queries: int, latencies: list[float]) -> int:
+    """Run one session's tool calls, returns the number of foreign markers seen."""
+    url = f"https://pages.test/session/{session}"
+    rng = random.Random(session)
+    cross_talk = 0
+    for _ in range(n_queries):
+        args = {"url": url, "query": f"{rng.choice(TOPICS)} notes"}
+        if rng.random() < 0.3:
+            args["section_position"] = rng.choice(["start", "middle", "end"])
+        start = time.perf_counter()
+        result = await tools.visit_web_page.ainvoke(args)
+        latencies.append(time.perf_counter() - start)
+        markers = set(re.findall(r"marker(\d+)", result))
+        if not markers:
+            raise RuntimeError(f"Session {session} got no content: {result[:100]}")
+        cross_talk += len(markers - {str(session)})
+    return cross_talk
+
+async def main(n_sessions: int, n_queries: int, sections: int, max_live_indexes: int, embed_latency_ms: float):
+    embeddings = HashingFakeEmbeddings(latency=embed_latency_ms / 1000)
+    retriever.GoogleGenerativeAIEmbeddings = lambda model: embeddings
+    retriever.FAISS_PATH = tempfile.mkdtemp(prefix="faiss_bench_")
+    settings.embedding_cache_path = os.path.join(retriever.FAISS_PATH, "embeddings.sqlite3")
+    # The queries are short keyword queries: in hybrid mode BM25 alone would answer them and no index would be built
+    settings.rag_retrieval_mode = "vector"
+    tools.get_rag_manager.cache_clear()
+    rag_manager = tools.get_rag_manager()
+    rag_manager.max_live_indexes = max_live_indexes
+
+    pages = {f"https://pages.test/session/{i}": session_page(i, sections) for i in range(n_sessions)}
+    client = stand_in_client(pages, latency=0.02)
+    tools.get_http_client.cache_clear()
+    tools.get_http_client = lambda: client
+
+    latencies: list[float] = []
+    start = time.perf_counter()
+    cross_talk = await asyncio.gather(*(run_session(i, n_queries, latencies) for i in range(n_sessions)))
+    elapsed = time.perf_counter() - start
+    await client.aclose()
+    stats = rag_manager.stats()
+
+    print(json.dumps({
+        "sessions": n_sessions,
+        "tool_calls": len(latencies),
+        "wall_s": round(elapsed, 3),
+        "calls_per_s": round(len(latencies) / elapsed, 1),
+        "latency": latency_summary(latencies),
+        "cross_talk": sum(cross_talk),
+        "embedding_calls": embeddings.calls,
+        "rag_manager": stats,
+    }, indent=2))
+    check(sum(cross_talk) == 0, f"{sum(cross_talk)} sections of other sessions were returned")
+    check(stats["live_indexes"] > 0 and embeddings.calls > 0, "no vector index was built")
+    if n_sessions > max_live_indexes:
+        check(stats["evictions"] > 0 and stats["index_loads"] > 0, "no live index was evicted and reloaded from disk")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=16)
+    parser.add_argument("--queries", type=int, default=5)
+    parser.add_argument("--sections", type=int, default=12)
+    parser.add_argument("--max-live-indexes", type=int, default=4)
+    parser.add_argument("--embed-latency-ms", type=float, default=50, help="Simulated latency of one embeddings API call")
+    args = parser.parse_args()
+    asyncio.run(main(args.sessions, args.queries, args.sections, args.max_live_indexes, args.embed_latency_ms))
@@ -0,0 +1,64 @@
+"""
+Offline retrieval evaluation: recall@k, query latency and embeddings calls per retrieval mode.
+
+Pages and labelled queries come from a fixture corpus (benchmarks/fixtures/retrieval_corpus.json
+by default): each page is a list of [heading, text] sections, each query lists the headings
+of its relevant sections. Queries mix keywords (versions, names, prices) and natural language.
+Pages are indexed once with a stand-in embeddings model paying a fixed latency per API call,
+then every query runs in vector mode and in hybrid mode (BM25 + vector, reciprocal rank fusion).
+
+Usage: python -m benchmarks.retrieval_eval --k 1 3 --latency-ms 100
+"""
+from app.agents import retriever
+from benchmarks.fakes import HashingFakeEmbeddings
+from benchmarks.utils import latency_summary
+import argparse
+import json
+import os
+import tempfile
+import time
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "fixtures", "retrieval_corpus.json")
+
+def page_html(sections: list[list[str]]) -> str:
+    return "<html><body>" + "".join(f"<h2>{heading}</h2><p>{text}</p>" for heading, text in sections) + "</body></html>"
+
+def evaluate(rag_manager: retriever.RAGManager, model: HashingFakeEmbeddings, queries: list[dict], mode: str, k: int) -> dict:
+    model.calls = 0
+    hits, latencies = 0, []
+    for item in queries:
+        start = time.perf_counter()
+        answer = rag_manager.retrieve_documents(item["url"], item["query"], k=k, mode=mode)
+        latencies.append(time.perf_counter() - start)
+        hits += any(f"## {heading}" in answer for heading in item["relevant"])
+    return {
+        "mode": mode,
+        "k": k,
+        f"recall@{k}": round(hits / len(queries), 3),
+        "embed_calls": model.calls,
+        **latency_summary(latencies),
+    }
+
+def main(corpus_path: str, ks: list[int], latency_ms: float):
+    with open(corpus_path, "r", encoding="utf-8") as f:
+        corpus = json.load(f)
+
+    retriever.FAISS_PATH = tempfile.mkdtemp(prefix="faiss_eval_")
+    retriever.GoogleGenerativeAIEmbeddings = lambda model: HashingFakeEmbeddings()
+    model = HashingFakeEmbeddings(latency=latency_ms / 1000)
+    rag_manager = retriever.RAGManager()
+    rag_manager.embeddings = model
+    for url, sections in corpus["pages"].items():
+        rag_manager.load_page(url, page_html(sections))
+        rag_manager.retrieve_documents(url, "index this page", mode="vector")
+
+    results = [evaluate(rag_manager, model, corpus["queries"], mode, k) for k in ks for mode in ["vector", "hybrid"]]
+    print(json.dumps({"pages": len(corpus["pages"]), "queries": len(corpus["queries"]), "results": results}, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Fixture corpus of pages and labelled queries")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3])
+    parser.add_argument("--latency-ms", type=float, default=100, help="Simulated latency of one embeddings API call")
+    args = parser.parse_args()
+    main(args.corpus, args.k, args.latency_ms)
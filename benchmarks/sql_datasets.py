@@ -0,0 +1,80 @@
+"""
+SQL file analysis benchmark: first-query and repeat-query latency on a large generated CSV.
+
+The legacy path parses the CSV with pandas on every query and hands the frame to DuckDB.
+`DatasetManager` ingests the file once into Parquet with DuckDB's native CSV reader; the first
+query pays for the ingestion, repeat queries scan the Parquet copy, also after a restart.
+
+Usage: python -m benchmarks.sql_datasets --rows 5000000 --queries 10
+"""
+from app.agents.datasets import DatasetManager
+from benchmarks.utils import latency_summary
+import pandas as pd
+import argparse
+import duckdb
+import json
+import os
+import tempfile
+import time
+
+QUERIES = [
+    "SELECT category, COUNT(*) AS n, AVG(price) AS avg_price FROM df GROUP BY category ORDER BY n DESC",
+    "SELECT region, SUM(quantity * price) AS revenue FROM df GROUP BY region ORDER BY revenue DESC",
+    "SELECT * FROM df WHERE price > 990 ORDER BY price DESC LIMIT 10",
+    "SELECT COUNT(DISTINCT customer_id) FROM df",
+    "SELECT date_trunc('month', order_date::DATE) AS month, SUM(quantity) FROM df GROUP BY month ORDER BY month",
+]
+
+def generate_csv(path: str, rows: int) -> None:
+    duckdb.execute(f"""
+        COPY (
+            SELECT i AS order_id,
+                   (random() * 100000)::INTEGER AS customer_id,
+                   'category_' || (i % 40) AS category,
+                   ['north', 'south', 'east', 'west'][1 + i % 4] AS region,
+                   (random() * 1000)::DECIMAL(10, 2) AS price,
+                   1 + (random() * 9)::INTEGER AS quantity,
+                   DATE '2024-01-01' + (i % 730)::INTEGER AS order_date,
+                   md5(i::VARCHAR) AS note
+            FROM range({rows}) t(i)
+        ) TO '{path}' (HEADER, DELIMITER ',')
+    """)
+
+def legacy_query(filepath: str, query: str) -> pd.DataFrame:
+    df = pd.read_csv(filepath)
+    return duckdb.query_df(df, "df", query).to_df()
+
+def timed(run, filepath: str, queries: list[str]) -> list[float]:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        run(filepath, query)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def main(rows: int, n_queries: int, skip_legacy: bool):
+    workdir = tempfile.mkdtemp(prefix="sql_bench_")
+    csv_path = os.path.join(workdir, "orders.csv")
+    generate_csv(csv_path, rows)
+    queries = [QUERIES[i % len(QUERIES)] for i in range(n_queries)]
+    cache_dir = os.path.join(workdir, "datasets")
+
+    results = []
+    if not skip_legacy:
+        latencies = timed(legacy_query, csv_path, queries)
+        results.append({"run": "pandas per query", "first_s": round(latencies[0], 3), "repeat": latency_summary(latencies[1:])})
+
+    latencies = timed(DatasetManager(cache_dir).query, csv_path, queries)
+    results.append({"run": "dataset manager", "first_s": round(latencies[0], 3), "repeat": latency_summary(latencies[1:])})
+    latencies = timed(DatasetManager(cache_dir).query, csv_path, queries)
+    results.append({"run": "after restart", "first_s": round(latencies[0], 3), "repeat": latency_summary(latencies[1:])})
+
+    print(json.dumps({"rows": rows, "csv_mb": round(os.path.getsize(csv_path) / 1024 / 1024, 1), "results": results}, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000000)
+    parser.add_argument("--queries", type=int, default=10)
+    parser.add_argument("--skip-legacy", action="store_true", help="Skip the pandas-per-query baseline")
+    args = parser.parse_args()
+    main(args.rows, args.queries, args.skip_legacy)
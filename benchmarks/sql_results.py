@@ -0,0 +1,60 @@
+"""
+SQL result rendering benchmark: time, peak memory and output size of unbounded vs bounded results.
+
+`SELECT * ... LIMIT n` queries of growing size run against the Parquet copy of a generated CSV.
+The legacy path materializes the whole result in pandas and renders it with `to_string()`;
+`DatasetManager.query` fetches at most `sql_max_result_rows` rows, counts the rest in DuckDB and
+optionally spills the full result to Parquet, so memory should stay flat as results grow.
+
+Usage: python -m benchmarks.sql_results --rows 1000000 --result-rows 1000 100000 1000000
+"""
+from app.agents.datasets import DatasetManager
+from app.core.config import settings
+from benchmarks.sql_datasets import generate_csv
+import argparse
+import duckdb
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+def legacy_render(parquet_path: str, query: str) -> str:
+    with duckdb.connect() as conn:
+        conn.execute(f"CREATE VIEW df AS SELECT * FROM read_parquet('{parquet_path}')")
+        return conn.execute(query).df().to_string()
+
+def measure(render) -> dict:
+    tracemalloc.start()
+    start = time.perf_counter()
+    text = render()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"s": round(elapsed, 3), "peak_mb": round(peak / 1024 / 1024, 1), "chars": len(text)}
+
+def main(rows: int, result_rows: list[int]):
+    workdir = tempfile.mkdtemp(prefix="sql_results_")
+    csv_path = os.path.join(workdir, "orders.csv")
+    generate_csv(csv_path, rows)
+    manager = DatasetManager(os.path.join(workdir, "datasets"))
+    parquet_path = manager.dataset_path(csv_path)
+
+    results = []
+    for n in result_rows:
+        query = f"SELECT * FROM df LIMIT {n}"
+        bounded = lambda spill: manager.query(csv_path, query, spill=spill).render(settings.sql_max_result_chars, settings.sql_result_format)
+        results.append({
+            "result_rows": n,
+            "legacy": measure(lambda: legacy_render(parquet_path, query)),
+            "bounded": measure(lambda: bounded(False)),
+            "bounded_spill": measure(lambda: bounded(True)),
+        })
+    print(json.dumps({"rows": rows, "max_result_rows": settings.sql_max_result_rows, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--result-rows", type=int, nargs="+", default=[1000, 100000])
+    args = parser.parse_args()
+    main(args.rows, args.result_rows)
@@ -0,0 +1,74 @@
+"""
+SQL session benchmark: a multi-step analysis joining two uploaded files.
+
+Stateless, every step has to recompute the joined and aggregated intermediate from the source
+files. With a per-thread session, the first step stores it with CREATE TEMP TABLE and the
+following steps query the temp table.
+
+Usage: python -m benchmarks.sql_sessions --rows 5000000 --steps 8
+"""
+from app.agents.datasets import DatasetManager
+from benchmarks.sql_datasets import generate_csv
+import argparse
+import duckdb
+import json
+import os
+import tempfile
+import time
+
+INTERMEDIATE = """
+    SELECT o.customer_id, c.segment, COUNT(*) AS orders, SUM(o.quantity * o.price) AS revenue
+    FROM orders o JOIN customers c USING (customer_id)
+    GROUP BY o.customer_id, c.segment
+"""
+FOLLOW_UPS = [
+    "SELECT segment, SUM(revenue) FROM {t} GROUP BY segment ORDER BY 2 DESC",
+    "SELECT * FROM {t} ORDER BY revenue DESC LIMIT 10",
+    "SELECT segment, AVG(orders) FROM {t} GROUP BY segment",
+    "SELECT COUNT(*) FROM {t} WHERE revenue > 50000",
+]
+
+def generate_customers(path: str) -> None:
+    duckdb.execute(f"""
+        COPY (
+            SELECT i AS customer_id, ['retail', 'pro', 'enterprise', 'education'][1 + i % 4] AS segment
+            FROM range(100001) t(i)
+        ) TO '{path}' (HEADER, DELIMITER ',')
+    """)
+
+def run(manager: DatasetManager, orders: str, steps: int, thread_id: str | None) -> list[float]:
+    latencies = []
+    if thread_id:
+        start = time.perf_counter()
+        manager.query(orders, f"CREATE TEMP TABLE customer_revenue AS {INTERMEDIATE}", thread_id=thread_id)
+        latencies.append(time.perf_counter() - start)
+    for step in range(steps - len(latencies)):
+        table = "customer_revenue" if thread_id else f"({INTERMEDIATE}) AS customer_revenue"
+        start = time.perf_counter()
+        manager.query(orders, FOLLOW_UPS[step % len(FOLLOW_UPS)].format(t=table), thread_id=thread_id or "stateless")
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def main(rows: int, steps: int):
+    workdir = tempfile.mkdtemp(prefix="sql_sessions_")
+    orders, customers = os.path.join(workdir, "orders.csv"), os.path.join(workdir, "customers.csv")
+    generate_csv(orders, rows)
+    generate_customers(customers)
+    manager = DatasetManager(os.path.join(workdir, "datasets"))
+    for thread_id in ["warmup", "stateless", "analysis"]:
+        manager.register_file(thread_id, orders)
+        manager.register_file(thread_id, customers)
+    manager.query(orders, "SELECT 1", thread_id="warmup")  # Parquet ingestion is not what is measured here
+
+    results = []
+    for label, thread_id in [("recompute each step", None), ("temp table in session", "analysis")]:
+        latencies = run(manager, orders, steps, thread_id)
+        results.append({"run": label, "total_s": round(sum(latencies), 3), "steps_ms": [round(l * 1000, 1) for l in latencies]})
+    print(json.dumps({"rows": rows, "steps": steps, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000000)
+    parser.add_argument("--steps", type=int, default=8)
+    args = parser.parse_args()
+    main(args.rows, args.steps)
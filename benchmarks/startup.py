@@ -0,0 +1,48 @@
+"""
+Startup benchmark: build N agent profiles with and without a shared AgentRuntime.
+
+- isolated: every profile gets its own runtime (own chat model client, own MongoDB pool)
+- shared:   every profile reuses the process-wide runtime
+
+Usage: python -m benchmarks.startup --profiles 5
+"""
+from app.agents.base import AIAgent
+from app.agents.runtime import AgentRuntime
+from app.agents.profiles import TRAVEL_AGENT, TUTOR_AGENT, RESEARCH_AGENT, DATA_ANALYST_AGENT, MOVIE_RECOMMENDER_AGENT
+import argparse
+import asyncio
+import json
+import time
+
+PROFILES = [TRAVEL_AGENT, TUTOR_AGENT, RESEARCH_AGENT, DATA_ANALYST_AGENT, MOVIE_RECOMMENDER_AGENT]
+
+async def build_agents(n_profiles: int, shared: bool) -> dict:
+    runtimes = []
+    shared_runtime = AgentRuntime()
+    start = time.perf_counter()
+    for i in range(n_profiles):
+        runtime = shared_runtime if shared else AgentRuntime()
+        if runtime not in runtimes:
+            runtimes.append(runtime)
+        await AIAgent.create(PROFILES[i % len(PROFILES)], runtime=runtime)
+    elapsed = time.perf_counter() - start
+    result = {
+        "mode": "shared" if shared else "isolated",
+        "profiles": n_profiles,
+        "startup_seconds": round(elapsed, 4),
+        "llm_clients": sum(len(r._llms) for r in runtimes),
+        "mongodb_pools": sum(1 for r in runtimes if r._persistence and r._persistence[0] == "MongoDBSaver"),
+    }
+    for runtime in runtimes:
+        await runtime.aclose()
+    return result
+
+async def main(n_profiles: int):
+    results = [await build_agents(n_profiles, shared=False), await build_agents(n_profiles, shared=True)]
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", type=int, default=len(PROFILES))
+    args = parser.parse_args()
+    asyncio.run(main(args.profiles))
@@ -0,0 +1,72 @@
+"""
+Streaming renderer micro-benchmark: replay a recorded chunk stream through AIAgent.stream_answer.
+
+Compares the previous renderer (string concatenation + a new ChatMessage and history copy per chunk,
+one UI update per chunk) with the coalescing StreamingReply renderer.
+
+Usage: python -m benchmarks.streaming --tokens 10000 --history 200
+"""
+from langchain_core.messages import AIMessageChunk, HumanMessage
+from app.agents.base import AIAgent
+from app.gradio.schemas import MultimodalMessage
+import gradio as gr
+import argparse
+import asyncio
+import json
+import random
+import time
+
+class ReplayGraph:
+    """Stands in for the compiled agent: replays recorded (chunk, metadata) pairs."""
+    def __init__(self, chunks: list[AIMessageChunk], chunk_interval: float = 0.0):
+        self.chunks = chunks
+        self.chunk_interval = chunk_interval
+
+    async def astream(self, *args, **kwargs):
+        for chunk in self.chunks:
+            if self.chunk_interval:
+                await asyncio.sleep(self.chunk_interval)
+            yield chunk, {}
+
+async def legacy_stream_answer(graph: ReplayGraph, hist: list):
+    """The renderer used before StreamingReply."""
+    buffer = ""
+    async for chunk, _ in graph.astream({"messages": [HumanMessage(content="question")]}):
+        buffer += chunk.content
+        msg = gr.ChatMessage(role="assistant", content=buffer)
+        yield MultimodalMessage().model_dump(), hist + [msg]
+    hist.append(gr.ChatMessage(role="assistant", content=buffer))
+    yield MultimodalMessage().model_dump(), hist
+
+def recorded_chunks(n_tokens: int) -> list[AIMessageChunk]:
+    rng = random.Random(0)
+    words = ["the", "agent", "streams", "tokens", "to", "a", "chat", "history", "quickly", "and", "renders", "markdown"]
+    return [AIMessageChunk(content=rng.choice(words) + " ") for _ in range(n_tokens)]
+
+def history(n_messages: int) -> list:
+    return [gr.ChatMessage(role="user" if i % 2 == 0 else "assistant", content=f"message {i} " * 20) for i in range(n_messages)]
+
+async def measure(name: str, stream) -> dict:
+    start = time.perf_counter()
+    updates = 0
+    async for _ in stream:
+        updates += 1
+    return {"renderer": name, "seconds": round(time.perf_counter() - start, 4), "ui_updates": updates}
+
+async def main(n_tokens: int, n_history: int, chunk_interval_ms: float):
+    chunks = recorded_chunks(n_tokens)
+    graph = ReplayGraph(chunks, chunk_interval_ms / 1000)
+    results = [await measure("legacy", legacy_stream_answer(graph, history(n_history)))]
+    agent = AIAgent(agent=graph)
+    results.append(await measure("coalescing", agent.stream_answer("bench", {"text": "question", "files": []}, history(n_history))))
+    for result in results:
+        result.update({"tokens": n_tokens, "history": n_history})
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=10000)
+    parser.add_argument("--history", type=int, default=200)
+    parser.add_argument("--chunk-interval-ms", type=float, default=0.0, help="Delay between replayed chunks")
+    args = parser.parse_args()
+    asyncio.run(main(args.tokens, args.history, args.chunk_interval_ms))
@@ -0,0 +1,23 @@
+import math
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of `values` (pct in [0, 100])."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+def latency_summary(latencies: list[float]) -> dict:
+    """p50/p99/max of a list of latencies in seconds, reported in milliseconds."""
+    return {
+        "count": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(max(latencies, default=0.0) * 1000, 2),
+    }
+
+def check(condition: bool, message: str) -> None:
+    """Fail the benchmark run (non-zero exit) when one of its expectations does not hold."""
+    if not condition:
+        raise SystemExit(f"Check failed: {message}")
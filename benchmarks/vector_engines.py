@@ -0,0 +1,100 @@
+"""
+FAISS engine benchmark: build time, query latency, recall@k and resident memory per index engine.
+
+Random vectors near a low-dimensional subspace stand in for chunk embeddings. For each corpus
+size and engine (`build_index`, as configured in Settings), the index is built and saved, then
+loaded the way `RAGManager` loads saved namespaces (memory-mapped when `rag_index_mmap` is on) and queried
+one vector at a time. Recall@k is measured against exact search; RSS is the growth of the
+process resident set while the saved index is loaded and queried.
+
+Usage: python -m benchmarks.vector_engines --sizes 10000 100000 1000000 --engines flat hnsw ivfpq
+"""
+from app.agents.vector_index import build_index, configure_search, index_io_flags
+from app.core.config import settings
+from benchmarks.utils import latency_summary
+import numpy as np
+import argparse
+import faiss
+import gc
+import json
+import os
+import tempfile
+import time
+
+def rss_mb() -> float:
+    """Current resident set size of this process (Linux)."""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+def embedding_like(n: int, dim: int, rng: np.random.Generator, latent_dim: int = 32) -> np.ndarray:
+    """Unit vectors near a low-dimensional subspace, like real text embeddings."""
+    projection = np.random.default_rng(42).standard_normal((latent_dim, dim), dtype=np.float32)
+    vectors = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, 100000):
+        end = min(n, start + 100000)
+        vectors[start:end] = rng.standard_normal((end - start, latent_dim), dtype=np.float32) @ projection
+        vectors[start:end] += 0.5 * rng.standard_normal((end - start, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+def run_engine(engine: str, vectors: np.ndarray, queries: np.ndarray, truth: np.ndarray, k: int, workdir: str) -> dict:
+    start = time.perf_counter()
+    index = build_index(vectors, engine)
+    index.add(vectors)
+    build_s = time.perf_counter() - start
+    path = os.path.join(workdir, f"{engine}.faiss")
+    faiss.write_index(index, path)
+    del index
+    gc.collect()
+
+    rss_before = rss_mb()
+    try:
+        index = faiss.read_index(path, index_io_flags())
+    except RuntimeError:
+        index = faiss.read_index(path)
+    configure_search(index)
+    latencies, found = [], []
+    for query in queries:
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        latencies.append(time.perf_counter() - start)
+        found.append(ids[0])
+    recall = np.mean([len(set(ids) & set(expected)) / k for ids, expected in zip(found, truth)])
+    result = {
+        "engine": engine,
+        "build_s": round(build_s, 2),
+        f"recall@{k}": round(float(recall), 3),
+        "rss_mb": round(rss_mb() - rss_before, 1),
+        "file_mb": round(os.path.getsize(path) / 1024 / 1024, 1),
+        **latency_summary(latencies),
+    }
+    del index
+    os.remove(path)
+    return result
+
+def main(sizes: list[int], engines: list[str], dim: int, n_queries: int, k: int):
+    rng = np.random.default_rng(0)
+    workdir = tempfile.mkdtemp(prefix="faiss_engines_")
+    results = []
+    for n in sizes:
+        vectors = embedding_like(n, dim, rng)
+        queries = embedding_like(n_queries, dim, rng)
+        exact = faiss.IndexFlatL2(dim)
+        exact.add(vectors)
+        _, truth = exact.search(queries, k)
+        del exact
+        for engine in engines:
+            results.append({"chunks": n, **run_engine(engine, vectors, queries, truth, k, workdir)})
+        del vectors
+        gc.collect()
+    print(json.dumps({"dim": dim, "mmap": settings.rag_index_mmap, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--engines", nargs="+", default=["flat", "hnsw", "ivfpq"])
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+    main(args.sizes, args.engines, args.dim, args.queries, args.k)